@@ -0,0 +1,436 @@
+#!/usr/bin/env python
+"""
+py_auto_tester 性能测试脚本
+
+用法:
+  python benchmark.py              # 运行全部性能测试
+  python benchmark.py discovery    # 只运行指定的性能测试
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from py_auto_tester.discovery import DiscoveryIndex
+
+
+def _best_of(func, repeat=5):
+    """运行多次，返回最短耗时（秒）和最后一次的返回值"""
+    best = None
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, value
+
+
+def _legacy_walk(root):
+    """0.2.0 版本 discover_tests 的实现: 完整 os.walk，硬编码 test_*.py"""
+    test_files = []
+    for current, dirs, files in os.walk(root):
+        for file in files:
+            if file.startswith("test_") and file.endswith(".py"):
+                test_files.append(os.path.join(current, file))
+    return test_files
+
+
+def _build_tree(root, packages=40, modules=25, noise_files=20000):
+    """构造一个类似单仓库的目录树: 源码包、测试目录、.git 和 node_modules"""
+    for p in range(packages):
+        pkg = os.path.join(root, "src", f"pkg{p}")
+        tests = os.path.join(pkg, "tests")
+        os.makedirs(tests)
+        for m in range(modules):
+            open(os.path.join(pkg, f"module{m}.py"), "w").close()
+            open(os.path.join(tests, f"test_module{m}.py"), "w").close()
+    for name in (".git/objects", "node_modules/lib", ".venv/lib"):
+        directory = os.path.join(root, name)
+        os.makedirs(directory)
+        for i in range(noise_files // 3):
+            sub = os.path.join(directory, f"d{i // 500}")
+            if i % 500 == 0:
+                os.makedirs(sub)
+            open(os.path.join(sub, f"f{i}.py"), "w").close()
+    # 把所有目录的修改时间设为一分钟前，模拟两次运行之间没有改动的目录树
+    past = time.time() - 60
+    for current, dirs, files in os.walk(root):
+        os.utime(current, (past, past))
+
+
+def bench_discovery():
+    """对比 os.walk 全量遍历、scandir 冷启动和带索引的重复发现"""
+    root = tempfile.mkdtemp()
+    try:
+        _build_tree(root)
+        index_file = os.path.join(root, ".index", "discovery.json")
+
+        walk_time, walk_files = _best_of(lambda: _legacy_walk(root))
+
+        def cold():
+            if os.path.exists(index_file):
+                os.remove(index_file)
+            return DiscoveryIndex(root, index_file=index_file).discover()
+        cold_time, cold_files = _best_of(cold)
+
+        index = DiscoveryIndex(root, index_file=index_file)
+        index.discover()
+        warm_time, warm_files = _best_of(lambda: index.discover())
+
+        print("发现测试文件 (%d 个测试文件, 另有 %d 个无关文件)" % (len(cold_files), 20000))
+        print(f"  os.walk 全量遍历:      {walk_time * 1000:8.1f} ms  "
+              f"({len(walk_files)} 个文件)")
+        print(f"  scandir + 剪除 (冷):   {cold_time * 1000:8.1f} ms  "
+              f"({len(cold_files)} 个文件)")
+        print(f"  scandir + 索引 (热):   {warm_time * 1000:8.1f} ms  "
+              f"({len(warm_files)} 个文件, 复用 {index.stats['reused']} 个目录)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+# 标准库中导入较慢的模块，用来模拟测试文件共同依赖的重型第三方包
+HEAVY_MODULES = ["asyncio", "http.server", "email.mime.multipart", "xml.dom.minidom",
+                 "decimal", "unittest.mock", "logging.handlers", "concurrent.futures"]
+
+
+def bench_zygote(files=20):
+    """对比每个文件一个冷启动子进程与预加载依赖后 fork 子进程"""
+    if sys.platform == "win32":
+        print("zygote: 当前平台不支持 fork，跳过")
+        return
+    root = tempfile.mkdtemp()
+    try:
+        test_files = []
+        for i in range(files):
+            path = os.path.join(root, f"test_heavy{i}.py")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("import unittest\n")
+                f.write("".join(f"import {name}\n" for name in HEAVY_MODULES))
+                f.write("\nclass TestHeavy(unittest.TestCase):\n"
+                        "    def test_ok(self):\n        pass\n")
+            test_files.append(path)
+
+        # 两种方式都在单独的解释器里测量，保证父进程一开始没有导入这些模块
+        code = (
+            "import io, sys, time\n"
+            "sys.path.insert(0, %r)\n"
+            "from py_auto_tester.parallel import ParallelRunner\n"
+            "files = %r\n"
+            "runner = ParallelRunner(workers=1, verbose=False, stream=io.StringIO(), "
+            "preload=%s, tasks_per_worker=1)\n"
+            "start = time.perf_counter()\n"
+            "runner.run(files)\n"
+            "print(time.perf_counter() - start)\n"
+        )
+        root_dir = os.path.dirname(os.path.abspath(__file__))
+        timings = {}
+        for label, preload in (("cold", "None"), ("zygote", repr(HEAVY_MODULES))):
+            script = code % (root_dir, test_files, preload)
+            output = subprocess.run([sys.executable, "-c", script],
+                                    capture_output=True, text=True, check=True).stdout
+            timings[label] = float(output.strip().splitlines()[-1])
+
+        print(f"每个测试文件一个新进程 ({files} 个文件, 每个导入 {len(HEAVY_MODULES)} 个重型模块)")
+        print(f"  冷启动子进程:          {timings['cold'] * 1000:8.1f} ms")
+        print(f"  预加载 + fork (zygote): {timings['zygote'] * 1000:8.1f} ms")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def bench_daemon(repeat=5):
+    """对比每次启动新的命令行进程与通过常驻守护进程重新运行一个小测试文件"""
+    if sys.platform == "win32":
+        print("daemon: 当前平台不支持 Unix 套接字和 fork，跳过")
+        return
+    root = tempfile.mkdtemp()
+    root_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=root_dir)
+    daemon = None
+    try:
+        os.makedirs(os.path.join(root, "tests"))
+        with open(os.path.join(root, "tests", "test_small.py"), "w",
+                  encoding="utf-8") as f:
+            f.write("import unittest\n")
+            f.write("".join(f"import {name}\n" for name in HEAVY_MODULES))
+            f.write("\nclass TestSmall(unittest.TestCase):\n"
+                    "    def test_ok(self):\n        pass\n")
+
+        def cli(*extra):
+            subprocess.run([sys.executable, "-m", "py_auto_tester", *extra],
+                           cwd=root, env=env, stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, check=True)
+
+        cold_time, _ = _best_of(cli, repeat)
+
+        daemon = subprocess.Popen(
+            [sys.executable, "-m", "py_auto_tester", "daemon",
+             "--preload", ",".join(HEAVY_MODULES)],
+            cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        socket_path = os.path.join(root, ".py_auto_tester", "daemon.sock")
+        while not os.path.exists(socket_path):
+            time.sleep(0.05)
+        cli("--daemon")
+        warm_time, _ = _best_of(lambda: cli("--daemon"), repeat)
+
+        # 客户端本身的解释器启动开销之外，守护进程一次往返的耗时
+        from py_auto_tester.daemon import send_request
+        request = {"command": "run", "cwd": root, "dir": "tests",
+                   "pattern": "test_*.py"}
+        round_trip, _ = _best_of(lambda: list(send_request(request, socket_path)),
+                                 repeat)
+
+        print(f"重新运行一个小测试文件 (导入 {len(HEAVY_MODULES)} 个重型模块)")
+        print(f"  每次启动新进程:         {cold_time * 1000:8.1f} ms")
+        print(f"  --daemon 客户端:        {warm_time * 1000:8.1f} ms")
+        print(f"  守护进程往返 (不含启动): {round_trip * 1000:8.1f} ms")
+    finally:
+        if daemon is not None:
+            daemon.terminate()
+            daemon.wait()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+_MEMORY_RUN = """
+import json, sys
+from py_auto_tester import AutoTester
+results = AutoTester("tests", cache_dir=".cache").run_tests(
+    verbose=False, workers=1, evict_modules=sys.argv[1] == "1",
+    collect_garbage=sys.argv[1] == "1")
+rss = [f["rss"] for f in results["files"]]
+print(json.dumps([rss[0], max(rss), rss[-1]]))
+"""
+
+
+def bench_memory(files=400):
+    """对比串行运行大量测试文件时，默认模式与内存受限模式（淘汰模块 + gc）的常驻内存增长"""
+    root = tempfile.mkdtemp()
+    root_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=root_dir)
+    try:
+        os.makedirs(os.path.join(root, "tests"))
+        os.makedirs(os.path.join(root, "helpers"))
+        open(os.path.join(root, "helpers", "__init__.py"), "w").close()
+        for i in range(files):
+            # 每个测试文件导入一个只被它使用的项目模块，模块中有约 1 MB 的数据
+            with open(os.path.join(root, "helpers", f"data{i}.py"), "w",
+                      encoding="utf-8") as f:
+                f.write("TABLE = [str(i) * 8 for i in range(20000)]\n")
+            with open(os.path.join(root, "tests", f"test_m{i}.py"), "w",
+                      encoding="utf-8") as f:
+                f.write(f"import unittest\nfrom helpers.data{i} import TABLE\n\n"
+                        "class TestM(unittest.TestCase):\n"
+                        "    def test_len(self):\n"
+                        "        self.assertEqual(len(TABLE), 20000)\n")
+
+        print(f"串行运行 {files} 个测试文件，每个文件导入约 1 MB 的项目模块")
+        for label, flag in (("默认模式", "0"), ("--evict-modules --gc", "1")):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, "-c", _MEMORY_RUN, flag],
+                                    cwd=root, env=env, capture_output=True,
+                                    text=True, check=True).stdout
+            elapsed = time.perf_counter() - start
+            first, peak, last = json.loads(output.strip().splitlines()[-1])
+            print(f"  {label:<22} 第一个文件后 {first / 2**20:6.1f} MiB, "
+                  f"最高 {peak / 2**20:6.1f} MiB, 结束 {last / 2**20:6.1f} MiB, "
+                  f"耗时 {elapsed:.2f}s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+_COVERAGE_RUN = """
+import json, sys, time
+from py_auto_tester import AutoTester
+mode, test_dir, source = sys.argv[1], sys.argv[2], sys.argv[3]
+options = {}
+if mode != "none":
+    options = {"coverage": True, "coverage_backend": mode, "coverage_source": [source]}
+tester = AutoTester(test_dir, cache_dir=".cache")
+start = time.perf_counter()
+results = tester.run_tests(verbose=False, workers=1, **options)
+print(json.dumps([time.perf_counter() - start, results["total"],
+                  (results.get("coverage") or {}).get("percent")]))
+"""
+
+_EXAMPLE_LOOP = """
+import unittest
+from example_source import Calculator, StringProcessor
+
+class TestExampleLoop(unittest.TestCase):
+    def test_loop(self):
+        calc, text = Calculator(), StringProcessor()
+        for i in range(1, 100001):
+            calc.add(i, 1)
+            calc.subtract(i, 1)
+            calc.multiply(i, 2)
+            calc.divide(i, 1)
+            calc.power(2, 3)
+            text.reverse_string("hello")
+            text.count_words("a b c")
+            text.to_upper_case("abc")
+"""
+
+
+def bench_coverage(repeat=3):
+    """对比不收集覆盖率、coverage 包（sys.settrace）和 sys.monitoring 后端的运行耗时"""
+    from py_auto_tester.cover import coverage_available
+    modes = [("none", "不收集覆盖率")]
+    if coverage_available("coverage"):
+        modes.append(("coverage", "coverage 包 (settrace)"))
+    else:
+        print("coverage: 未安装coverage包，跳过 coverage 后端")
+    if coverage_available("monitoring"):
+        modes.append(("monitoring", "sys.monitoring"))
+    else:
+        print("coverage: sys.monitoring 后端需要 Python 3.12+，跳过")
+    root_dir = os.path.dirname(os.path.abspath(__file__))
+    root = tempfile.mkdtemp()
+    source_dir = os.path.join(root, "src")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root_dir, source_dir]))
+    try:
+        # 本仓库的测试（test_cover.py 自己会启动覆盖率收集，不参与测量）
+        shutil.copytree(os.path.join(root_dir, "tests"),
+                        os.path.join(root, "repo_tests"),
+                        ignore=shutil.ignore_patterns("__pycache__", "test_cover.py"))
+        example_dir = os.path.join(root, "example_tests")
+        os.makedirs(example_dir)
+        os.makedirs(source_dir)
+        shutil.copy(os.path.join(root_dir, "example_source.py"), source_dir)
+        from py_auto_tester import AutoTester
+        AutoTester().generate_test_from_file(
+            os.path.join(source_dir, "example_source.py"),
+            os.path.join(example_dir, "test_example.py"))
+        with open(os.path.join(example_dir, "test_example_loop.py"), "w",
+                  encoding="utf-8") as f:
+            f.write(_EXAMPLE_LOOP)
+        workloads = [
+            ("本仓库的测试", "repo_tests", os.path.join(root_dir, "py_auto_tester")),
+            ("example_source.py 的生成测试 + 循环调用 10 万次", "example_tests", source_dir),
+        ]
+
+        print(f"覆盖率开销 (Python {sys.version.split()[0]}, 串行运行, 取 {repeat} 次中最快的一次)")
+        for label, test_dir, source in workloads:
+            timings = {}
+            for mode, _ in modes:
+                best = None
+                for _ in range(repeat):
+                    shutil.rmtree(os.path.join(root, ".cache"), ignore_errors=True)
+                    output = subprocess.run(
+                        [sys.executable, "-c", _COVERAGE_RUN, mode, test_dir, source],
+                        cwd=root, env=env, capture_output=True, text=True,
+                        check=True).stdout
+                    elapsed, total, percent = json.loads(
+                        output.strip().splitlines()[-1])
+                    best = elapsed if best is None else min(best, elapsed)
+                timings[mode] = (best, percent)
+            print(f"  {label} ({total} 个测试):")
+            baseline = timings["none"][0]
+            for mode, name in modes:
+                elapsed, percent = timings[mode]
+                extra = ""
+                if mode != "none":
+                    extra = (f"  ({(elapsed / baseline - 1) * 100:+6.1f}%, "
+                             f"覆盖率 {percent:.1f}%)")
+                # 中文和ASCII混排时按 GBK 编码长度（即终端显示宽度）对齐
+                padding = " " * (24 - len(name.encode("gbk")))
+                print(f"    {name}:{padding}{elapsed:8.3f}s{extra}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+_GENERATED_RUN = """
+import io, json, sys, time, unittest
+sys.path.insert(0, sys.argv[1])
+start = time.perf_counter()
+module = __import__(sys.argv[2])
+imported = time.perf_counter()
+suite = unittest.defaultTestLoader.loadTestsFromModule(module)
+result = unittest.TextTestRunner(stream=io.StringIO()).run(suite)
+print(json.dumps([imported - start, time.perf_counter() - imported, result.testsRun]))
+"""
+
+
+def _case_source(classes, methods, cases):
+    """构造一个源文件: 每个方法的 docstring 里有 cases 个测试用例"""
+    lines = []
+    for c in range(classes):
+        lines.append(f"class Table{c}:\n"
+                     "    def __init__(self):\n        self.total = 0\n")
+        for m in range(methods):
+            lines.append(f"    def op{m}(self, a, b):\n        \"\"\"\n        测试用例：")
+            for i in range(cases):
+                lines.append(f"        ({i}, {m}) -> {i + m}")
+            lines.append("        \"\"\"\n        return a + b\n")
+    return "\n".join(lines)
+
+
+def bench_generate(classes=4, methods=5, cases=500, repeat=3):
+    """对比展开式和数据表式生成的测试文件大小、冷导入（含编译）耗时和运行耗时"""
+    from py_auto_tester import AutoTester
+    root = tempfile.mkdtemp()
+    try:
+        source = os.path.join(root, "table_source.py")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write(_case_source(classes, methods, cases))
+        print(f"生成测试 ({classes} 个类 x {methods} 个方法 x {cases} 个用例, "
+              f"冷导入不写 .pyc, 取 {repeat} 次中最快的一次)")
+        for style in ("unrolled", "table"):
+            name = f"test_{style}"
+            output = os.path.join(root, name + ".py")
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_time, _ = _best_of(
+                    lambda: AutoTester().generate_test_from_file(source, output,
+                                                                 style=style), 1)
+            import_time = run_time = None
+            for _ in range(repeat):
+                # -B: 每次都重新编译生成的文件，模拟文件刚生成后的第一次运行
+                stdout = subprocess.run(
+                    [sys.executable, "-B", "-c", _GENERATED_RUN, root, name],
+                    capture_output=True, text=True, check=True).stdout
+                imported, ran, total = json.loads(stdout.strip().splitlines()[-1])
+                import_time = (imported if import_time is None
+                               else min(import_time, imported))
+                run_time = ran if run_time is None else min(run_time, ran)
+            size = os.path.getsize(output)
+            print(f"  {style:<9} {size / 1024:8.1f} KiB  "
+                  f"生成 {generate_time * 1000:7.1f} ms  "
+                  f"导入 {import_time * 1000:7.1f} ms  运行 {run_time * 1000:7.1f} ms  "
+                  f"({total} 个测试)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+BENCHMARKS = {
+    "discovery": bench_discovery,
+    "zygote": bench_zygote,
+    "daemon": bench_daemon,
+    "memory": bench_memory,
+    "coverage": bench_coverage,
+    "generate": bench_generate,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="py_auto_tester 性能测试")
+    parser.add_argument("names", nargs="*", help="要运行的性能测试，默认全部运行: "
+                        + ", ".join(BENCHMARKS))
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error("未知的性能测试: " + ", ".join(unknown))
+    for name in args.names or list(BENCHMARKS):
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == "__main__":
+    main()
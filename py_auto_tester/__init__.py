@@ -9,7 +9,15 @@ __author__ = "Fandaw"
 __email__ = "542483297@qq.com"
 __description__ = "Python自动化单元测试工具"
 
-# 导入主要功能模块
-from .core import AutoTester
+__all__ = ["AutoTester", "timeout"]
 
-__all__ = ["AutoTester"]
\ No newline at end of file
+
+def __getattr__(name):
+    # 延迟导入主要功能模块，使守护进程客户端等轻量入口不必加载整个测试框架
+    if name == "AutoTester":
+        from .core import AutoTester
+        return AutoTester
+    if name == "timeout":
+        from .timeouts import timeout
+        return timeout
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
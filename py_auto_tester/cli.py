@@ -3,15 +3,312 @@
 """
 
 import argparse
+import json
 import sys
 import os
-from .core import AutoTester
 
+# 核心模块延迟导入: 通过守护进程运行时客户端只需要标准库和 report 模块
+from .daemon import DEFAULT_SOCKET
+from .report import TRACEBACK_LIMIT
 
-def main():
+
+def merge_main(argv):
+    """
+    merge 子命令: 合并各分片的结果文件
+    """
+    parser = argparse.ArgumentParser(
+        prog="py-auto-tester merge",
+        description="合并多个分片 (--shard) 运行生成的结果文件"
+    )
+    parser.add_argument("result_files", nargs="+", help="各分片的结果文件 (--result-file 生成)")
+    parser.add_argument("--output", "-o", help="合并后的结果文件输出路径")
+    args = parser.parse_args(argv)
+    
+    from .shard import merge_result_files
+    try:
+        merged = merge_result_files(args.result_files)
+    except (OSError, ValueError) as e:
+        print(f"合并结果文件时发生错误: {e}")
+        return 1
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(merged, f, ensure_ascii=False, indent=1)
+        print(f"合并结果已写入: {args.output}")
+    
+    for flavour, entries in (("ERROR", merged["error_details"]),
+                             ("FAIL", merged["failures"])):
+        for test_id, traceback in entries:
+            print("=" * 70)
+            print(f"{flavour}: {test_id}")
+            print("-" * 70)
+            print(traceback)
+    
+    print("=" * 60)
+    print(f"合并了 {len(args.result_files)} 个分片的测试结果:")
+    print(f"  总计: {merged['total']}")
+    print(f"  通过: {merged['passed']}")
+    print(f"  失败: {merged['failed']}")
+    print(f"  错误: {merged['errors']}")
+    
+    return 1 if merged["failed"] > 0 or merged["errors"] > 0 else 0
+
+
+def mutate_main(argv):
+    """
+    mutate 子命令: 对源文件进行变异测试
+    """
+    parser = argparse.ArgumentParser(
+        prog="py-auto-tester mutate",
+        description="在内存中修改源文件（交换运算符、调整常量、条件取反），"
+                    "只运行覆盖了修改处的测试，报告没有被任何测试发现的修改"
+    )
+    parser.add_argument("source", help="被测源文件")
+    parser.add_argument("--dir", "-d", default="tests", help="测试文件目录 (默认: tests)")
+    parser.add_argument("--pattern", "-p", default="test_*.py",
+                        help="测试文件匹配模式 (默认: test_*.py)")
+    parser.add_argument("--workers", "-w", type=int, default=0,
+                        help="并行运行变体的进程数，0 表示使用全部CPU核心 (默认: 0)")
+    parser.add_argument("--cov-backend", choices=["auto", "monitoring", "coverage"],
+                        default="auto", help="覆盖率后端 (默认: auto)")
+    parser.add_argument("--verbose", "-v", action="store_true", help="逐个显示变体结果")
+    args = parser.parse_args(argv)
+    
+    if not os.path.isfile(args.source):
+        print(f"错误: 源文件 {args.source} 不存在")
+        return 1
+    
+    from .core import AutoTester
+    from .report import print_mutation_report
+    tester = AutoTester(test_directory=args.dir, pattern=args.pattern)
+    if not tester.discover_tests():
+        print("没有发现测试文件")
+        return 1
+    try:
+        summary = tester.mutate(args.source, workers=args.workers, verbose=args.verbose,
+                                backend=args.cov_backend)
+    except RuntimeError as e:
+        print(f"变异测试时发生错误: {e}")
+        return 1
+    except KeyboardInterrupt:
+        print("\n变异测试被用户中断")
+        return 130
+    
+    print("=" * 60)
+    if summary["baseline_failures"]:
+        print(f"以下 {len(summary['baseline_failures'])} 个测试在未修改的代码上失败，未使用:")
+        for test_id in summary["baseline_failures"]:
+            print(f"  {test_id}")
+    print_mutation_report(summary, args.source, sys.stdout)
+    print(f"用时 {summary['elapsed']:.2f}s")
+    return 1 if summary["survived"] else 0
+
+
+def daemon_main(argv):
+    """
+    daemon 子命令: 启动、查询或停止常驻守护进程
+    """
+    from .daemon import WarmDaemon, daemon_supported, send_request
+    
+    parser = argparse.ArgumentParser(
+        prog="py-auto-tester daemon",
+        description="在前台启动常驻守护进程，之后用 py-auto-tester --daemon 运行测试"
+    )
+    parser.add_argument("--socket", default=DEFAULT_SOCKET,
+                        help=f"守护进程的 Unix 套接字路径 (默认: {DEFAULT_SOCKET})")
+    parser.add_argument("--preload", action="append", metavar="MODULES",
+                        help="启动时预先导入的模块（逗号分隔，可多次指定）")
+    parser.add_argument("--status", action="store_true", help="显示正在运行的守护进程的状态")
+    parser.add_argument("--stop", action="store_true", help="停止正在运行的守护进程")
+    args = parser.parse_args(argv)
+    
+    if not daemon_supported():
+        print("当前平台不支持守护进程模式（需要 Unix 套接字和 fork）")
+        return 1
+    
+    if args.status or args.stop:
+        try:
+            for event in send_request({"command": "stop" if args.stop else "status"},
+                                      args.socket):
+                if event["event"] == "stopped":
+                    print(f"守护进程已停止 (pid {event['pid']})")
+                elif event["event"] == "status":
+                    print(f"守护进程 pid {event['pid']}, 目录 {event['root']}")
+                    print(f"  运行时间: {event['uptime']:.0f}s")
+                    print(f"  已处理运行请求: {event['runs']}")
+                    print(f"  预加载模块: {', '.join(event['preload']) or '无'}")
+                    print(f"  已导入模块数: {event['modules']}")
+        except OSError as e:
+            print(f"无法连接守护进程 {args.socket}: {e}")
+            return 1
+        return 0
+    
+    import signal
+    # 被 kill 时同样走正常退出流程，删除套接字文件
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    preload = _split_modules(args.preload)
+    try:
+        WarmDaemon(socket_path=args.socket, preload=preload).serve_forever()
+    except RuntimeError as e:
+        print(e)
+        return 1
+    except KeyboardInterrupt:
+        print("\n守护进程已停止")
+    return 0
+
+
+def _split_modules(values):
+    """
+    把可多次指定、逗号分隔的模块参数展开为模块名列表
+    """
+    if not values:
+        return None
+    return [name.strip() for value in values for name in value.split(",")
+            if name.strip()]
+
+
+def _report_spec(value):
+    """
+    校验 --report 参数，格式为 类型:路径
+    """
+    from .reporters import parse_report_spec
+    
+    try:
+        parse_report_spec(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def _open_reporters(specs):
+    """
+    按 --report 参数创建写入文件的报告器
+    """
+    from .reporters import create_reporter
+    
+    return [create_reporter(spec) for spec in specs or []]
+
+
+def _close_reporters(reporters):
+    for reporter in reporters:
+        reporter.close()
+        print(f"测试报告已写入: {reporter.path}")
+
+
+def _run_options(args):
+    """
+    由命令行参数得到 run_tests 的运行选项（verbose 和 reporters 除外）
+    """
+    options = {"workers": args.workers, "preload": _split_modules(args.preload),
+               "trace_memory": args.trace_memory,
+               "capture_output": args.buffer or bool(args.report),
+               "evict_modules": args.evict_modules, "collect_garbage": args.gc,
+               "max_tests_per_worker": args.max_tests_per_worker,
+               "worker_cpu_limit": args.worker_cpu_limit,
+               "timeout": args.timeout, "file_timeout": args.file_timeout,
+               "failed_first": args.failed_first, "exitfirst": args.exitfirst,
+               "coverage": args.coverage or args.minimize,
+               "coverage_source": _split_modules(args.cov_source),
+               "coverage_backend": args.cov_backend,
+               "coverage_contexts": args.minimize,
+               "traceback_limit": args.traceback_limit or None}
+    if args.output_limit:
+        options["output_limit"] = args.output_limit
+    if args.worker_memory_limit:
+        options["worker_memory_limit"] = args.worker_memory_limit * 2**20
+    return options
+
+
+def _run_with_daemon(args):
+    """
+    把运行请求发送给守护进程并输出流式返回的结果
+    
+    Returns:
+        退出代码；无法连接守护进程时返回 None
+    """
+    from .daemon import daemon_supported, send_request
+    
+    if not daemon_supported():
+        return None
+    request = {"command": "run", "cwd": os.getcwd(), "dir": args.dir,
+               "pattern": args.pattern, "exclude": args.exclude,
+               "capture_output": args.buffer or bool(args.report),
+               "output_limit": args.output_limit,
+               "evict_modules": args.evict_modules, "collect_garbage": args.gc,
+               "workers": args.workers, "trace_memory": args.trace_memory}
+    events = send_request(request, args.socket)
+    try:
+        event = next(events)
+    except (OSError, StopIteration):
+        return None
+    
+    reporters = _open_reporters(args.report)
+    try:
+        return _handle_daemon_events(args, event, events, reporters)
+    finally:
+        _close_reporters(reporters)
+
+
+def _handle_daemon_events(args, event, events, reporters):
+    """
+    输出守护进程返回的事件，并交给报告器
+    """
+    from .report import ConsoleReporter, ResultAggregator, print_durations
+    
+    console = ConsoleReporter(args.verbose, sys.stderr,
+                              traceback_limit=args.traceback_limit or None)
+    reporters = [console] + reporters
+    # --durations 需要每个测试的耗时，与本地运行一样在客户端汇总
+    timings = ResultAggregator() if args.durations is not None else None
+    summary = None
+    while event is not None:
+        kind = event["event"]
+        if kind == "log":
+            print(event["message"])
+        elif kind == "daemon_error":
+            print(f"守护进程返回错误: {event['message']}")
+            return 1
+        elif kind == "discovered":
+            if not event["files"]:
+                print(f"在目录 '{args.dir}' 中未找到测试文件")
+                return 1
+            print(f"发现 {len(event['files'])} 个测试文件")
+            print("运行测试...")
+            print("=" * 60)
+        else:
+            for reporter in reporters:
+                reporter.handle(event)
+            if timings is not None:
+                timings.add(event)
+            if kind == "summary":
+                summary = event
+        event = next(events, None)
+    
+    if summary is None:
+        print("守护进程意外断开连接")
+        return 1
+    if timings is not None:
+        print()
+        print_durations(timings.results()["tests"], args.durations, sys.stdout)
+    return 1 if summary["failed"] > 0 or summary["errors"] > 0 else 0
+
+
+def main(argv=None):
     """
     命令行入口函数
+    
+    Args:
+        argv: 命令行参数列表，默认为 sys.argv[1:]
     """
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] == "merge":
+        return merge_main(argv[1:])
+    if argv and argv[0] == "daemon":
+        return daemon_main(argv[1:])
+    if argv and argv[0] == "mutate":
+        return mutate_main(argv[1:])
+    
     parser = argparse.ArgumentParser(
         description="Python自动化单元测试工具",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -20,7 +317,29 @@ def main():
   py-auto-tester                    # 在当前目录的tests文件夹中运行所有测试
   py-auto-tester --dir mytests      # 在mytests目录中运行测试
   py-auto-tester --template MyClass # 为MyClass生成测试模板
-  py-auto-tester --coverage        # 运行测试并生成覆盖率报告
+  py-auto-tester --run-docstrings mymodule.py  # 直接运行docstring中的测试用例
+  py-auto-tester --from-dir mypackage --output tests/generated  # 为整个包生成测试
+  py-auto-tester -f mymodule.py -o tests/test_mymodule.py --style table  # 用例存为数据表
+  py-auto-tester --coverage         # 运行测试的同时收集覆盖率并输出每个文件的报告
+  py-auto-tester --minimize         # 按测试记录覆盖率，找出覆盖相同行的最小测试子集
+  py-auto-tester --workers 8        # 使用8个进程并行运行测试
+  py-auto-tester --preload numpy,pandas  # 预加载依赖后为每个文件 fork 新进程
+  py-auto-tester --list             # 列出所有测试ID而不运行
+  py-auto-tester --durations 10 --trace-memory  # 显示最慢和内存占用最高的10个测试
+  py-auto-tester --shard 1/4 --result-file r1.json  # 只运行4个分片中的第1个
+  py-auto-tester merge r1.json r2.json r3.json r4.json  # 合并各分片结果
+  py-auto-tester daemon --preload numpy &  # 启动常驻守护进程
+  py-auto-tester mutate mymodule.py # 对源文件进行变异测试
+  py-auto-tester --daemon           # 通过守护进程运行测试，无需重新启动解释器
+  py-auto-tester --watch            # 监视文件修改，只重新运行受影响的测试
+  py-auto-tester --changed-since origin/main  # 只运行受本分支修改影响的测试
+  py-auto-tester --report junit:reports/junit.xml  # 同时写出 JUnit XML 报告
+  py-auto-tester -b                 # 捕获测试输出，只在失败时显示
+  py-auto-tester --evict-modules --gc --rss-report 10  # 内存受限模式，报告内存增长最多的文件
+  py-auto-tester -w 4 --worker-memory-limit 2048 --max-tests-per-worker 500  # 限制工作进程资源
+  py-auto-tester --timeout 60       # 单个测试超过60秒记为错误并输出调用栈
+  py-auto-tester --lf -x            # 只重新运行上次失败的测试，遇到失败即停止
+  py-auto-tester --time-budget 300  # 在5分钟内优先运行失败、修改过和新的测试
         """
     )
     
@@ -36,12 +355,204 @@ def main():
         help="测试文件匹配模式 (默认: test_*.py)"
     )
     
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="DIR",
+        help="发现测试时跳过的目录名模式，可多次指定（替换默认的隐藏目录、venv、node_modules等规则）"
+    )
+    
     parser.add_argument(
         "--verbose", "-v",
         action="store_true",
         help="显示详细输出"
     )
     
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=0,
+        help="并行工作进程数，0 表示使用全部CPU核心，1 表示串行运行 (默认: 0)"
+    )
+    
+    parser.add_argument(
+        "--preload",
+        action="append",
+        metavar="MODULES",
+        help="预加载的模块（逗号分隔，可多次指定）。指定后先导入这些依赖，再为每个测试文件 fork 一个新进程"
+    )
+    
+    parser.add_argument(
+        "--last-failed", "--lf",
+        action="store_true",
+        help="只运行上次运行中失败的测试，没有失败记录时运行全部测试"
+    )
+    
+    parser.add_argument(
+        "--failed-first", "--ff",
+        action="store_true",
+        help="先运行上次失败的测试，再按历史耗时从短到长运行其余的测试"
+    )
+    
+    parser.add_argument(
+        "--exitfirst", "-x",
+        action="store_true",
+        help="遇到第一个失败或错误后停止运行"
+    )
+    
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        metavar="SECONDS",
+        help="按耗时历史只运行预计在该时间内完成的测试，优先选择上次失败、最近修改和从未运行过的测试；"
+             "推迟的测试ID写入缓存目录的 deferred.json"
+    )
+    
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        metavar="SECONDS",
+        help="每个测试的默认超时时间（秒），超时的测试记为错误并输出所有线程的调用栈；@timeout 装饰器和 __timeout__ 属性优先"
+    )
+    
+    parser.add_argument(
+        "--file-timeout",
+        type=float,
+        metavar="SECONDS",
+        help="每个测试文件的超时时间（秒），超时后不再运行该文件其余的测试"
+    )
+    
+    parser.add_argument(
+        "--max-tests-per-worker",
+        type=int,
+        metavar="N",
+        help="每个工作进程最多运行N个测试，之后换用新进程（在文件或测试类之间切换）"
+    )
+    
+    parser.add_argument(
+        "--worker-memory-limit",
+        type=int,
+        metavar="MB",
+        help="每个工作进程的内存上限（MB），超出时当前测试记为错误并替换该进程"
+    )
+    
+    parser.add_argument(
+        "--worker-cpu-limit",
+        type=float,
+        metavar="SECONDS",
+        help="每个工作进程运行一个任务的CPU时间上限（秒），超出时当前测试记为错误并替换该进程"
+    )
+    
+    parser.add_argument(
+        "--durations",
+        type=int,
+        metavar="N",
+        help="运行结束后显示最慢的N个测试（0 表示全部）；与 --trace-memory 一起使用时还显示内存分配峰值最高的测试"
+    )
+    
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="用 tracemalloc 记录每个测试的内存分配峰值（会拖慢测试）"
+    )
+    
+    parser.add_argument(
+        "--evict-modules",
+        action="store_true",
+        help="内存受限模式: 每个测试文件运行后淘汰其间新导入的项目模块，内存占用不随文件数增长"
+    )
+    
+    parser.add_argument(
+        "--gc",
+        action="store_true",
+        help="每个测试文件运行后执行 gc.collect()"
+    )
+    
+    parser.add_argument(
+        "--rss-report",
+        type=int,
+        metavar="N",
+        help="运行结束后显示最高常驻内存和内存增长最多的N个测试文件（0 表示全部）"
+    )
+    
+    parser.add_argument(
+        "--buffer", "-b",
+        action="store_true",
+        help="捕获每个测试的标准输出和标准错误，只在失败的测试下显示"
+    )
+    
+    parser.add_argument(
+        "--output-limit",
+        type=int,
+        metavar="CHARS",
+        help="捕获输出时每个流在内存中保留的最大字符数，超出时完整输出写入临时文件 (默认: 65536)"
+    )
+    
+    parser.add_argument(
+        "--traceback-limit",
+        type=int,
+        default=TRACEBACK_LIMIT,
+        metavar="CHARS",
+        help=f"每条失败回溯保存和显示的最大字符数，0 表示不截断 (默认: {TRACEBACK_LIMIT})"
+    )
+    
+    parser.add_argument(
+        "--report",
+        action="append",
+        type=_report_spec,
+        metavar="KIND:PATH",
+        help="在运行的同时把结果增量写入文件，可多次指定。KIND 为 junit（JUnit XML）"
+             "或 jsonl（JSON 行）；指定后捕获每个测试的输出并写入报告"
+    )
+    
+    parser.add_argument(
+        "--list", "-l",
+        action="store_true",
+        help="只列出发现的测试ID（静态收集，不导入测试模块），不运行测试"
+    )
+    
+    parser.add_argument(
+        "--shard",
+        metavar="INDEX/TOTAL",
+        help="只运行指定分片的测试，例如 1/4（INDEX从1开始）；有耗时历史时按耗时均衡"
+    )
+    
+    parser.add_argument(
+        "--result-file",
+        help="把测试结果写入JSON文件，供 merge 子命令合并"
+    )
+    
+    parser.add_argument(
+        "--changed-since",
+        metavar="GIT_REF",
+        help="只运行直接或间接导入了相对该 git 引用修改过的文件的测试"
+    )
+    
+    parser.add_argument(
+        "--changed-files",
+        nargs="+",
+        metavar="FILE",
+        help="只运行直接或间接导入了这些文件的测试"
+    )
+    
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="运行后持续监视项目中的 .py 文件，修改后只重新运行导入了它们的测试文件"
+    )
+    
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="通过常驻守护进程 (py-auto-tester daemon) 运行测试；守护进程未运行时在本地运行"
+    )
+    
+    parser.add_argument(
+        "--socket",
+        default=DEFAULT_SOCKET,
+        help=f"守护进程的 Unix 套接字路径 (默认: {DEFAULT_SOCKET})"
+    )
+    
     parser.add_argument(
         "--template", "-t",
         help="为指定类名生成测试模板"
@@ -52,20 +563,63 @@ def main():
         help="从指定源文件读取类和函数，根据docstring生成测试文件"
     )
     
+    parser.add_argument(
+        "--from-dir",
+        metavar="DIR",
+        help="为目录（包）中的每个源文件生成测试文件，写入 --output 目录（默认为 --dir），"
+             "并行生成并跳过内容未变的文件"
+    )
+    
+    parser.add_argument(
+        "--run-docstrings",
+        metavar="PATH",
+        help="直接运行指定源文件docstring中的测试用例，不生成测试文件"
+    )
+    
     parser.add_argument(
         "--class-filter",
-        help="只为指定类生成测试（与--from-file一起使用）"
+        help="只为指定类生成或运行测试（与--from-file或--run-docstrings一起使用）"
     )
     
     parser.add_argument(
         "--output", "-o",
-        help="测试模板或生成的测试文件输出路径"
+        help="测试模板或生成的测试文件输出路径（--from-dir 时为输出目录）"
+    )
+    
+    parser.add_argument(
+        "--style",
+        choices=["unrolled", "table"],
+        default="unrolled",
+        help="生成测试的方式（与--from-file或--from-dir一起使用）: unrolled 为每个用例展开代码，"
+             "table 把用例存为数据表并用 subTest 逐个运行，每个失败的用例单独报告（默认: unrolled）"
     )
     
     parser.add_argument(
         "--coverage", "-c",
         action="store_true",
-        help="显示测试覆盖率信息"
+        help="运行测试的同时收集覆盖率，结束后显示每个文件的覆盖率和未覆盖的行"
+    )
+    
+    parser.add_argument(
+        "--cov-backend",
+        choices=["auto", "monitoring", "coverage"],
+        default="auto",
+        help="覆盖率后端: monitoring 基于 Python 3.12+ 的 sys.monitoring（开销低，不需要coverage包），"
+             "coverage 使用coverage包；auto 在 3.12+ 上使用前者 (默认: auto)"
+    )
+    
+    parser.add_argument(
+        "--cov-source",
+        action="append",
+        metavar="PATHS",
+        help="只统计这些目录或包的覆盖率（逗号分隔，可多次指定），默认为当前目录下除第三方包以外的代码"
+    )
+    
+    parser.add_argument(
+        "--minimize",
+        action="store_true",
+        help="按测试记录覆盖的行（隐含 --coverage），贪心地选出覆盖相同行的较小测试子集；"
+             "测试到行的映射导出到缓存目录的 coverage/test_lines.json"
     )
     
     parser.add_argument(
@@ -74,12 +628,53 @@ def main():
         version="py_auto_tester 0.2.0 (支持Python 3.7-3.12)"
     )
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    
+    if args.watch:
+        # 每次重新运行都重新选择受修改影响的测试，并且只在终端输出结果
+        unsupported = [flag for flag, value in (
+            ("--shard", args.shard), ("--last-failed", args.last_failed),
+            ("--time-budget", args.time_budget is not None),
+            ("--changed-since", args.changed_since),
+            ("--changed-files", args.changed_files),
+            ("--result-file", args.result_file),
+            ("--durations", args.durations is not None),
+            ("--rss-report", args.rss_report is not None),
+            ("--coverage", args.coverage), ("--minimize", args.minimize),
+        ) if value]
+        if unsupported:
+            parser.error(f"--watch 不能与 {', '.join(unsupported)} 一起使用")
+    
+    # 守护进程只处理普通的测试运行，其余功能仍在本地完成
+    if args.daemon and not (args.from_file or args.from_dir or args.run_docstrings
+                            or args.template or args.list or args.shard
+                            or args.result_file or args.coverage or args.watch
+                            or args.changed_since or args.changed_files
+                            or args.rss_report is not None
+                            or args.max_tests_per_worker or args.worker_memory_limit
+                            or args.worker_cpu_limit or args.timeout
+                            or args.file_timeout
+                            or args.last_failed or args.failed_first or args.exitfirst
+                            or args.time_budget is not None or args.minimize):
+        try:
+            code = _run_with_daemon(args)
+        except KeyboardInterrupt:
+            print("\n测试被用户中断")
+            return 130
+        if code is not None:
+            return code
+        print(f"无法连接守护进程 {args.socket}，改为在本地运行")
+    
+    from .core import AutoTester
+    from .report import (print_coverage_report, print_durations, print_minimize_report,
+                         print_rss_report)
+    from .shard import write_result_file
     
     # 创建AutoTester实例
     tester = AutoTester(
         test_directory=args.dir,
-        pattern=args.pattern
+        pattern=args.pattern,
+        exclude_dirs=args.exclude
     )
     
     try:
@@ -90,7 +685,8 @@ def main():
                 test_code = tester.generate_test_from_file(
                     source_file=args.from_file,
                     output_file=args.output,
-                    class_filter=args.class_filter
+                    class_filter=args.class_filter,
+                    style=args.style
                 )
                 if not args.output:
                     print("生成的测试代码:")
@@ -101,6 +697,35 @@ def main():
                 print(f"生成测试时发生错误: {e}")
                 return 1
         
+        # 为整个目录生成测试
+        if args.from_dir:
+            try:
+                stats = tester.generate_tests_from_dir(args.from_dir,
+                                                       output_dir=args.output,
+                                                       class_filter=args.class_filter,
+                                                       workers=args.workers,
+                                                       style=args.style)
+            except (OSError, ValueError) as e:
+                print(f"生成测试时发生错误: {e}")
+                return 1
+            for source, error in stats["errors"]:
+                print(f"  {source}: {error}")
+            print(f"生成了 {len(stats['generated'])} 个测试文件，{stats['unchanged']} 个源文件"
+                  f"未修改而跳过，{stats['no_cases']} 个没有docstring测试用例，"
+                  f"{len(stats['errors'])} 个出错，用时 {stats['elapsed']:.2f}s")
+            return 1 if stats["errors"] else 0
+        
+        # 直接运行docstring中的测试用例
+        if args.run_docstrings:
+            try:
+                results = tester.run_docstring_cases(args.run_docstrings,
+                                                     class_filter=args.class_filter,
+                                                     verbose=args.verbose)
+            except (OSError, SyntaxError, ValueError) as e:
+                print(f"运行docstring测试用例时发生错误: {e}")
+                return 1
+            return 1 if results["failed"] > 0 or results["errors"] > 0 else 0
+        
         # 生成测试模板
         if args.template:
             template = tester.generate_test_template(
@@ -113,27 +738,113 @@ def main():
                 print(template)
             return 0
         
+        changed_files = None
+        if args.changed_since or args.changed_files:
+            changed_files = list(args.changed_files or [])
+            if args.changed_since:
+                from .imports import git_changed_files
+                try:
+                    changed_files += git_changed_files(args.changed_since)
+                except ValueError as e:
+                    print(e)
+                    return 1
+        
         # 发现测试文件
         print(f"正在搜索测试文件: {args.dir}")
-        discovered = tester.discover_tests()
+        try:
+            discovered = tester.discover_tests(shard=args.shard,
+                                               changed_files=changed_files,
+                                               last_failed=args.last_failed,
+                                               time_budget=args.time_budget)
+        except ValueError as e:
+            print(e)
+            return 1
+        
+        if tester.change_selection is not None:
+            stats = tester.change_selection
+            print(f"按 {stats['changed_files']} 个修改文件选择: "
+                  f"选中 {stats['selected_tests']} 个测试 ({stats['selected_files']} 个文件), "
+                  f"跳过 {stats['skipped_tests']} 个测试 ({stats['skipped_files']} 个文件)")
+            if not discovered and os.path.exists(args.dir):
+                # 修改没有影响任何测试时不需要运行
+                if args.result_file:
+                    write_result_file(args.result_file, {}, shard=args.shard)
+                return 0
+        
+        if args.last_failed:
+            stats = tester.last_failed_selection
+            if stats is None:
+                print("没有上次失败的测试记录，运行全部测试")
+            else:
+                whole = ""
+                if stats["whole_files"]:
+                    whole = f", 其中 {stats['whole_files']} 个文件整体重新运行"
+                print(f"只运行上次失败的 {stats['selected_tests']} 个测试 "
+                      f"({stats['selected_files']} 个文件{whole})")
+        
+        if args.shard:
+            print(f"分片 {args.shard}: 选中 {len(discovered)} 个测试文件")
+            if not discovered and os.path.exists(args.dir):
+                # 分片数多于测试文件时，空分片是正常情况
+                if args.result_file:
+                    write_result_file(args.result_file, {}, shard=args.shard)
+                return 0
+        
+        if tester.budget_selection is not None:
+            stats = tester.budget_selection
+            print(f"时间预算 {stats['budget']:g} 秒: 选中 {stats['selected_tests']} 个测试 "
+                  f"(预计 {stats['estimated']:.1f} 秒), 推迟 {stats['deferred_tests']} 个测试 "
+                  f"(预计 {stats['deferred_estimated']:.1f} 秒)")
+            if not discovered and os.path.exists(args.dir):
+                print("预算内没有可以运行的测试")
+                if args.result_file:
+                    write_result_file(args.result_file, {}, shard=args.shard)
+                return 0
         
         if not discovered:
             print(f"在目录 '{args.dir}' 中未找到测试文件")
             print("请确保:")
             print("1. 测试目录存在")
-            print("2. 测试文件以 'test_' 开头并以 '.py' 结尾")
+            print(f"2. 测试文件名匹配模式 '{args.pattern}'")
             return 1
         
+        if args.list:
+            collected = tester.collect_tests(discovered)
+            total = 0
+            for test_file in discovered:
+                test_ids = tester.selected_tests.get(test_file) or collected[test_file]
+                excluded = set(tester.excluded_tests.get(test_file, ()))
+                if excluded:
+                    test_ids = [t for t in test_ids if t not in excluded]
+                elif not test_ids:
+                    print(f"{test_file} (无法静态识别其中的测试)")
+                for test_id in test_ids:
+                    print(test_id)
+                total += len(test_ids)
+            print(f"\n共 {total} 个测试, {len(discovered)} 个测试文件")
+            return 0
+        
         print(f"发现 {len(discovered)} 个测试文件:")
         for test_file in discovered:
             print(f"  - {test_file}")
         print()
         
+        if args.watch:
+            from .watch import Watcher
+            Watcher(tester, verbose=args.verbose, run_options=_run_options(args),
+                    report=args.report).run_forever()
+            return 0
+        
         # 运行测试
         print("运行测试...")
         print("=" * 60)
         
-        results = tester.run_tests(verbose=args.verbose)
+        reporters = _open_reporters(args.report)
+        try:
+            results = tester.run_tests(verbose=args.verbose, reporters=reporters,
+                                       **_run_options(args))
+        finally:
+            _close_reporters(reporters)
         
         print("=" * 60)
         print("测试结果统计:")
@@ -141,17 +852,30 @@ def main():
         print(f"  通过: {results['passed']}")
         print(f"  失败: {results['failed']}")
         print(f"  错误: {results['errors']}")
+        if tester.deferred_tests:
+            print(f"  推迟: {len(tester.deferred_tests)} "
+                  f"(列表见 {tester.budget_selection['deferred_file']})")
+        
+        if args.durations is not None:
+            print()
+            print_durations(results.get("tests", []), args.durations, sys.stdout)
         
-        # 显示覆盖率信息
-        if args.coverage:
+        if args.rss_report is not None:
+            print()
+            print_rss_report(results.get("files", []), args.rss_report, sys.stdout)
+        
+        if args.result_file:
+            write_result_file(args.result_file, results, shard=args.shard,
+                              test_files=discovered)
+            print(f"测试结果已写入: {args.result_file}")
+        
+        # 显示覆盖率信息（与测试在同一次运行中收集）
+        if (args.coverage or args.minimize) and results.get("coverage"):
             print("\n" + "=" * 60)
-            coverage_info = tester.get_test_coverage()
-            if coverage_info['coverage_available']:
-                print("覆盖率信息:")
-                print(coverage_info['message'])
-            else:
-                print("覆盖率信息不可用:")
-                print(coverage_info['message'])
+            print_coverage_report(results["coverage"], sys.stdout)
+            if args.minimize and "tests" in results["coverage"]:
+                print_minimize_report(tester.minimize_tests(results), sys.stdout)
+                print(f"测试到行的映射: {results['coverage']['test_lines_file']}")
         
         # 返回适当的退出代码
         if results['failed'] > 0 or results['errors'] > 0:
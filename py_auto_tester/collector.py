@@ -0,0 +1,185 @@
+"""
+不导入模块的静态测试收集
+
+用 ast 解析测试文件，找出 unittest.TestCase 的子类及其 test* 方法，
+生成与运行时一致的稳定测试ID。结果按文件内容哈希缓存，文件未修改时
+无需再次解析。
+"""
+
+import ast
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+from .runner import format_test_id, normalize_path
+
+
+CACHE_VERSION = 1
+
+# 与 unittest.TestLoader.testMethodPrefix 保持一致
+TEST_METHOD_PREFIX = "test"
+
+
+def _base_name(node: ast.expr) -> str:
+    """
+    取基类表达式的最后一段名称，例如 unittest.TestCase -> TestCase
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Subscript):
+        return _base_name(node.value)
+    return ""
+
+
+def collect_source(source: str) -> List[Dict[str, str]]:
+    """
+    从源代码中静态收集测试
+
+    名称以 "TestCase" 结尾的基类（unittest.TestCase、IsolatedAsyncioTestCase
+    以及常见框架的 TestCase）视为测试基类；同一文件中继承自测试类的类也是
+    测试类，并继承本文件中各基类和混入类的测试方法。类和方法按名称排序，
+    与 TestLoader 的顺序一致。
+
+    Args:
+        source: 测试文件的源代码
+
+    Returns:
+        测试列表，每项包含 class、method 和 lineno
+    """
+    tree = ast.parse(source)
+    classes = {}
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            methods = {}
+            for item in node.body:
+                if (isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))
+                        and item.name.startswith(TEST_METHOD_PREFIX)):
+                    methods[item.name] = item.lineno
+            classes[node.name] = ([_base_name(b) for b in node.bases], methods)
+
+    resolved = {}
+
+    def resolve(name, seen=()):
+        """返回 (是否为测试类, 全部测试方法)，包括从本文件中基类和混入类继承的方法"""
+        if name in resolved:
+            return resolved[name]
+        if name not in classes or name in seen:
+            return name.endswith("TestCase"), {}
+        bases, own_methods = classes[name]
+        is_test_case = False
+        methods = {}
+        for base in bases:
+            base_is_test, inherited = resolve(base, seen + (name,))
+            is_test_case = is_test_case or base_is_test
+            for method, lineno in inherited.items():
+                methods.setdefault(method, lineno)
+        methods.update(own_methods)
+        resolved[name] = (is_test_case, methods)
+        return resolved[name]
+
+    tests = []
+    for class_name in sorted(classes):
+        is_test_case, methods = resolve(class_name)
+        if not is_test_case:
+            continue
+        for method in sorted(methods):
+            tests.append({"class": class_name, "method": method,
+                          "lineno": methods[method]})
+    return tests
+
+
+class StaticCollector:
+    """
+    带哈希缓存的静态测试收集器
+    """
+
+    def __init__(self, cache_file: Optional[str] = None):
+        """
+        初始化收集器
+
+        Args:
+            cache_file: 缓存文件路径，None 表示不缓存
+        """
+        self.cache_file = cache_file
+        self._cache: Dict[str, Dict] = {}
+        self._dirty = False
+        self.stats = {"parsed": 0, "cached": 0}
+        if cache_file and os.path.exists(cache_file):
+            try:
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == CACHE_VERSION:
+                    self._cache = data.get("files", {})
+            except (OSError, ValueError):
+                self._cache = {}
+
+    def collect_file(self, test_file: str) -> List[Dict[str, str]]:
+        """
+        收集单个测试文件中的测试
+
+        Args:
+            test_file: 测试文件路径
+
+        Returns:
+            测试列表，每项包含 id、class、method 和 lineno；文件无法解析时为空列表
+        """
+        try:
+            with open(test_file, "rb") as f:
+                content = f.read()
+        except OSError:
+            return []
+
+        digest = hashlib.sha1(content).hexdigest()
+        key = normalize_path(test_file)
+        cached = self._cache.get(key)
+        if cached is not None and cached["hash"] == digest:
+            self.stats["cached"] += 1
+            tests = cached["tests"]
+        else:
+            self.stats["parsed"] += 1
+            try:
+                tests = collect_source(content.decode("utf-8"))
+            except (SyntaxError, UnicodeDecodeError, ValueError):
+                # 无法静态解析的文件交给运行时处理
+                tests = []
+            self._cache[key] = {"hash": digest, "tests": tests}
+            self._dirty = True
+
+        return [dict(test, id=format_test_id(test_file, test["class"], test["method"]))
+                for test in tests]
+
+    def collect(self, test_files: Iterable[str]) -> Dict[str, List[Dict[str, str]]]:
+        """
+        收集多个测试文件中的测试并保存缓存
+
+        Args:
+            test_files: 测试文件列表
+
+        Returns:
+            测试文件到其测试列表的映射
+        """
+        collected = {test_file: self.collect_file(test_file)
+                     for test_file in test_files}
+        self.save()
+        return collected
+
+    def save(self) -> None:
+        """
+        缓存有变化时写回磁盘
+        """
+        if not self.cache_file or not self._dirty:
+            return
+        directory = os.path.dirname(self.cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.cache_file + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "files": self._cache}, f)
+            os.replace(tmp_path, self.cache_file)
+            self._dirty = False
+        except OSError:
+            pass
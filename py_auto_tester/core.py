@@ -5,12 +5,38 @@
 import unittest
 import os
 import sys
-import importlib.util
-from typing import List, Optional, Dict, Any
+import time
+from typing import List, Optional, Dict, Any, Iterator, Set, Tuple
+import hashlib
 import inspect
+import itertools
+import multiprocessing
 import ast
+import json
 import re
 
+from .collector import StaticCollector
+from .cover import (CoverageCollector, clear_coverage_data, combine_coverage,
+                    coverage_available, minimize_tests, unavailable_message)
+from .discovery import DiscoveryIndex, compile_patterns
+from .history import (BUDGET_SCORE_CHANGED, BUDGET_SCORE_FAILED, BUDGET_SCORE_NEW,
+                      FailureHistory, TimingHistory, schedule_lpt, select_within_budget)
+from .imports import ImportGraph
+from .mutate import (MUTANT_SYMBOLS, iter_mutation_results, loaded_modules,
+                     summarize_mutants)
+from .parallel import ParallelRunner, default_worker_count
+from .report import STATUS_SYMBOLS, TRACEBACK_LIMIT, ConsoleReporter, ResultAggregator
+from .runner import (OUTPUT_MEMORY_LIMIT, iter_file_events, iter_suite_events,
+                     load_test_module, normalize_path, unload_test_module)
+from .shard import owner_shard, parse_shard, partition
+
+
+# 按目录生成测试时记录每个源文件哈希的清单文件名（位于 cache_dir 中）
+GENERATION_MANIFEST = "generated.json"
+
+# 生成测试代码的方式: unrolled 为每个用例展开一段代码，table 把用例存为模块级
+# 数据表，由测试方法循环运行（每个用例一个子测试）
+GENERATION_STYLES = ("unrolled", "table")
 
 
 class AutoTester:
@@ -20,86 +46,766 @@ class AutoTester:
     用于自动发现、执行和报告Python项目中的单元测试。
     """
     
-    def __init__(self, test_directory: str = "tests", pattern: str = "test_*.py"):
+    def __init__(self, test_directory: str = "tests", pattern: str = "test_*.py",
+                 cache_dir: str = ".py_auto_tester",
+                 exclude_dirs: Optional[List[str]] = None):
         """
         初始化AutoTester
         
         Args:
             test_directory: 测试文件所在目录，默认为"tests"
             pattern: 测试文件的命名模式，默认为"test_*.py"
+            cache_dir: 耗时历史等运行数据的缓存目录，默认为".py_auto_tester"
+            exclude_dirs: 发现测试时跳过的目录名模式，None 表示使用默认规则
+                （隐藏目录、虚拟环境、node_modules、构建产物等）
         """
         self.test_directory = test_directory
         self.pattern = pattern
+        self.cache_dir = cache_dir
+        self.exclude_dirs = exclude_dirs
         self.discovered_tests = []
+        # 测试文件 -> 要运行的测试ID列表；不在其中或值为 None 的文件运行全部测试
+        self.selected_tests: Dict[str, Optional[List[str]]] = {}
+        # 测试文件 -> 不运行的测试ID列表，只用于运行全部测试的文件。静态收集
+        # 不到的测试（例如继承自其他文件中基类的测试类）仍然会运行
+        self.excluded_tests: Dict[str, List[str]] = {}
+        self._discovery_index: Optional[DiscoveryIndex] = None
+        # 按修改文件选择测试时的统计信息
+        self.change_selection: Optional[Dict[str, int]] = None
+        # 只选择上次失败的测试时的统计信息，没有失败记录时为 None
+        self.last_failed_selection: Optional[Dict[str, int]] = None
+        # 按时间预算选择测试时的统计信息，以及被推迟的测试ID
+        self.budget_selection: Optional[Dict[str, Any]] = None
+        self.deferred_tests: List[str] = []
         
-    def discover_tests(self) -> List[str]:
+    def discover_tests(self, shard: Optional[str] = None,
+                       changed_files: Optional[List[str]] = None,
+                       last_failed: bool = False,
+                       time_budget: Optional[float] = None) -> List[str]:
         """
         自动发现测试文件
         
+        test_directory 也可以直接指向单个测试文件。
+        
+        Args:
+            shard: 分片说明 "INDEX/TOTAL"（INDEX从1开始），按静态收集的测试ID划分，
+                只保留属于该分片的测试（记录在 selected_tests 和 excluded_tests
+                中）。有耗时历史时按耗时均衡各分片，否则按数量均衡；每个文件中
+                静态收集不到的测试由 owner_shard 选出的分片运行
+            changed_files: 修改过的文件列表。指定时只保留直接或间接导入了其中
+                任一文件的测试文件（以及修改过的测试文件本身），在分片之前进行
+            last_failed: 只保留上次运行中失败的测试（记录在 selected_tests 中），
+                在分片之前进行。没有失败记录时保留全部测试
+            time_budget: 时间预算（秒）。指定时按耗时历史在预算内优先选择上次失败、
+                最近修改和从未运行过的测试（在分片之后进行），其余测试推迟，
+                推迟的测试ID写入 cache_dir/deferred.json
+        
         Returns:
             发现的测试文件列表
         """
         test_files = []
+        self.selected_tests = {}
+        self.excluded_tests = {}
+        self.last_failed_selection = None
+        self.budget_selection = None
+        self.deferred_tests = []
         
         if not os.path.exists(self.test_directory):
             print(f"警告: 测试目录 '{self.test_directory}' 不存在")
             return test_files
             
-        for root, dirs, files in os.walk(self.test_directory):
-            for file in files:
-                if file.startswith("test_") and file.endswith(".py"):
-                    test_files.append(os.path.join(root, file))
+        if os.path.isfile(self.test_directory):
+            # 直接指定单个测试文件
+            test_files = [self.test_directory]
+        else:
+            # 目录修改时间未变的子树直接复用上次的扫描结果；同一个实例多次发现时
+            # 索引保留在内存中
+            index = self._discovery_index
+            if (index is None or index.root != self.test_directory
+                    or index.pattern != self.pattern):
+                index = DiscoveryIndex(
+                    self.test_directory,
+                    pattern=self.pattern,
+                    exclude_dirs=self.exclude_dirs,
+                    index_file=os.path.join(self.cache_dir, "discovery.json"),
+                )
+                self._discovery_index = index
+            test_files = index.discover()
+        
+        if changed_files is not None:
+            test_files = self._select_changed(test_files, changed_files)
+        
+        if last_failed:
+            test_files = self._select_last_failed(test_files)
                     
+        if shard:
+            test_files = self._select_shard(test_files, shard)
+        
+        if time_budget is not None:
+            test_files = self._select_budget(test_files, time_budget)
+            
         self.discovered_tests = test_files
         return test_files
     
-    def run_tests(self, verbose: bool = True) -> Dict[str, Any]:
+    def collect_tests(self, test_files: Optional[List[str]] = None
+                      ) -> Dict[str, List[str]]:
+        """
+        静态收集测试ID，不导入任何测试模块
+        
+        Args:
+            test_files: 测试文件列表，默认为已发现的测试文件
+            
+        Returns:
+            测试文件到其测试ID列表的映射。无法静态识别测试的文件对应空列表
+        """
+        if test_files is None:
+            if not self.discovered_tests:
+                self.discover_tests()
+            test_files = self.discovered_tests
+        collector = StaticCollector(os.path.join(self.cache_dir, "collect.json"))
+        collected = collector.collect(test_files)
+        return {test_file: [test["id"] for test in tests]
+                for test_file, tests in collected.items()}
+    
+    def _candidate_tests(self, test_files: List[str]) -> Dict[str, List[str]]:
+        """
+        静态收集的测试ID，并按已有的选择缩小范围
+        
+        selected_tests 中列出的测试代替收集结果，excluded_tests 中的测试被去掉。
+        
+        Args:
+            test_files: 测试文件列表
+            
+        Returns:
+            测试文件到候选测试ID列表的映射
+        """
+        collected = self.collect_tests(test_files)
+        for test_file, test_ids in self.selected_tests.items():
+            if test_ids is not None:
+                collected[test_file] = test_ids
+        for test_file, excluded in self.excluded_tests.items():
+            if test_file in collected:
+                skip = set(excluded)
+                collected[test_file] = [test_id for test_id in collected[test_file]
+                                        if test_id not in skip]
+        return collected
+    
+    def _exclude(self, test_file: str, test_ids: List[str]) -> None:
+        """
+        把测试ID加入文件的 excluded_tests
+        """
+        excluded = set(self.excluded_tests.get(test_file, ())) | set(test_ids)
+        if excluded:
+            self.excluded_tests[test_file] = sorted(excluded)
+    
+    def _run_whole(self, test_file: str) -> bool:
+        """
+        文件是否运行了其中的全部测试（用于记录文件耗时）
+        """
+        return (self.selected_tests.get(test_file) is None
+                and not self.excluded_tests.get(test_file))
+    
+    def _select_changed(self, test_files: List[str],
+                        changed_files: List[str]) -> List[str]:
+        """
+        根据当前目录下项目的静态导入关系，选出受修改影响的测试文件
+        
+        Args:
+            test_files: 全部测试文件
+            changed_files: 修改过的文件
+            
+        Returns:
+            受影响的测试文件，统计信息记录在 change_selection 中
+        """
+        graph = ImportGraph(".", exclude_dirs=self.exclude_dirs,
+                            cache_file=os.path.join(self.cache_dir, "imports.json"))
+        graph.update()
+        selected = graph.affected_tests(changed_files, test_files)
+        
+        collected = self.collect_tests(test_files)
+        selected_tests = sum(len(collected[f]) for f in selected)
+        total_tests = sum(len(ids) for ids in collected.values())
+        self.change_selection = {
+            "changed_files": len(changed_files),
+            "selected_files": len(selected),
+            "skipped_files": len(test_files) - len(selected),
+            "selected_tests": selected_tests,
+            "skipped_tests": total_tests - selected_tests,
+        }
+        return selected
+    
+    def _select_last_failed(self, test_files: List[str]) -> List[str]:
+        """
+        选出上次运行中失败的测试，并把选中的测试记录到 selected_tests
+        
+        Args:
+            test_files: 全部测试文件
+            
+        Returns:
+            包含失败测试的测试文件；没有（仍然存在的）失败测试时返回全部文件
+        """
+        failures = FailureHistory(os.path.join(self.cache_dir, "lastfailed.json"))
+        selection = {}
+        if failures.failed:
+            selection = failures.select(self.collect_tests(test_files))
+        if not selection:
+            return test_files
+        self.selected_tests.update(selection)
+        self.last_failed_selection = {
+            "selected_files": len(selection),
+            "selected_tests": sum(len(ids) for ids in selection.values()
+                                  if ids is not None),
+            "whole_files": sum(1 for ids in selection.values() if ids is None),
+        }
+        return [test_file for test_file in test_files if test_file in selection]
+    
+    def _select_shard(self, test_files: List[str], shard: str) -> List[str]:
+        """
+        按测试ID选出指定分片，并把选中的测试记录到 selected_tests
+        
+        Args:
+            test_files: 全部测试文件
+            shard: 分片说明 "INDEX/TOTAL"
+            
+        Returns:
+            包含该分片测试的测试文件
+        """
+        index, total = parse_shard(shard)
+        collected = self._candidate_tests(test_files)
+        # 无法静态收集测试的文件整体作为一个划分单元
+        units = []
+        for test_file in test_files:
+            units.extend(collected[test_file] or [test_file])
+        
+        history = TimingHistory(os.path.join(self.cache_dir, "timings.json"))
+        estimates = None
+        if history.files or history.tests:
+            estimates = history.estimate_tests(collected)
+        chosen = set(partition(units, total, estimates)[index - 1])
+        
+        selected_files = []
+        for test_file in test_files:
+            test_ids = collected[test_file]
+            if not test_ids:
+                if test_file in chosen:
+                    selected_files.append(test_file)
+                    self.selected_tests[test_file] = None
+                continue
+            picked = [test_id for test_id in test_ids if test_id in chosen]
+            if (self.selected_tests.get(test_file) is None
+                    and owner_shard(test_file, total) == index):
+                # 静态收集可能漏掉测试（例如基类来自其他文件），其余部分由这个
+                # 分片运行: 运行整个文件，排除分给其他分片的测试
+                selected_files.append(test_file)
+                self._exclude(test_file, [test_id for test_id in test_ids
+                                          if test_id not in chosen])
+            elif picked:
+                selected_files.append(test_file)
+                self.selected_tests[test_file] = picked
+        return selected_files
+    
+    def _select_budget(self, test_files: List[str], budget: float) -> List[str]:
+        """
+        在时间预算内选出最值得运行的测试，并把选中的测试记录到 selected_tests
+        
+        上次失败的测试分值最高，其次是在上次运行之后修改过的测试文件中的测试，
+        再次是没有耗时记录（从未运行过）的测试；见 history.select_within_budget。
+        
+        Args:
+            test_files: 全部测试文件
+            budget: 时间预算（秒）
+            
+        Returns:
+            包含选中测试的测试文件，统计信息记录在 budget_selection 中
+        """
+        if budget < 0:
+            raise ValueError(f"时间预算不能为负数: {budget}")
+        collected = self._candidate_tests(test_files)
+        timings_path = os.path.join(self.cache_dir, "timings.json")
+        history = TimingHistory(timings_path)
+        failures = FailureHistory(os.path.join(self.cache_dir, "lastfailed.json"))
+        failed = failures.select(collected)
+        estimates = history.estimate_tests(collected)
+        try:
+            last_run = os.path.getmtime(timings_path)
+        except OSError:
+            last_run = None
+        
+        # 无法静态收集测试的文件整体作为一个选择单元，以文件路径为键
+        units, scores = {}, {}
+        for test_file in test_files:
+            test_ids = collected[test_file]
+            changed = False
+            if last_run is not None:
+                try:
+                    changed = os.path.getmtime(test_file) > last_run
+                except OSError:
+                    pass
+            for unit in test_ids or [test_file]:
+                units[unit] = estimates[unit]
+                score = 0
+                failed_ids = failed.get(test_file, ())
+                if test_file in failed and (failed_ids is None or unit in failed_ids):
+                    score += BUDGET_SCORE_FAILED
+                if changed:
+                    score += BUDGET_SCORE_CHANGED
+                if test_ids:
+                    known = unit in history.tests
+                else:
+                    known = normalize_path(unit) in history.files
+                if not known:
+                    score += BUDGET_SCORE_NEW
+                scores[unit] = score
+        chosen, deferred = select_within_budget(units, scores, budget)
+        
+        chosen_set = set(chosen)
+        selected_files = []
+        for test_file in test_files:
+            test_ids = collected[test_file]
+            if not test_ids:
+                if test_file in chosen_set:
+                    selected_files.append(test_file)
+                    self.selected_tests[test_file] = None
+                continue
+            picked = [test_id for test_id in test_ids if test_id in chosen_set]
+            if picked and self.selected_tests.get(test_file) is None:
+                # 与分片相同: 运行整个文件并排除推迟的测试，静态收集不到的测试
+                # 随选中的测试一起运行
+                selected_files.append(test_file)
+                self._exclude(test_file, [test_id for test_id in test_ids
+                                          if test_id not in chosen_set])
+            elif picked:
+                selected_files.append(test_file)
+                self.selected_tests[test_file] = picked
+        
+        self.deferred_tests = deferred
+        deferred_file = os.path.join(self.cache_dir, "deferred.json")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(deferred_file, "w", encoding="utf-8") as f:
+            json.dump({"budget": budget, "deferred": deferred}, f, indent=1)
+        self.budget_selection = {
+            "budget": budget,
+            "estimated": sum(units[unit] for unit in chosen),
+            "selected_tests": len(chosen),
+            "deferred_tests": len(deferred),
+            "deferred_estimated": sum(units[unit] for unit in deferred),
+            "deferred_file": deferred_file,
+        }
+        return selected_files
+    
+    def _build_tasks(self, history: TimingHistory, workers: int):
+        """
+        把要运行的测试组织成并行任务，并按LPT顺序排列
+        
+        一般每个文件一个任务；估算耗时超过平均每个进程负载的文件按测试类
+        拆分成多个任务，避免一个大文件拖慢整体完成时间。拆分的文件另有一个
+        排除全部已收集测试的任务，运行静态收集不到的测试（例如继承自其他
+        文件中基类的测试类）。
+        
+        Args:
+            history: 耗时历史
+            workers: 工作进程数
+            
+        Returns:
+            (任务列表, 对应的估算耗时, 预测的总完成时间, 静态收集的测试总数)。
+            任务为 (测试文件, 要运行的测试ID列表, 要排除的测试ID)
+        """
+        collected = self._candidate_tests(self.discovered_tests)
+        file_estimates = history.estimate_files(self.discovered_tests)
+        test_estimates = history.estimate_tests(collected)
+        target = sum(file_estimates.values()) / workers
+        
+        tasks, estimates = [], []
+        for test_file in self.discovered_tests:
+            test_ids = collected.get(test_file) or []
+            selection = self.selected_tests.get(test_file)
+            classes = {}
+            for test_id in test_ids:
+                classes.setdefault(test_id.split("::")[1], []).append(test_id)
+            excluded = tuple(self.excluded_tests.get(test_file, ()))
+            if file_estimates[test_file] > target and len(classes) > 1:
+                for class_ids in classes.values():
+                    tasks.append((test_file, class_ids, ()))
+                    estimates.append(sum(test_estimates[t] for t in class_ids))
+                if selection is None:
+                    tasks.append((test_file, None, excluded + tuple(test_ids)))
+                    estimates.append(max(0.0, file_estimates[test_file] - sum(
+                        test_estimates[t] for t in test_ids)))
+            elif selection is not None:
+                tasks.append((test_file, selection, ()))
+                estimates.append(sum(test_estimates[t] for t in selection))
+            elif excluded:
+                tasks.append((test_file, None, excluded))
+                estimates.append(sum(test_estimates[t]
+                                     for t in test_ids or [test_file]))
+            else:
+                tasks.append((test_file, None, ()))
+                estimates.append(file_estimates[test_file])
+        
+        order, predicted = schedule_lpt(dict(enumerate(estimates)), workers)
+        expected_tests = sum(len(ids) for ids in collected.values())
+        return ([tasks[i] for i in order], [estimates[i] for i in order],
+                predicted, expected_tests)
+    
+    def _build_failed_first_tasks(self, history: TimingHistory,
+                                  failures: FailureHistory):
+        """
+        把要运行的测试组织成任务: 上次失败的测试在前，其余测试按估算耗时从短到长
+        
+        包含失败测试的文件拆成两个任务，先只运行失败的测试，再运行其余的测试。
+        
+        Args:
+            history: 耗时历史
+            failures: 失败记录
+            
+        Returns:
+            (任务列表, 对应的估算耗时, 静态收集的测试总数)。任务为
+            (测试文件, 要运行的测试ID列表, 要排除的测试ID)
+        """
+        collected = self._candidate_tests(self.discovered_tests)
+        file_estimates = history.estimate_files(self.discovered_tests)
+        test_estimates = history.estimate_tests(collected)
+        failed = failures.select(collected)
+        
+        first, rest = [], []
+        for test_file in self.discovered_tests:
+            selection = self.selected_tests.get(test_file)
+            excluded = tuple(self.excluded_tests.get(test_file, ()))
+            if selection is None and not excluded:
+                estimate = file_estimates[test_file]
+            else:
+                estimate = sum(test_estimates[t]
+                               for t in collected[test_file] or [test_file])
+            failed_ids = failed.get(test_file, ())
+            if test_file in failed and failed_ids is None:
+                # 失败记录不是单个测试（例如模块加载失败），整个文件优先运行
+                first.append(((test_file, selection, excluded), estimate))
+            elif failed_ids:
+                failed_estimate = sum(test_estimates[t] for t in failed_ids)
+                first.append(((test_file, failed_ids, ()), failed_estimate))
+                rest.append(((test_file, selection, excluded + tuple(failed_ids)),
+                             max(0.0, estimate - failed_estimate)))
+            else:
+                rest.append(((test_file, selection, excluded), estimate))
+        rest.sort(key=lambda item: item[1])
+        ordered = first + rest
+        return ([task for task, _ in ordered], [estimate for _, estimate in ordered],
+                sum(len(ids) for ids in collected.values()))
+    
+    def iter_results(self, workers: Optional[int] = None,
+                     preload: Optional[List[str]] = None,
+                     trace_memory: bool = False,
+                     capture_output: bool = False,
+                     output_limit: int = OUTPUT_MEMORY_LIMIT,
+                     evict_modules: bool = False,
+                     collect_garbage: bool = False,
+                     max_tests_per_worker: Optional[int] = None,
+                     worker_memory_limit: Optional[int] = None,
+                     worker_cpu_limit: Optional[float] = None,
+                     timeout: Optional[float] = None,
+                     file_timeout: Optional[float] = None,
+                     failed_first: bool = False,
+                     exitfirst: bool = False,
+                     coverage: bool = False,
+                     coverage_source: Optional[List[str]] = None,
+                     coverage_backend: str = "auto",
+                     coverage_contexts: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        运行发现的测试，在测试进行的同时逐个产出结果事件
+        
+        每个事件是一个带 event 字段的字典:
+        
+        - run_start: 开始运行，包含 files（测试文件数）和 workers
+        - start: 测试开始，包含 id、file、description
+        - pass/fail/error/skip/xfail/xpass: 测试结果，包含 id、file、description、
+          status、duration、cpu_time，以及 traceback、reason、memory_peak、
+          stdout、stderr 等
+        - timing: 一个测试文件运行结束，包含 file、duration、tests_run、load_error，
+          以及运行结束后进程的常驻内存 rss 和相比运行前的增长 rss_delta（字节）
+        - progress: 并行模式下的进度，包含 tests、expected、eta
+        - summary: 最后一个事件，包含 total、passed、failed、errors、elapsed，
+          并行模式下还有 workers、schedule、preload，以及替换工作进程的次数 respawned；
+          exitfirst 提前停止时还有 stopped，收集覆盖率时还有 coverage
+        
+        并行模式下事件来自各个工作进程，按到达父进程的顺序产出。参数含义与
+        run_tests 相同。
+        
+        Returns:
+            事件的迭代器
+        """
+        if not self.discovered_tests:
+            self.discover_tests()
+        
+        history = TimingHistory(os.path.join(self.cache_dir, "timings.json"))
+        failures = FailureHistory(os.path.join(self.cache_dir, "lastfailed.json"))
+        file_durations: Dict[str, float] = {}
+        file_options = {"trace_memory": trace_memory, "capture_output": capture_output,
+                        "output_limit": output_limit, "evict_modules": evict_modules,
+                        "collect_garbage": collect_garbage, "timeout": timeout,
+                        "file_timeout": file_timeout}
+        
+        coverage_dir = None
+        coverage_summary: Optional[Dict[str, Any]] = None
+        if coverage:
+            if coverage_available(coverage_backend):
+                coverage_dir = os.path.join(self.cache_dir, "coverage")
+                clear_coverage_data(coverage_dir)
+            else:
+                coverage_summary = {"coverage_available": False,
+                                    "message": unavailable_message(coverage_backend)}
+        
+        if workers == 0:
+            workers = default_worker_count()
+        worker_limits = {"max_tests_per_worker": max_tests_per_worker,
+                         "worker_memory_limit": worker_memory_limit,
+                         "worker_cpu_limit": worker_cpu_limit}
+        # 工作进程的限制只能在子进程中执行，超时的测试也可能需要终止进程，
+        # 指定时即使只有一个进程也使用并行模式
+        isolated = (preload is not None or any(worker_limits.values())
+                    or bool(timeout or file_timeout))
+        parallel = bool(self.discovered_tests) and (
+            isolated or (workers is not None and workers > 1
+                         and len(self.discovered_tests) > 1))
+        if parallel:
+            workers = workers or 1
+            yield {"event": "run_start", "files": len(self.discovered_tests),
+                   "workers": workers}
+            if failed_first:
+                tasks, estimates, expected_tests = self._build_failed_first_tasks(
+                    history, failures)
+                predicted = None
+            else:
+                # 按历史耗时从长到短分派，减少最后只剩一个进程在运行的情况
+                tasks, estimates, predicted, expected_tests = self._build_tasks(
+                    history, workers)
+            runner = ParallelRunner(workers=workers, verbose=False, preload=preload,
+                                    exitfirst=exitfirst, coverage_dir=coverage_dir,
+                                    coverage_source=coverage_source,
+                                    coverage_backend=coverage_backend,
+                                    coverage_contexts=coverage_contexts,
+                                    **file_options, **worker_limits)
+            events = runner.iter_events(tasks, predicted_makespan=predicted,
+                                        estimates=estimates,
+                                        expected_tests=expected_tests)
+            for event in events:
+                if event["event"] == "summary" and coverage:
+                    # 此时所有工作进程都已退出，数据文件已写完
+                    if coverage_dir is not None:
+                        coverage_summary = self._combine_coverage(
+                            coverage_dir, coverage_source, coverage_backend,
+                            coverage_contexts)
+                    event["coverage"] = coverage_summary
+                self._track_timing(history, event, file_durations)
+                failures.record(event)
+                yield event
+        else:
+            yield {"event": "run_start", "files": len(self.discovered_tests),
+                   "workers": 1}
+            if failed_first:
+                tasks = self._build_failed_first_tasks(history, failures)[0]
+            else:
+                tasks = [(test_file, self.selected_tests.get(test_file),
+                          tuple(self.excluded_tests.get(test_file, ())))
+                         for test_file in self.discovered_tests]
+            counter = ResultAggregator(keep_details=False)
+            collector = None
+            if coverage_dir is not None:
+                collector = CoverageCollector(coverage_dir, coverage_source,
+                                              coverage_backend,
+                                              contexts=coverage_contexts)
+                collector.start()
+                if coverage_contexts:
+                    file_options["coverage_context"] = collector.switch_context
+            start_time = time.perf_counter()
+            stopped = False
+            for test_file, test_ids, exclude_ids in tasks:
+                events = iter_file_events(test_file, test_ids, exclude_ids=exclude_ids,
+                                          **file_options)
+                for event in events:
+                    counter.add(event)
+                    self._track_timing(history, event, file_durations)
+                    failures.record(event)
+                    yield event
+                    if exitfirst and event["event"] in ("fail", "error"):
+                        stopped = True
+                        break
+                if stopped:
+                    # 结束文件的运行（执行模块清理），其余的测试不再运行
+                    events.close()
+                    break
+            summary = dict(counter.counts(), event="summary",
+                           elapsed=time.perf_counter() - start_time)
+            if stopped:
+                summary["stopped"] = True
+            if collector is not None:
+                collector.stop()
+                coverage_summary = self._combine_coverage(
+                    coverage_dir, coverage_source, coverage_backend, coverage_contexts)
+            if coverage:
+                summary["coverage"] = coverage_summary
+            yield summary
+        
+        for test_file, duration in file_durations.items():
+            history.record_file(test_file, duration)
+        history.save()
+        failures.save()
+    
+    def run_tests(self, verbose: bool = True, workers: Optional[int] = None,
+                  preload: Optional[List[str]] = None,
+                  trace_memory: bool = False,
+                  capture_output: bool = False,
+                  reporters: Optional[List[Any]] = None,
+                  output_limit: int = OUTPUT_MEMORY_LIMIT,
+                  traceback_limit: Optional[int] = TRACEBACK_LIMIT,
+                  evict_modules: bool = False,
+                  collect_garbage: bool = False,
+                  max_tests_per_worker: Optional[int] = None,
+                  worker_memory_limit: Optional[int] = None,
+                  worker_cpu_limit: Optional[float] = None,
+                  timeout: Optional[float] = None,
+                  file_timeout: Optional[float] = None,
+                  failed_first: bool = False,
+                  exitfirst: bool = False,
+                  coverage: bool = False,
+                  coverage_source: Optional[List[str]] = None,
+                  coverage_backend: str = "auto",
+                  coverage_contexts: bool = False) -> Dict[str, Any]:
         """
         运行发现的测试
         
+        基于 iter_results 实现: 结果在测试进行的同时输出到标准错误，运行结束后
+        返回汇总。
+        
         Args:
             verbose: 是否显示详细输出
+            workers: 并行工作进程数。None 或 1 表示在当前进程中串行运行，
+                0 表示使用全部CPU核心，大于1时按文件（耗时长的文件按测试类）
+                分片到进程池中运行。测试模块只在实际运行它的进程中导入
+            preload: 预加载模块列表。指定时使用"zygote"模式: 当前进程先导入这些
+                共享依赖，再为每个测试文件 fork 一个全新的子进程运行
+            trace_memory: 是否用 tracemalloc 记录每个测试的内存分配峰值（会明显
+                拖慢测试），不启用时只记录墙钟和CPU耗时
+            capture_output: 是否像 unittest 的 buffer 选项一样捕获每个测试的
+                标准输出和标准错误。捕获的内容只附加在失败和错误上（结果事件的
+                stdout/stderr 字段和返回值的 outputs），不回显到终端
+            reporters: 额外的结果输出（例如 reporters 模块中的 JUnitReporter），
+                每个事件都会交给它们的 handle 方法；由调用方负责关闭
+            output_limit: 捕获输出时每个流在内存中最多保留的字符数（只保留最后
+                的部分），超出时完整输出写入临时文件
+            traceback_limit: failures/error_details 中每条回溯保存的最大字符数，
+                None 表示不截断
+            evict_modules: 内存受限模式。测试模块在文件运行结束后总会被释放；
+                启用后还会淘汰运行期间新导入的项目模块（第三方依赖除外），使
+                长时间运行的内存占用基本不随测试文件数增长，代价是后续文件需要
+                重新导入这些模块
+            collect_garbage: 是否在每个文件运行结束后执行 gc.collect()
+            max_tests_per_worker: 每个工作进程最多运行的测试数，达到后在任务边界
+                换用新进程
+            worker_memory_limit: 每个工作进程的内存上限（字节）。通过
+                resource.setrlimit 限制地址空间，测试结束后常驻内存超出上限时也
+                记为错误
+            worker_cpu_limit: 每个工作进程运行一个任务的 CPU 时间上限（秒）
+            
+            后三项在子进程中执行，指定任一项时即使 workers 为 None 或 1 也在
+            工作进程中运行。触发内存或 CPU 限制的测试记为错误，该进程运行完当前
+            任务后被替换，其余测试照常运行。
+            
+            timeout: 每个测试的默认超时时间（秒），可被 @timeout 装饰器和
+                __timeout__ 属性覆盖（见 timeouts 模块）。超时的测试记为错误，
+                错误信息包含所有线程的调用栈
+            file_timeout: 每个测试文件的超时时间（秒），超时后该文件其余的测试
+                不再运行
+            
+            指定超时时在工作进程中运行: 超时后仍无法中断的测试由看门狗终止
+            进程，文件中其余的测试在新进程中继续运行。
+            
+            failed_first: 先运行上次失败的测试，再按历史耗时从短到长运行其余的
+                测试。每次运行后失败的测试ID都记录在 cache_dir/lastfailed.json 中
+            exitfirst: 遇到第一个失败或错误后停止运行（并行模式下终止所有工作进程）
+            coverage: 是否在运行测试的同时收集覆盖率。并行
+                模式下每个工作进程写入自己的数据文件（cache_dir/coverage），结束后
+                合并；汇总放在返回值的 coverage 中，格式见 get_test_coverage
+            coverage_source: 只统计这些目录或包中的代码，None 表示当前目录下除
+                标准库和第三方包以外的全部代码
+            coverage_backend: 覆盖率后端。"monitoring" 基于 Python 3.12+ 的
+                sys.monitoring，每行只在第一次执行时产生开销；"coverage" 使用
+                coverage 包；"auto"（默认）在 3.12+ 上使用前者，否则使用后者
+            coverage_contexts: 是否按测试记录覆盖的行（每个测试每个文件一个位数组）。
+                coverage 汇总中另有 tests（测试ID到 {文件: [行号]} 的映射），同时
+                导出到 cache_dir/coverage/test_lines.json（test_lines_file），供
+                选择测试的工具直接使用；导入模块和类级夹具执行的行不属于任何测试
             
         Returns:
-            测试结果统计信息
+            测试结果统计信息。failures/error_details 中的元素为 (测试ID, 回溯) 元组，
+            outputs 为失败测试ID到捕获输出（stdout/stderr）的映射；
+            tests 为每个测试的 id、status、duration（墙钟秒数）、cpu_time 以及
+            memory_peak（字节，仅 trace_memory 时）；files 为每个文件的 file、
+            duration、rss 和 rss_delta
         """
         if not self.discovered_tests:
             self.discover_tests()
             
         if not self.discovered_tests:
             return {"total": 0, "passed": 0, "failed": 0, "errors": 0}
-            
-        loader = unittest.TestLoader()
-        suite = unittest.TestSuite()
         
-        # 加载所有测试
-        for test_file in self.discovered_tests:
-            try:
-                # 将文件路径转换为模块名
-                module_name = os.path.splitext(os.path.basename(test_file))[0]
-                spec = importlib.util.spec_from_file_location(module_name, test_file)
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
-                
-                # 加载测试用例
-                tests = loader.loadTestsFromModule(module)
-                suite.addTests(tests)
-                
-            except Exception as e:
-                print(f"加载测试文件 {test_file} 时出错: {e}")
-                
-        # 运行测试
-        runner = unittest.TextTestRunner(verbosity=2 if verbose else 1)
-        result = runner.run(suite)
-        
-        return {
-            "total": result.testsRun,
-            "passed": result.testsRun - len(result.failures) - len(result.errors),
-            "failed": len(result.failures),
-            "errors": len(result.errors),
-            "failures": result.failures,
-            "error_details": result.errors
-        }
+        outputs = [ConsoleReporter(verbose, traceback_limit=traceback_limit)]
+        outputs += list(reporters or [])
+        aggregator = ResultAggregator(traceback_limit=traceback_limit)
+        for event in self.iter_results(workers=workers, preload=preload,
+                                       trace_memory=trace_memory,
+                                       capture_output=capture_output,
+                                       output_limit=output_limit,
+                                       evict_modules=evict_modules,
+                                       collect_garbage=collect_garbage,
+                                       max_tests_per_worker=max_tests_per_worker,
+                                       worker_memory_limit=worker_memory_limit,
+                                       worker_cpu_limit=worker_cpu_limit,
+                                       timeout=timeout, file_timeout=file_timeout,
+                                       failed_first=failed_first, exitfirst=exitfirst,
+                                       coverage=coverage,
+                                       coverage_source=coverage_source,
+                                       coverage_backend=coverage_backend,
+                                       coverage_contexts=coverage_contexts):
+            for output in outputs:
+                output.handle(event)
+            aggregator.add(event)
+        return aggregator.results()
+    
+    def _combine_coverage(self, coverage_dir: str, source: Optional[List[str]],
+                          backend: str, contexts: bool) -> Dict[str, Any]:
+        """
+        合并覆盖率数据，按测试记录时把测试到行的映射导出为 test_lines.json
+        """
+        summary = combine_coverage(coverage_dir, source, backend, contexts=contexts)
+        if contexts:
+            path = os.path.join(coverage_dir, "test_lines.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"backend": summary["backend"], "tests": summary["tests"]}, f,
+                          ensure_ascii=False)
+            summary["test_lines_file"] = path
+        return summary
+    
+    def _track_timing(self, history: TimingHistory, event: Dict[str, Any],
+                      file_durations: Dict[str, float]) -> None:
+        """
+        把一个事件中的耗时记入耗时历史
+        
+        Args:
+            history: 耗时历史
+            event: 结果事件
+            file_durations: 累加每个文件的总耗时（包括导入时间），只统计运行了
+                整个文件的任务；一个文件拆成多个任务时各任务的耗时相加
+        """
+        kind = event["event"]
+        if kind == "timing":
+            test_file = event["file"]
+            if self._run_whole(test_file):
+                file_durations[test_file] = (file_durations.get(test_file, 0.0)
+                                             + event["duration"])
+        elif kind in STATUS_SYMBOLS:
+            # 子测试和夹具错误不是独立的测试，不单独记录
+            if not (event.get("subtest") or event.get("fixture")):
+                history.record_test(event["id"], event["duration"])
     
     def generate_test_template(self, class_name: str, output_file: Optional[str] = None) -> str:
         """
@@ -164,7 +870,8 @@ if __name__ == '__main__':
         return template
     
     def generate_test_from_file(self, source_file: str, output_file: Optional[str] = None, 
-                               class_filter: Optional[str] = None) -> str:
+                                class_filter: Optional[str] = None,
+                                style: str = "unrolled") -> str:
         """
         从源文件读取类和函数，根据函数注释中的测试用例生成测试文件
         
@@ -172,10 +879,141 @@ if __name__ == '__main__':
             source_file: 源代码文件路径
             output_file: 输出测试文件路径，如果为None则返回测试代码字符串
             class_filter: 只为指定类生成测试，如果为None则为所有类生成测试
+            style: "unrolled"（默认）为每个用例展开一段代码；"table" 把用例存为
+                模块级数据表，测试方法用 subTest 逐个运行，每个失败的用例单独报告，
+                用例很多时生成的文件也小得多，编译和导入更快
             
         Returns:
             生成的测试代码字符串
         """
+        if style not in GENERATION_STYLES:
+            raise ValueError(f"未知的生成方式: {style}（可选 {', '.join(GENERATION_STYLES)}）")
+        classes_info = self._load_docstring_cases(source_file, class_filter)
+        
+        # 生成测试代码
+        test_code = self._generate_test_code_from_classes(classes_info, source_file,
+                                                          style)
+        
+        if output_file:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(test_code)
+            print(f"测试文件已生成: {output_file}")
+            
+        return test_code
+    
+    def run_docstring_cases(self, source_file: str, class_filter: Optional[str] = None,
+                            verbose: bool = False,
+                            reporters: Optional[List[Any]] = None) -> Dict[str, Any]:
+        """
+        直接运行源文件函数注释中的测试用例，不生成测试文件
+        
+        与 generate_test_from_file 解析相同的用例，但在内存中为每个类构造
+        unittest.TestCase 子类并立即运行，省去生成代码、写文件和重新导入测试
+        文件的步骤。每个方法是一个测试，其中的每个用例是一个子测试；与生成的
+        代码一样每个测试方法使用一个新的实例，检查的内容也相同: 动态参数在源模块
+        的命名空间中求值，@attr=value 在调用前设置属性，attr=value 检查调用后的
+        属性（只支持普通属性名）。
+        
+        Args:
+            source_file: 源代码文件路径
+            class_filter: 只运行指定类的用例，None 表示所有类
+            verbose: 是否显示详细输出
+            reporters: 额外的结果输出，与 run_tests 相同
+            
+        Returns:
+            测试结果统计信息，格式与 run_tests 相同；测试ID的路径部分为源文件
+        """
+        classes_info = self._load_docstring_cases(source_file, class_filter)
+        source_dir = os.path.dirname(os.path.abspath(source_file))
+        added_path = source_dir not in sys.path
+        if added_path:
+            # 与生成的测试文件相同，源文件可以导入同目录下的其他模块；运行结束后移除
+            sys.path.insert(0, source_dir)
+        module = None
+        try:
+            module = load_test_module(source_file)
+            loader = unittest.TestLoader()
+            suite = unittest.TestSuite(
+                loader.loadTestsFromTestCase(self._build_docstring_test_class(
+                    module, class_name, class_info))
+                for class_name, class_info in classes_info.items())
+            
+            outputs = [ConsoleReporter(verbose)] + list(reporters or [])
+            aggregator = ResultAggregator()
+            start_time = time.perf_counter()
+            run_start = {"event": "run_start", "files": 1, "workers": 1}
+            events = iter_suite_events(suite, source_file)
+            for event in itertools.chain([run_start], events):
+                for output in outputs:
+                    output.handle(event)
+                aggregator.add(event)
+            summary = dict(aggregator.counts(), event="summary",
+                           elapsed=time.perf_counter() - start_time)
+            for output in outputs:
+                output.handle(summary)
+            aggregator.add(summary)
+        finally:
+            if module is not None:
+                unload_test_module(module)
+            if added_path and source_dir in sys.path:
+                sys.path.remove(source_dir)
+        return aggregator.results()
+    
+    def _build_docstring_test_class(self, module: Any, class_name: str,
+                                    class_info: Dict) -> type:
+        """
+        为一个类的 docstring 用例构造 TestCase 子类
+        
+        Args:
+            module: 已加载的源模块
+            class_name: 被测类名
+            class_info: _extract_classes_and_functions 提取的类信息
+            
+        Returns:
+            名为 Test{class_name} 的 TestCase 子类
+        """
+        namespace = vars(module)
+        
+        def setUp(test):
+            # 嵌套类等无法从模块直接访问的类在这里出错，与生成的代码一致
+            test.test_obj = getattr(module, class_name)()
+        
+        def make_test(method_name, test_cases):
+            cases = [self._case_row(test_case) for test_case in test_cases]
+            
+            def test_method(test):
+                _run_case_table(test, method_name, cases, namespace)
+            test_method.__doc__ = f"测试 {method_name} 方法 - 基于docstring"
+            return test_method
+        
+        attrs = {"setUp": setUp, "__module__": module.__name__,
+                 "__doc__": f"{class_name}类的docstring测试用例"}
+        for method_name, method_info in class_info['methods'].items():
+            attrs[f"test_{method_name}"] = make_test(method_name,
+                                                     method_info['test_cases'])
+        return type(f"Test{class_name}", (unittest.TestCase,), attrs)
+    
+    @staticmethod
+    def _case_row(test_case: Dict[str, Any]) -> Tuple[Any, ...]:
+        """
+        把解析出的用例转换为数据表中的一行，格式见 _run_case_table
+        """
+        return (test_case.get('raw_line', ''), test_case.get('inputs', ()),
+                test_case.get('expected'), test_case.get('init_attrs', {}),
+                test_case.get('check_attrs', {}))
+    
+    def _load_docstring_cases(self, source_file: str,
+                              class_filter: Optional[str] = None) -> Dict[str, Dict]:
+        """
+        解析源文件，提取各类中带 docstring 用例的方法
+        
+        Args:
+            source_file: 源代码文件路径
+            class_filter: 只保留指定的类，None 表示所有类
+            
+        Returns:
+            类名到类信息的字典，格式见 _extract_classes_and_functions
+        """
         if not os.path.exists(source_file):
             raise FileNotFoundError(f"源文件不存在: {source_file}")
             
@@ -201,16 +1039,108 @@ if __name__ == '__main__':
                 raise ValueError(f"在文件 {source_file} 中未找到类 {class_filter}")
             else:
                 raise ValueError(f"在文件 {source_file} 中未找到任何类")
+        return classes_info
+    
+    def generate_tests_from_dir(self, source_dir: str, output_dir: Optional[str] = None,
+                                class_filter: Optional[str] = None,
+                                workers: Optional[int] = None,
+                                style: str = "unrolled") -> Dict[str, Any]:
+        """
+        为目录（包）中的每个源文件生成测试文件
         
-        # 生成测试代码
-        test_code = self._generate_test_code_from_classes(classes_info, source_file)
+        源文件按发现测试时的规则剪除目录（测试文件本身除外），在进程池中并行
+        解析和生成，每个源模块 a/b/mod.py 生成 output_dir/a/b/test_mod.py。
+        每个源文件内容的 SHA-256 记录在 cache_dir/generated.json 中，内容和
+        输出文件都没有变化的源文件直接跳过；class_filter、output_dir 或 style
+        变化后全部重新生成。
         
-        if output_file:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(test_code)
-            print(f"测试文件已生成: {output_file}")
+        Args:
+            source_dir: 源代码目录
+            output_dir: 测试文件输出目录，默认为 test_directory
+            class_filter: 只为指定类生成测试
+            workers: 进程数，None 或 1 表示在当前进程中生成，0 表示使用全部CPU核心
+            style: 生成方式，见 generate_test_from_file
             
-        return test_code
+        Returns:
+            统计信息: generated（生成的测试文件路径）、unchanged（未修改而跳过的
+            源文件数）、no_cases（没有docstring用例的源文件数）、errors（(源文件,
+            错误信息) 列表）、elapsed 和清单文件 manifest
+        """
+        start_time = time.perf_counter()
+        if not os.path.isdir(source_dir):
+            raise FileNotFoundError(f"源目录不存在: {source_dir}")
+        output_dir = output_dir or self.test_directory
+        if workers == 0:
+            workers = default_worker_count()
+        
+        test_regex = compile_patterns([self.pattern])
+        output_root = os.path.abspath(output_dir) + os.sep
+        index = DiscoveryIndex(source_dir, "*.py", self.exclude_dirs)
+        sources = [path for path in index.discover()
+                   if not test_regex.match(os.path.basename(path))
+                   and not os.path.abspath(path).startswith(output_root)]
+        
+        manifest_file = os.path.join(self.cache_dir, GENERATION_MANIFEST)
+        options = {"output_dir": normalize_path(output_dir),
+                   "class_filter": class_filter, "style": style}
+        try:
+            with open(manifest_file, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        entries = {}
+        if manifest.get("options") == options:
+            entries = manifest.get("files", {})
+        
+        jobs = []
+        files: Dict[str, Dict[str, Any]] = {}
+        unchanged = no_cases = 0
+        for source in sources:
+            with open(source, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            relative = os.path.relpath(source, source_dir)
+            output = os.path.join(output_dir, os.path.dirname(relative),
+                                  f"test_{os.path.basename(relative)}")
+            key = normalize_path(source)
+            entry = entries.get(key)
+            if (entry is not None and entry["hash"] == digest
+                    and (entry["output"] is None or os.path.exists(entry["output"]))):
+                files[key] = entry
+                unchanged += 1
+            else:
+                jobs.append((source, output, class_filter, style, digest))
+        
+        if workers and workers > 1 and len(jobs) > 1:
+            # 文件很多时每次分派一批，减少进程间通信
+            chunksize = max(1, len(jobs) // (workers * 8))
+            with multiprocessing.Pool(min(workers, len(jobs))) as pool:
+                results = list(pool.imap_unordered(_generate_test_file, jobs,
+                                                   chunksize))
+        else:
+            results = [_generate_test_file(job) for job in jobs]
+        
+        generated = []
+        errors = []
+        for result in results:
+            if result["status"] == "error":
+                errors.append((result["source"], result["error"]))
+                continue
+            if result["status"] == "generated":
+                generated.append(result["output"])
+            else:
+                no_cases += 1
+            files[normalize_path(result["source"])] = {"hash": result["hash"],
+                                                       "output": result["output"]}
+        
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = manifest_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"options": options, "files": files}, f, indent=1)
+        os.replace(tmp_path, manifest_file)
+        return {"generated": sorted(generated), "unchanged": unchanged,
+                "no_cases": no_cases, "errors": sorted(errors),
+                "elapsed": time.perf_counter() - start_time,
+                "manifest": manifest_file}
     
     def _extract_classes_and_functions(self, tree: ast.AST, source_code: str) -> Dict[str, Dict]:
         """
@@ -286,10 +1216,11 @@ if __name__ == '__main__':
             match = re.match(r'\s*\((.*?)\)\s*->\s*\(([^)]+)\)\s*((?:@[^@&]+)*)', line)
             if not match:
                 # 尝试简单格式: (args) -> result
-                simple_match = re.match(r'\s*\((.*?)\)\s*->\s*([^@#]+?)(?:\s*[@#]|$)', line)
+                simple_match = re.match(
+                    r'\s*\((.*?)\)\s*->\s*([^@#]+?)\s*((?:@[^@#]*)*)(?:#|$)', line)
                 if simple_match:
-                    inputs_str, result_str = simple_match.groups()
-                    match = (inputs_str, result_str.strip(), '')
+                    inputs_str, result_str, init_part = simple_match.groups()
+                    match = (inputs_str, result_str.strip(), init_part)
                 else:
                     continue
             else:
@@ -388,13 +1319,16 @@ if __name__ == '__main__':
             # 如果不是字面值，返回原始字符串
             return value_str
     
-    def _generate_test_code_from_classes(self, classes_info: Dict[str, Dict], source_file: str) -> str:
+    def _generate_test_code_from_classes(self, classes_info: Dict[str, Dict],
+                                         source_file: str,
+                                         style: str = "unrolled") -> str:
         """
         根据类信息生成测试代码
         
         Args:
             classes_info: 类信息字典
             source_file: 源文件路径
+            style: 生成方式，见 generate_test_from_file
             
         Returns:
             生成的测试代码
@@ -431,8 +1365,22 @@ except ImportError as e:
         
         # 为每个类生成测试
         test_classes = []
+        if style == "table":
+            # 数据表和运行用例的函数放在模块级，测试方法只有一行
+            imports += '\n' + inspect.getsource(_run_case_table) + '\n\n'
+        # 生成的名称互不相同，也不遮盖 import * 导入的被测类
+        used_names = set(classes_info)
         for class_name, class_info in classes_info.items():
-            test_class_code = self._generate_test_class_code(class_name, class_info)
+            test_name = self._unique_name(f"Test{class_name}", used_names)
+            if style == "table":
+                snake_name = re.sub(r'(?<=[a-z0-9])(?=[A-Z])', '_', class_name)
+                table_name = self._unique_name(snake_name.upper() + '_CASES',
+                                               used_names)
+                test_class_code = self._generate_table_class_code(
+                    class_name, class_info, test_name, table_name)
+            else:
+                test_class_code = self._generate_test_class_code(
+                    class_name, class_info, test_name)
             test_classes.append(test_class_code)
         
         # 组合完整的测试代码
@@ -444,17 +1392,33 @@ if __name__ == '__main__':
         
         return full_test_code
     
-    def _generate_test_class_code(self, class_name: str, class_info: Dict) -> str:
+    @staticmethod
+    def _unique_name(name: str, used_names: Set[str]) -> str:
+        """
+        与已使用的名称冲突时加数字后缀（_2、_3 ...），并记入 used_names
+        """
+        unique = name
+        suffix = 2
+        while unique in used_names:
+            unique = f"{name}_{suffix}"
+            suffix += 1
+        used_names.add(unique)
+        return unique
+    
+    def _generate_test_class_code(self, class_name: str, class_info: Dict,
+                                  test_name: Optional[str] = None) -> str:
         """
         为单个类生成测试代码
         
         Args:
             class_name: 类名
             class_info: 类信息
+            test_name: 测试类名，None 表示 Test{class_name}
             
         Returns:
             类的测试代码
         """
+        test_name = test_name or f"Test{class_name}"
         test_methods = []
         
         for method_name, method_info in class_info['methods'].items():
@@ -463,7 +1427,7 @@ if __name__ == '__main__':
             )
             test_methods.append(test_method_code)
         
-        test_class_template = f'''class Test{class_name}(unittest.TestCase):
+        test_class_template = f'''class {test_name}(unittest.TestCase):
     """
     {class_name}类的自动生成测试用例
     """
@@ -484,6 +1448,53 @@ if __name__ == '__main__':
         
         return test_class_template
     
+    def _generate_table_class_code(self, class_name: str, class_info: Dict,
+                                   test_name: str, table_name: str) -> str:
+        """
+        为单个类生成数据表形式的测试代码
+        
+        Args:
+            class_name: 类名
+            class_info: 类信息
+            test_name: 测试类名
+            table_name: 用例数据表的变量名
+            
+        Returns:
+            用例数据表和测试类的代码
+        """
+        rows = []
+        methods = []
+        for method_name, method_info in class_info['methods'].items():
+            rows.append(f"    {method_name!r}: [")
+            rows.extend(f"        {self._case_row(test_case)!r},"
+                        for test_case in method_info['test_cases'])
+            rows.append("    ],")
+            methods.append(f'''
+    def test_{method_name}(self):
+        """
+        测试 {method_name} 方法 - 基于docstring自动生成
+        """
+        _run_case_table(self, {method_name!r}, {table_name}[{method_name!r}], globals())
+''')
+        
+        return f'''# {class_name} 的docstring用例，每行为 (原始行, 参数, 期望值, 初始属性, 检查属性)
+{table_name} = {{
+{chr(10).join(rows)}
+}}
+
+
+class {test_name}(unittest.TestCase):
+    """
+    {class_name}类的自动生成测试用例
+    """
+    
+    def setUp(self):
+        """
+        测试前的设置
+        """
+        self.test_obj = {class_name}()
+{"".join(methods)}'''
+    
     def _generate_test_method_code(self, class_name: str, method_name: str, test_cases: List[Dict]) -> str:
         """
         为单个方法生成测试代码
@@ -509,20 +1520,24 @@ if __name__ == '__main__':
         # 测试用例 {case_num}: {test_case.get('raw_line', '')}
         '''
             
-            # 设置初始属性
+            # 设置初始属性（与 _run_case_table 相同，只支持普通属性名）
             if test_case.get('init_attrs'):
                 case_code += '''
         # 设置初始属性'''
                 for attr, value in test_case['init_attrs'].items():
-                    case_code += f'''
-        # TODO: 设置 {attr} = {value}'''
+                    if attr.isidentifier():
+                        case_code += f'''
+        self.test_obj.{attr} = {repr(value)}'''
+                    else:
+                        case_code += f'''
+        # 跳过 {attr}（只支持普通属性名）'''
             
             # 调用方法
             if test_case.get('dynamic_inputs'):
+                # 动态参数是在模块命名空间中求值的元组表达式
+                inputs = self._case_expression(test_case['inputs'])
                 case_code += f'''
-        # 动态输入参数: {test_case['inputs']}
-        # TODO: 实现动态参数解析
-        result = self.test_obj.{method_name}()  # 请根据实际情况调整参数'''
+        result = self.test_obj.{method_name}(*{inputs})'''
             else:
                 inputs = test_case.get('inputs', ())
                 if inputs:
@@ -540,21 +1555,32 @@ if __name__ == '__main__':
                     type_name = expected[5:].strip()
                     case_code += f'''
         # 检查返回值类型
-        self.assertIsInstance(result, {type_name}, f"用例{case_num}: 期望类型 {type_name}, 实际得到 {{type(result).__name__}}")'''
+        self.assertIsInstance(result, {self._case_expression(type_name)},
+                              f"用例{case_num}: 期望类型 {type_name}, "
+                              f"实际得到 {{type(result).__name__}}")'''
                 else:
+                    # 期望值放进 f-string 的消息里，花括号要转义
+                    message = repr(expected).replace('{', '{{').replace('}', '}}')
                     case_code += f'''
         # 检查返回值
-        self.assertEqual(result, {repr(expected)}, f"用例{case_num}: 期望 {repr(expected)}, 实际得到 {{result}}")'''
+        self.assertEqual(result, {repr(expected)},
+                         f"用例{case_num}: 期望 {message}, 实际得到 {{result!r}}")'''
             
             # 检查属性
             if test_case.get('check_attrs'):
                 case_code += '''
         # 检查属性值'''
                 for attr, expected_value in test_case['check_attrs'].items():
+                    if not attr.isidentifier():
+                        case_code += f'''
+        # 跳过 {attr}（只支持普通属性名）'''
+                        continue
+                    message = repr(expected_value).replace('{', '{{').replace('}', '}}')
                     case_code += f'''
-        # TODO: 检查属性 {attr} = {expected_value}
-        # actual_value = getattr(self.test_obj, '{attr}', None)
-        # self.assertEqual(actual_value, {repr(expected_value)}, f"用例{case_num}: 期望属性{attr}={repr(expected_value)}, 实际得到 {{actual_value}}")'''
+        actual_value = getattr(self.test_obj, {attr!r}, None)
+        self.assertEqual(actual_value, {repr(expected_value)},
+                         f"用例{case_num}: 期望属性{attr}={message}, "
+                         f"实际得到 {{actual_value!r}}")'''
             
             test_code_parts.append(case_code)
         
@@ -570,26 +1596,220 @@ if __name__ == '__main__':
         
         return method_template
     
-    def get_test_coverage(self) -> Dict[str, Any]:
+    @staticmethod
+    def _case_expression(text: str) -> str:
         """
-        获取测试覆盖率信息（需要安装coverage包）
+        把用例中的表达式（动态参数、type: 后的类型名）写入生成的代码
         
-        Returns:
-            覆盖率信息字典
+        不是合法表达式时生成 eval 调用，错误只在运行该用例时出现，与数据表方式
+        相同，而不是让整个测试文件无法导入。
         """
         try:
-            import coverage
-            cov = coverage.Coverage()
-            cov.start()
-            
-            # 运行测试
-            self.run_tests(verbose=False)
+            ast.parse(text, mode='eval')
+        except SyntaxError:
+            return f"eval({text!r}, globals())"
+        return text
+    
+    def get_test_coverage(self, source: Optional[List[str]] = None,
+                          backend: str = "auto",
+                          **run_options: Any) -> Dict[str, Any]:
+        """
+        运行测试并收集覆盖率
+        
+        只运行一遍测试。已经用 run_tests(coverage=True) 运行过时，直接从其
+        返回值的 coverage 字段取得同样的结果，不必再调用本方法。
+        
+        Args:
+            source: 只统计这些目录或包中的代码，None 表示当前目录下除标准库和
+                第三方包以外的全部代码
+            backend: 覆盖率后端。Python 3.12+ 上默认使用内置的 sys.monitoring
+                后端（不需要coverage包），更早的版本使用coverage包
+            **run_options: 传给 run_tests 的其他参数（workers 等），verbose 默认为 False
             
-            cov.stop()
-            cov.save()
+        Returns:
+            覆盖率信息字典: coverage_available、message，可用时还有实际使用的
+            backend、statements、missing、percent（总体覆盖率），以及每个文件的 file、statements、
+            missing、percent、missing_lines（未覆盖的行，例如 "3-5, 9"）组成的 files
+        """
+        if not coverage_available(backend):
+            return {"coverage_available": False,
+                    "message": unavailable_message(backend)}
+        run_options.setdefault("verbose", False)
+        results = self.run_tests(coverage=True, coverage_source=source,
+                                 coverage_backend=backend, **run_options)
+        info = results.get("coverage")
+        if info is None:
+            return {"coverage_available": True, "message": "没有运行任何测试", "files": [],
+                    "statements": 0, "missing": 0, "percent": 100.0}
+        return info
+    
+    def mutate(self, source_file: str, workers: Optional[int] = None,
+               verbose: bool = False, backend: str = "auto") -> Dict[str, Any]:
+        """
+        对源文件进行变异测试
+        
+        先在当前进程中运行一遍测试并按测试收集源文件的覆盖率，再逐个运行变体:
+        每个变体只运行覆盖了被修改语句的测试，遇到第一个失败即停止。变体在内存中
+        应用到已导入的模块上，不改写源文件（见 mutate 模块）。上次运行失败的测试
+        不用于判断变体。
+        
+        Args:
+            source_file: 被测源文件
+            workers: 并行运行变体的进程数，None 或 1 表示在当前进程中运行，0 表示
+                使用全部CPU核心
+            verbose: 是否逐个显示变体结果，否则每个变体显示一个符号
+            backend: 覆盖率后端，见 cover.resolve_backend
             
-            # 获取覆盖率报告
-            return {"coverage_available": True, "message": "使用coverage.py查看详细报告"}
+        Returns:
+            summarize_mutants 的汇总，另有 source、baseline_failures（运行失败而
+            未使用的测试）和 elapsed
+        """
+        if not coverage_available(backend):
+            raise RuntimeError(unavailable_message(backend))
+        if workers == 0:
+            workers = default_worker_count()
+        source_path = os.path.abspath(source_file)
+        start_time = time.perf_counter()
+        results = self.run_tests(verbose=False, coverage=True,
+                                 coverage_source=[os.path.dirname(source_path)],
+                                 coverage_backend=backend, coverage_contexts=True)
+        failing = {entry["id"] for entry in results.get("tests", [])
+                   if entry["status"] in ("fail", "error")}
+        test_lines = {}
+        for test_id, files in (results.get("coverage") or {}).get("tests", {}).items():
+            if test_id in failing:
+                continue
+            for filename, lines in files.items():
+                if os.path.abspath(filename) == source_path:
+                    test_lines[test_id] = lines
+        if test_lines and not loaded_modules(source_path):
+            raise RuntimeError(f"测试结束后找不到已导入的 {source_file} 模块")
+        durations = {entry["id"]: entry.get("duration") or 0.0
+                     for entry in results.get("tests", [])}
+        
+        mutants = []
+        stream = sys.stderr
+        for mutant in iter_mutation_results(source_path, test_lines,
+                                            self.discovered_tests, durations, workers):
+            if mutant["status"] == "invalid":
+                continue
+            mutants.append(mutant)
+            if verbose:
+                killed_by = f" ({mutant['killed_by']})" if mutant["killed_by"] else ""
+                stream.write(f"{source_file}:{mutant['line']}  "
+                             f"{mutant['description']} ... "
+                             f"{mutant['status']}{killed_by}\n")
+            else:
+                stream.write(MUTANT_SYMBOLS[mutant["status"]])
+            stream.flush()
+        if not verbose:
+            stream.write("\n")
+        summary = summarize_mutants(mutants)
+        summary.update(source=source_file, baseline_failures=sorted(failing),
+                       elapsed=time.perf_counter() - start_time)
+        return summary
+    
+    def minimize_tests(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        从按测试记录覆盖率的运行结果中选出覆盖相同语句的一个较小的测试子集
+        
+        贪心地每次选择新增覆盖语句最多的测试（相同时选耗时更短的），结果写入
+        cache_dir/coverage/minimized.json。没有覆盖任何统计范围内语句的测试
+        总是可以省略。
+        
+        Args:
+            results: run_tests(coverage=True, coverage_contexts=True) 的返回值
             
-        except ImportError:
-            return {"coverage_available": False, "message": "请安装coverage包以获取覆盖率信息"}
\ No newline at end of file
+        Returns:
+            selected（选出的测试ID）、redundant（可以省略的测试ID）、lines（这些
+            测试覆盖的语句数）、duration 和 selected_duration（全部和选出的测试
+            上次运行的耗时，秒）以及结果文件 file
+        """
+        coverage = results.get("coverage") or {}
+        if "tests" not in coverage:
+            raise ValueError("运行结果中没有按测试记录的覆盖率（需要 coverage_contexts=True）")
+        test_lines = coverage["tests"]
+        durations = {entry["id"]: entry.get("duration") or 0.0
+                     for entry in results.get("tests", [])}
+        selected = minimize_tests(test_lines, durations)
+        chosen = set(selected)
+        redundant = sorted(test_id for test_id in set(durations) | set(test_lines)
+                           if test_id not in chosen)
+        lines = len({(filename, line) for files in test_lines.values()
+                     for filename, covered in files.items() for line in covered})
+        path = os.path.join(self.cache_dir, "coverage", "minimized.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"lines": lines, "selected": selected, "redundant": redundant}, f,
+                      indent=1, ensure_ascii=False)
+        return {"selected": selected, "redundant": redundant, "lines": lines,
+                "duration": sum(durations.values()),
+                "selected_duration": sum(durations.get(test_id, 0.0)
+                                         for test_id in selected),
+                "file": path}
+
+
+def _generate_test_file(
+        job: Tuple[str, str, Optional[str], str, str]) -> Dict[str, Any]:
+    """
+    为一个源文件生成测试文件（generate_tests_from_dir 的进程池任务）
+    
+    Returns:
+        source、hash、status（generated、no_cases 或 error）、output（没有生成
+        文件时为 None）和 error
+    """
+    source, output, class_filter, style, digest = job
+    result = {"source": source, "hash": digest, "status": "generated", "output": output,
+              "error": None}
+    try:
+        test_code = AutoTester().generate_test_from_file(source,
+                                                         class_filter=class_filter,
+                                                         style=style)
+    except (OSError, SyntaxError, UnicodeDecodeError) as e:
+        result.update(status="error", output=None, error=str(e))
+        return result
+    except ValueError:
+        # 文件中没有带 docstring 用例的类
+        result.update(status="no_cases", output=None)
+        return result
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(test_code)
+    return result
+
+
+def _run_case_table(test, method_name, cases, namespace):
+    """
+    逐个运行一个方法的docstring用例，每个用例是一个子测试
+
+    cases 的每一行为 (原始行, 参数, 期望值, 初始属性, 检查属性)。参数为字符串时
+    是在 namespace 中求值的表达式；期望值为 "type:类型名" 时检查返回值的类型；
+    初始属性在调用前设置，检查属性在调用后比较（只支持普通属性名）。
+    table 方式生成的测试文件包含本函数的源码，可以独立运行。
+    """
+    obj = test.test_obj
+    for case_num, case in enumerate(cases, 1):
+        raw_line, inputs, expected, init_attrs, check_attrs = case
+        with test.subTest(case=case_num):
+            for attr, value in init_attrs.items():
+                if attr.isidentifier():
+                    setattr(obj, attr, value)
+            if isinstance(inputs, str):
+                inputs = eval(inputs, namespace)
+            result = getattr(obj, method_name)(*inputs)
+            if isinstance(expected, str) and expected.startswith("type:"):
+                type_name = expected[5:].strip()
+                test.assertIsInstance(result, eval(type_name, namespace),
+                                      f"用例{case_num}: 期望类型 {type_name}, "
+                                      f"实际得到 {type(result).__name__}")
+            else:
+                test.assertEqual(result, expected,
+                                 f"用例{case_num}: 期望 {expected!r}, 实际得到 {result!r}")
+            for attr, value in check_attrs.items():
+                if attr.isidentifier():
+                    actual = getattr(obj, attr, None)
+                    test.assertEqual(actual, value,
+                                     f"用例{case_num}: 期望属性{attr}={value!r}, "
+                                     f"实际得到 {actual!r}")
@@ -0,0 +1,627 @@
+"""
+在运行测试的同时收集覆盖率，并在结束后合并为按文件的汇总
+
+有两个后端:
+
+- monitoring: Python 3.12+ 内置的 sys.monitoring。每一行第一次执行时记录到
+  该文件的位数组中，随后返回 DISABLE 关闭这一行的事件，因此已覆盖的代码
+  不再有任何额外开销；不需要 coverage 包
+- coverage: coverage 包（pip install py_auto_tester[coverage]），基于
+  sys.settrace 的行跟踪，用于更早的解释器
+
+默认 (auto) 在 Python 3.12+ 上使用 monitoring，否则使用 coverage。
+
+串行模式下在当前进程中收集；并行模式下每个工作进程写入自己的数据文件，
+每个任务结束后保存一次，运行结束后由父进程合并。
+"""
+
+import ast
+import glob
+import heapq
+import importlib.util
+import json
+import os
+import sys
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+
+# coverage 后端的数据文件基本名，各进程的数据文件在其后附加后缀
+DATA_FILE_NAME = ".coverage"
+
+# monitoring 后端的数据文件基本名，合并后的数据文件为 .covbits.json
+BITS_FILE_NAME = ".covbits"
+
+BACKENDS = ("auto", "monitoring", "coverage")
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 没有指定 source 时不统计本工具自身的代码
+_OMIT = [os.path.join(_PACKAGE_DIR, "*")]
+
+
+def _coverage_installed() -> bool:
+    try:
+        import coverage  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_backend(backend: str = "auto") -> Optional[str]:
+    """
+    确定实际使用的覆盖率后端
+
+    Args:
+        backend: "auto"、"monitoring" 或 "coverage"
+
+    Returns:
+        "monitoring" 或 "coverage"，指定的后端在当前环境中不可用时为 None
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的覆盖率后端: {backend}（可选 {', '.join(BACKENDS)}）")
+    if backend == "auto":
+        backend = "monitoring" if hasattr(sys, "monitoring") else "coverage"
+    if backend == "monitoring":
+        return backend if hasattr(sys, "monitoring") else None
+    return backend if _coverage_installed() else None
+
+
+def coverage_available(backend: str = "auto") -> bool:
+    """
+    指定的覆盖率后端在当前环境中是否可用
+    """
+    return resolve_backend(backend) is not None
+
+
+def unavailable_message(backend: str = "auto") -> str:
+    """
+    后端不可用时的提示信息
+    """
+    if backend == "monitoring":
+        return "monitoring 覆盖率后端需要 Python 3.12 及以上版本"
+    return "请安装coverage包以获取覆盖率信息"
+
+
+def _new_coverage(data_dir: str, source: Optional[Sequence[str]], suffix: bool):
+    import coverage
+    return coverage.Coverage(data_file=os.path.join(data_dir, DATA_FILE_NAME),
+                             data_suffix=suffix or None,
+                             source=list(source) if source else None,
+                             omit=None if source else _OMIT)
+
+
+def clear_coverage_data(data_dir: str) -> None:
+    """
+    删除上次运行留下的数据文件
+    """
+    for name in (DATA_FILE_NAME, BITS_FILE_NAME):
+        for path in glob.glob(os.path.join(data_dir, name + "*")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class SourceFilter:
+    """
+    判断一个源文件是否需要统计覆盖率（monitoring 后端）
+
+    指定 source 时只统计其中的目录、文件或包；否则与 coverage 的默认规则类似，
+    统计当前目录下除标准库、已安装的第三方包和本工具以外的代码。
+    """
+
+    def __init__(self, source: Optional[Sequence[str]] = None):
+        """
+        初始化过滤器
+
+        Args:
+            source: 目录、文件路径或包名列表
+        """
+        self.roots = ([self._locate(entry) for entry in source] if source
+                      else [os.getcwd()])
+        prefixes = (sys.prefix, sys.base_prefix, sys.exec_prefix)
+        self._excluded = [_PACKAGE_DIR] + sorted({os.path.abspath(path)
+                                                  for path in prefixes})
+        self._cache: Dict[str, bool] = {}
+
+    @staticmethod
+    def _locate(entry: str) -> str:
+        if os.path.exists(entry):
+            return os.path.abspath(entry)
+        spec = importlib.util.find_spec(entry)
+        if spec is None:
+            return os.path.abspath(entry)
+        if spec.submodule_search_locations:
+            return os.path.abspath(list(spec.submodule_search_locations)[0])
+        return os.path.abspath(spec.origin)
+
+    @staticmethod
+    def _inside(path: str, root: str) -> bool:
+        return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+    def __call__(self, filename: str) -> bool:
+        measured = self._cache.get(filename)
+        if measured is None:
+            path = os.path.abspath(filename)
+            measured = (filename.endswith(".py")
+                        and any(self._inside(path, root) for root in self.roots)
+                        and not any(self._inside(path, excluded)
+                                    and not self._inside(root, excluded)
+                                    for excluded in self._excluded
+                                    for root in self.roots)
+                        and "site-packages" not in path and "dist-packages" not in path)
+            self._cache[filename] = measured
+        return measured
+
+    def source_files(self) -> List[str]:
+        """
+        source 中的全部 .py 文件，用于报告从未导入过的文件
+        """
+        files = []
+        for root in self.roots:
+            if os.path.isfile(root):
+                files.append(root)
+                continue
+            for current, dirs, names in os.walk(root):
+                dirs[:] = [d for d in dirs
+                           if not d.startswith(".") and d != "__pycache__"]
+                files.extend(os.path.join(current, name) for name in names
+                             if self(os.path.join(current, name)))
+        return files
+
+
+class LineMonitor:
+    """
+    用 sys.monitoring 记录执行过的行，每个文件一个位数组（第 n 位表示第 n 行）
+
+    每一行第一次触发 LINE 事件时置位并返回 DISABLE，之后这一行不再产生事件；
+    不需要统计的文件的每一行也只触发一次。按测试记录时（switch），每个测试
+    开始时重新启用全部行事件，使每一行在每个测试中各触发一次，同时记录到
+    该测试自己的位数组中。
+    """
+
+    # 依次尝试的工具ID，COVERAGE_ID 已被占用时（例如 coverage 包使用了
+    # sys.monitoring）改用空闲的ID
+    TOOL_IDS = (1, 3, 4)
+
+    def __init__(self, measure: SourceFilter):
+        """
+        初始化行监视器
+
+        Args:
+            measure: 判断文件是否需要统计的过滤器
+        """
+        self.measure = measure
+        self.hits: Dict[str, bytearray] = {}
+        # 测试ID -> {文件名: 位数组}，只包含 switch 之后运行的测试
+        self.tests: Dict[str, Dict[str, bytearray]] = {}
+        self._current: Optional[Dict[str, bytearray]] = None
+        self._tool_id: Optional[int] = None
+
+    def start(self) -> None:
+        """
+        开始记录
+        """
+        monitoring = sys.monitoring
+        for tool_id in self.TOOL_IDS:
+            try:
+                monitoring.use_tool_id(tool_id, "py_auto_tester")
+            except ValueError:
+                continue
+            self._tool_id = tool_id
+            break
+        else:
+            raise RuntimeError("sys.monitoring 没有空闲的工具ID")
+        monitoring.register_callback(self._tool_id, monitoring.events.LINE,
+                                     self._on_line)
+        monitoring.set_events(self._tool_id, monitoring.events.LINE)
+        # 重新启用此前（例如上一次收集时）被关闭的行事件
+        monitoring.restart_events()
+
+    def stop(self) -> None:
+        """
+        停止记录
+        """
+        if self._tool_id is None:
+            return
+        monitoring = sys.monitoring
+        monitoring.set_events(self._tool_id, 0)
+        monitoring.register_callback(self._tool_id, monitoring.events.LINE, None)
+        monitoring.free_tool_id(self._tool_id)
+        self._tool_id = None
+
+    def switch(self, test_id: Optional[str]) -> None:
+        """
+        此后执行的行同时记录到指定测试的位数组中
+
+        Args:
+            test_id: 测试ID，None 表示不属于任何测试（例如导入模块和类级夹具）
+        """
+        if test_id is None:
+            self._current = None
+            return
+        self._current = self.tests.setdefault(test_id, {})
+        if self._tool_id is not None:
+            sys.monitoring.restart_events()
+
+    def _on_line(self, code, line_number):
+        filename = code.co_filename
+        bits = self.hits.get(filename)
+        if bits is None:
+            if not self.measure(filename):
+                return sys.monitoring.DISABLE
+            bits = self.hits[filename] = bytearray()
+        _set_bit(bits, line_number)
+        if self._current is not None:
+            test_bits = self._current.get(filename)
+            if test_bits is None:
+                test_bits = self._current[filename] = bytearray()
+            _set_bit(test_bits, line_number)
+        return sys.monitoring.DISABLE
+
+
+def _set_bit(bits: bytearray, line_number: int) -> None:
+    index = line_number >> 3
+    if index >= len(bits):
+        bits.extend(bytes(index + 1 - len(bits)))
+    bits[index] |= 1 << (line_number & 7)
+
+
+def _bits_to_lines(bits: bytes) -> Set[int]:
+    return {index * 8 + bit for index, byte in enumerate(bits) if byte
+            for bit in range(8) if byte >> bit & 1}
+
+
+def _or_bits(left: bytes, right: bytes) -> bytearray:
+    if len(left) < len(right):
+        left, right = right, left
+    merged = bytearray(left)
+    for index, byte in enumerate(right):
+        merged[index] |= byte
+    return merged
+
+
+class CoverageCollector:
+    """
+    在一个进程中收集覆盖率，数据写入 data_dir 下该进程自己的数据文件
+    """
+
+    def __init__(self, data_dir: str, source: Optional[Sequence[str]] = None,
+                 backend: str = "auto", contexts: bool = False):
+        """
+        初始化覆盖率收集器
+
+        Args:
+            data_dir: 数据文件所在目录
+            source: 只统计这些目录或包中的代码，None 表示当前目录下除标准库和
+                已安装的第三方包以外的代码
+            backend: 覆盖率后端，见 resolve_backend
+            contexts: 是否按测试记录执行过的行（见 switch_context）
+        """
+        self.data_dir = data_dir
+        self.source = source
+        self.contexts = contexts
+        self.backend = resolve_backend(backend)
+        if self.backend is None:
+            raise RuntimeError(unavailable_message(backend))
+        self._cov = None
+        self._monitor: Optional[LineMonitor] = None
+        self._bits_file: Optional[str] = None
+        self._chunks = 0
+
+    def start(self) -> None:
+        """
+        开始收集
+        """
+        os.makedirs(self.data_dir, exist_ok=True)
+        if self.backend == "monitoring":
+            self._monitor = LineMonitor(SourceFilter(self.source))
+            self._bits_file = os.path.join(
+                self.data_dir, f"{BITS_FILE_NAME}.{os.getpid()}.{uuid.uuid4().hex[:8]}")
+            self._monitor.start()
+        else:
+            self._cov = _new_coverage(self.data_dir, self.source, suffix=True)
+            self._cov.start()
+
+    def save(self) -> None:
+        """
+        把目前收集的数据写入数据文件后继续收集，进程之后被强制终止时只丢失
+        此后的数据
+        """
+        if self._monitor is not None:
+            self._write_monitor()
+        elif self._cov is not None:
+            self._cov.stop()
+            self._cov.save()
+            self._cov.start()
+
+    def switch_context(self, test_id: Optional[str]) -> None:
+        """
+        切换当前测试，此后执行的行记为该测试覆盖的行；没有启用 contexts 时
+        什么也不做
+
+        Args:
+            test_id: 测试ID，None 表示不属于任何测试
+        """
+        if not self.contexts:
+            return
+        if self._monitor is not None:
+            self._monitor.switch(test_id)
+        elif self._cov is not None:
+            self._cov.switch_context(test_id or "")
+
+    def stop(self) -> None:
+        """
+        停止收集并写入数据文件
+        """
+        if self._monitor is not None:
+            self._monitor.stop()
+            self._write_monitor()
+            self._monitor = None
+        elif self._cov is not None:
+            self._cov.stop()
+            self._cov.save()
+            self._cov = None
+
+    def _write_monitor(self) -> None:
+        _write_bits(self._bits_file, self._monitor.hits)
+        if self._monitor.tests:
+            # 各测试的位数组只增不改，每次保存写入一个新文件，不必重写之前的测试
+            self._chunks += 1
+            _write_bits(f"{self._bits_file}.{self._chunks}", {}, self._monitor.tests)
+            self._monitor.tests.clear()
+            self._monitor.switch(None)
+
+
+def _write_bits(path: str, hits: Dict[str, bytearray],
+                tests: Optional[Dict[str, Dict[str, bytearray]]] = None) -> None:
+    data: Dict[str, Any] = {"files": {filename: bits.hex()
+                                      for filename, bits in hits.items()}}
+    if tests:
+        data["tests"] = {test_id: {filename: bits.hex()
+                                   for filename, bits in files.items()}
+                         for test_id, files in tests.items()}
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _is_docstring(node: ast.stmt) -> bool:
+    return (isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)
+            and isinstance(node.value.value, str))
+
+
+def statement_lines(path: str) -> Dict[int, int]:
+    """
+    分析源文件中的语句（monitoring 后端），规则与 coverage 相近: 跨多行的语句
+    算一条，执行了其中任何一行就算覆盖；复合语句只算头部（例如 if 的条件）；
+    文档字符串不算语句
+
+    Args:
+        path: 源文件路径
+
+    Returns:
+        行号到所属语句首行的映射，语句首行的集合即 set(返回值.values())；
+        文件无法读取或解析时为空字典
+    """
+    try:
+        with open(path, "rb") as f:
+            tree = ast.parse(f.read(), path)
+    except (OSError, SyntaxError, ValueError):
+        return {}
+    lines: Dict[int, int] = {}
+    for node in ast.walk(tree):
+        body = getattr(node, "body", None)
+        if (isinstance(body, list) and body and _is_docstring(body[0])
+                and isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef,
+                                      ast.AsyncFunctionDef))):
+            lines[body[0].lineno] = -1
+        if (not isinstance(node, (ast.stmt, ast.ExceptHandler))
+                or lines.get(node.lineno) == -1):
+            continue
+        # 装饰器与 def/class 各算一条语句
+        decorators = [d.lineno for d in getattr(node, "decorator_list", [])]
+        for line in range(min(decorators or [node.lineno]), node.lineno):
+            lines.setdefault(line, min(decorators))
+        if isinstance(body, list) and body:
+            # 复合语句: 头部到第一条子语句之前
+            last = max(node.lineno, body[0].lineno - 1)
+        else:
+            last = node.end_lineno or node.lineno
+        for line in range(node.lineno, last + 1):
+            lines.setdefault(line, node.lineno)
+    return {line: statement for line, statement in lines.items() if statement != -1}
+
+
+def format_lines(statements: Sequence[int], lines: Set[int]) -> str:
+    """
+    把行号压缩成区间，例如 "3-5, 9"。两行之间没有其他语句时视为连续
+    """
+    ranges = []
+    start = end = None
+    for line in sorted(statements):
+        if line in lines:
+            if start is None:
+                start = line
+            end = line
+        elif start is not None:
+            ranges.append((start, end))
+            start = None
+    if start is not None:
+        ranges.append((start, end))
+    return ", ".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+
+def combine_coverage(data_dir: str, source: Optional[Sequence[str]] = None,
+                     backend: str = "auto", contexts: bool = False) -> Dict[str, Any]:
+    """
+    合并各进程的数据文件，计算每个文件的覆盖率
+
+    Args:
+        data_dir: 数据文件所在目录
+        source: 与收集时相同的 source
+        backend: 与收集时相同的后端
+        contexts: 是否同时给出每个测试覆盖的行（收集时需启用 contexts）
+
+    Returns:
+        覆盖率汇总: backend、statements、missing、percent、message，以及按路径排序的
+        files，每项包含 file、statements、missing、percent 和 missing_lines（例如
+        "3-5, 9"）；data_file 为合并后的数据文件。contexts 为 True 时另有 tests:
+        {测试ID: {文件: [语句行号]}}，行号为语句的第一行
+    """
+    backend = resolve_backend(backend)
+    tests: Dict[str, Dict[str, Set[int]]] = {}
+    if backend == "monitoring":
+        analysis = _combine_bits(data_dir, source, tests)
+        data_file = os.path.join(data_dir, BITS_FILE_NAME + ".json")
+    else:
+        analysis = _combine_coverage_py(data_dir, source, tests if contexts else None)
+        data_file = os.path.join(data_dir, DATA_FILE_NAME)
+
+    files: List[Dict[str, Any]] = []
+    for measured, statements, missing, missing_lines in analysis:
+        files.append({"file": _relative(measured),
+                      "statements": statements, "missing": missing,
+                      "percent": _percent(statements, missing),
+                      "missing_lines": missing_lines})
+    statements = sum(f["statements"] for f in files)
+    missing = sum(f["missing"] for f in files)
+    percent = _percent(statements, missing)
+    summary = {"coverage_available": True, "backend": backend,
+               "statements": statements, "missing": missing, "percent": percent,
+               "files": files, "data_file": data_file,
+               "message": f"总覆盖率 {percent:.1f}% "
+                          f"({statements - missing}/{statements} 行)，"
+                          f"数据文件: {data_file}"}
+    if contexts:
+        summary["tests"] = {test_id: {_relative(filename): sorted(lines)
+                                      for filename, lines in sorted(measured.items())
+                                      if lines}
+                            for test_id, measured in sorted(tests.items())}
+    return summary
+
+
+def _relative(path: str) -> str:
+    cwd = os.getcwd() + os.sep
+    return path[len(cwd):] if path.startswith(cwd) else path
+
+
+def _combine_coverage_py(data_dir: str, source: Optional[Sequence[str]],
+                         tests: Optional[Dict[str, Dict[str, Set[int]]]]):
+    cov = _new_coverage(data_dir, source, suffix=False)
+    cov.combine(data_paths=[data_dir])
+    cov.save()
+    data = cov.get_data()
+    for measured in sorted(data.measured_files()):
+        try:
+            _, statements, _, missing, missing_lines = cov.analysis2(measured)
+        except Exception:
+            # 源文件已被删除或不是 Python 源码（NoSource 等）
+            continue
+        if tests is not None:
+            known = set(statements)
+            for line, names in data.contexts_by_lineno(measured).items():
+                if line not in known:
+                    continue
+                for test_id in names:
+                    if test_id:
+                        tests.setdefault(test_id, {}).setdefault(
+                            measured, set()).add(line)
+        yield measured, len(statements), len(missing), missing_lines
+
+
+def _combine_bits(data_dir: str, source: Optional[Sequence[str]],
+                  tests: Dict[str, Dict[str, Set[int]]]):
+    combined_file = os.path.join(data_dir, BITS_FILE_NAME + ".json")
+    hits: Dict[str, bytearray] = {}
+    test_hits: Dict[str, Dict[str, bytearray]] = {}
+    paths = glob.glob(os.path.join(data_dir, BITS_FILE_NAME + ".*"))
+    for path in paths:
+        if path.endswith(".tmp"):
+            continue
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for filename, bits in data.get("files", {}).items():
+            # 同一个文件可能以相对路径和绝对路径两种方式导入
+            filename = os.path.abspath(filename)
+            hits[filename] = _or_bits(hits.get(filename, b""), bytes.fromhex(bits))
+        for test_id, measured in data.get("tests", {}).items():
+            # 工作进程崩溃后重新运行的测试可能出现在多个文件中
+            merged = test_hits.setdefault(test_id, {})
+            for filename, bits in measured.items():
+                filename = os.path.abspath(filename)
+                merged[filename] = _or_bits(merged.get(filename, b""),
+                                            bytes.fromhex(bits))
+    for path in paths:
+        if path != combined_file:
+            os.remove(path)
+    _write_bits(combined_file, hits, test_hits)
+
+    measured = set(hits)
+    if source:
+        # 与 coverage 一样，source 中从未导入过的文件也计入报告
+        measured.update(SourceFilter(source).source_files())
+    for filename in sorted(measured):
+        lines = statement_lines(filename)
+        statements = sorted(set(lines.values()))
+        if not statements:
+            continue
+        executed = {lines[line] for line in _bits_to_lines(hits.get(filename, b""))
+                    if line in lines}
+        missing = set(statements) - executed
+        for test_id, test_files in test_hits.items():
+            bits = test_files.get(filename)
+            if bits:
+                tests.setdefault(test_id, {})[filename] = {
+                    lines[line] for line in _bits_to_lines(bits) if line in lines}
+        yield filename, len(statements), len(missing), format_lines(statements, missing)
+
+
+def minimize_tests(test_lines: Dict[str, Dict[str, Sequence[int]]],
+                   durations: Optional[Dict[str, float]] = None) -> List[str]:
+    """
+    贪心地选出覆盖相同语句的一个较小的测试子集（集合覆盖）
+
+    每一步选择新增覆盖语句最多的测试，新增数相同时选择耗时更短的测试。贪心
+    结果不一定最小，但与最优解的差距有界（不超过 ln(语句数)+1 倍），选出的
+    测试合起来覆盖的语句与全部测试完全相同。
+
+    Args:
+        test_lines: {测试ID: {文件: [语句行号]}}，即 combine_coverage 的 tests
+        durations: {测试ID: 耗时（秒）}，用于打破平局
+
+    Returns:
+        按选择顺序排列的测试ID
+    """
+    durations = durations or {}
+    index: Dict[Any, int] = {}
+    covers = {test_id: {index.setdefault((filename, line), len(index))
+                        for filename, lines in files.items() for line in lines}
+              for test_id, files in test_lines.items()}
+    uncovered = set(range(len(index)))
+    # 惰性贪心: 堆中的新增数只会偏大，弹出后重新计算，仍不小于堆顶时即为最优
+    heap = [(-len(lines), durations.get(test_id, 0.0), test_id)
+            for test_id, lines in covers.items() if lines]
+    heapq.heapify(heap)
+    selected: List[str] = []
+    while uncovered and heap:
+        _, duration, test_id = heapq.heappop(heap)
+        gain = covers[test_id] & uncovered
+        if not gain:
+            continue
+        if heap and (-len(gain), duration, test_id) > heap[0]:
+            covers[test_id] = gain
+            heapq.heappush(heap, (-len(gain), duration, test_id))
+            continue
+        selected.append(test_id)
+        uncovered -= gain
+    return selected
+
+
+def _percent(statements: int, missing: int) -> float:
+    return 100.0 * (statements - missing) / statements if statements else 100.0
@@ -0,0 +1,318 @@
+"""
+常驻守护进程与轻量客户端
+
+守护进程在 Unix 套接字上监听运行请求，在内存中保留测试发现索引和预先
+导入的依赖模块。每个运行请求都在 fork 出的子进程中执行：子进程继承已导入
+的模块，测试模块则总是重新加载，结果事件（见 AutoTester.iter_results）以
+JSON 行的形式流式返回。与本地运行一样记录耗时历史和失败记录。
+
+项目目录中的模块被修改后，守护进程只淘汰这些模块以及引用了它们的模块，
+再重新导入预加载列表，其余已导入的依赖保持不变。
+"""
+
+import importlib
+import json
+import os
+import socket
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+
+DEFAULT_SOCKET = os.path.join(".py_auto_tester", "daemon.sock")
+
+# 守护进程自身的包不参与淘汰，否则正在运行的服务代码会与新模块不一致
+_OWN_PACKAGE = __name__.split(".")[0]
+
+
+def daemon_supported() -> bool:
+    """
+    当前平台是否支持守护进程模式（需要 Unix 套接字和 fork）
+    """
+    return hasattr(socket, "AF_UNIX") and hasattr(os, "fork")
+
+
+def send_request(request: Dict[str, Any],
+                 socket_path: str = DEFAULT_SOCKET) -> Iterator[Dict[str, Any]]:
+    """
+    向守护进程发送一个请求，并逐个产出返回的事件
+
+    Args:
+        request: 请求字典，command 为 "run"、"status" 或 "stop"
+        socket_path: 守护进程的套接字路径
+
+    Returns:
+        事件字典的迭代器，守护进程关闭连接时结束
+
+    Raises:
+        OSError: 无法连接守护进程
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("r", encoding="utf-8") as reader:
+            for line in reader:
+                if line.strip():
+                    yield json.loads(line)
+    finally:
+        sock.close()
+
+
+def _send_event(conn: socket.socket, event: Dict[str, Any]) -> None:
+    conn.sendall(json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+class WarmDaemon:
+    """
+    保持预热状态的测试守护进程
+
+    请求按到达顺序逐个处理，同一时间只运行一批测试。
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET,
+                 preload: Optional[Sequence[str]] = None,
+                 cache_dir: str = ".py_auto_tester",
+                 root: Optional[str] = None):
+        """
+        初始化守护进程
+
+        Args:
+            socket_path: 监听的 Unix 套接字路径
+            preload: 启动时预先导入的模块名
+            cache_dir: 耗时历史等运行数据的缓存目录（相对于 root）
+            root: 项目目录，默认为当前工作目录。客户端必须在该目录中发起请求
+        """
+        self.socket_path = socket_path
+        self.preload = list(preload or [])
+        self.cache_dir = cache_dir
+        self.root = os.path.abspath(root or os.getcwd())
+        self.testers: Dict[tuple, Any] = {}
+        self.runs = 0
+        self.started_at = time.time()
+        self._module_mtimes: Dict[str, float] = {}
+        self._running = False
+
+    def _is_project_module(self, module) -> bool:
+        """
+        判断模块是否来自项目目录（可能在守护进程运行期间被修改）
+        """
+        path = getattr(module, "__file__", None)
+        if not path:
+            return False
+        path = os.path.abspath(path)
+        if not path.startswith(self.root + os.sep):
+            return False
+        return "site-packages" not in path.split(os.sep)
+
+    def _snapshot_modules(self) -> None:
+        """
+        记录当前已导入的项目模块的文件修改时间
+        """
+        self._module_mtimes = {}
+        for name, module in list(sys.modules.items()):
+            if (name.split(".")[0] == _OWN_PACKAGE
+                    or not self._is_project_module(module)):
+                continue
+            try:
+                self._module_mtimes[name] = os.stat(module.__file__).st_mtime
+            except OSError:
+                continue
+
+    def _import_preload(self) -> None:
+        for name in self.preload:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                print(f"预加载模块 {name} 失败: {e}")
+
+    def refresh_modules(self) -> List[str]:
+        """
+        淘汰文件已修改的项目模块及引用了它们的模块，然后重新导入预加载列表
+
+        Returns:
+            被淘汰的模块名列表
+        """
+        stale = set()
+        for name, mtime in self._module_mtimes.items():
+            module = sys.modules.get(name)
+            try:
+                changed = module is None or os.stat(module.__file__).st_mtime != mtime
+            except OSError:
+                changed = True
+            if changed:
+                stale.add(name)
+        if not stale:
+            return []
+
+        # 引用了已淘汰模块（或其中定义的对象）的项目模块也必须重新导入
+        candidates = [name for name in self._module_mtimes if name not in stale]
+        grew = True
+        while grew:
+            grew = False
+            for name in candidates:
+                module = sys.modules.get(name)
+                if name in stale or module is None:
+                    continue
+                for value in list(vars(module).values()):
+                    if isinstance(value, type(sys)):
+                        owner = getattr(value, "__name__", None)
+                    else:
+                        owner = getattr(value, "__module__", None)
+                    if owner in stale:
+                        stale.add(name)
+                        grew = True
+                        break
+
+        for name in stale:
+            sys.modules.pop(name, None)
+        importlib.invalidate_caches()
+        self._import_preload()
+        self._snapshot_modules()
+        return sorted(stale)
+
+    def serve_forever(self) -> None:
+        """
+        监听套接字并处理请求，直到收到 stop 请求或被中断
+        """
+        directory = os.path.dirname(self.socket_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.socket_path):
+            # 上次的守护进程仍在运行时拒绝启动，否则清理残留的套接字文件
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)
+            else:
+                raise RuntimeError(f"守护进程已在运行: {self.socket_path}")
+            finally:
+                probe.close()
+
+        start_time = time.perf_counter()
+        self._import_preload()
+        self._snapshot_modules()
+        print(f"守护进程已启动 (pid {os.getpid()}), 监听 {self.socket_path}, "
+              f"预加载耗时 {time.perf_counter() - start_time:.3f}s")
+        sys.stdout.flush()
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(8)
+        self._running = True
+        try:
+            while self._running:
+                conn, _ = server.accept()
+                with conn:
+                    try:
+                        self._handle(conn)
+                    except (OSError, ValueError) as e:
+                        # 客户端中途断开或发送了无效请求，不影响守护进程
+                        print(f"处理请求时出错: {e}")
+        finally:
+            server.close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+    def _handle(self, conn: socket.socket) -> None:
+        """
+        读取并处理一个请求
+        """
+        with conn.makefile("r", encoding="utf-8") as reader:
+            line = reader.readline()
+        request = json.loads(line or "{}")
+        command = request.get("command")
+        if command == "run":
+            self._run(conn, request)
+        elif command == "status":
+            _send_event(conn, {
+                "event": "status", "pid": os.getpid(), "root": self.root,
+                "uptime": time.time() - self.started_at, "runs": self.runs,
+                "preload": self.preload, "modules": len(sys.modules),
+            })
+        elif command == "stop":
+            self._running = False
+            _send_event(conn, {"event": "stopped", "pid": os.getpid()})
+        else:
+            _send_event(conn, {"event": "daemon_error",
+                               "message": f"未知的请求: {command!r}"})
+
+    def _tester(self, request: Dict[str, Any]):
+        """
+        返回与请求参数对应的 AutoTester，同一组参数复用内存中的发现索引
+        """
+        from .core import AutoTester
+
+        key = (request.get("dir", "tests"), request.get("pattern", "test_*.py"),
+               tuple(request["exclude"]) if request.get("exclude") else None)
+        if key not in self.testers:
+            self.testers[key] = AutoTester(
+                test_directory=key[0], pattern=key[1],
+                cache_dir=os.path.join(self.root, self.cache_dir),
+                exclude_dirs=list(key[2]) if key[2] else None,
+            )
+        return self.testers[key]
+
+    def _run(self, conn: socket.socket, request: Dict[str, Any]) -> None:
+        """
+        处理 run 请求: 在父进程中发现测试，在 fork 出的子进程中运行
+        """
+        start_time = time.perf_counter()
+        if os.path.abspath(request.get("cwd", self.root)) != self.root:
+            _send_event(conn, {"event": "daemon_error",
+                               "message": f"守护进程的工作目录是 {self.root}"})
+            return
+        reloaded = self.refresh_modules()
+        if reloaded:
+            _send_event(conn, {"event": "log",
+                               "message": f"重新加载了 {len(reloaded)} 个已修改的模块"})
+
+        tester = self._tester(request)
+        tester.discovered_tests = []
+        tester.selected_tests = {}
+        tester.excluded_tests = {}
+        test_files = tester.discover_tests()
+        _send_event(conn, {"event": "discovered", "files": test_files})
+        self.runs += 1
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                self._run_child(conn, tester, start_time, request)
+                code = 0
+            finally:
+                os._exit(code)
+
+        _, status = os.waitpid(pid, 0)
+        if status != 0:
+            _send_event(conn, {"event": "daemon_error",
+                               "message": f"运行测试的子进程异常退出 (状态 {status})"})
+
+    def _run_child(self, conn: socket.socket, tester, start_time: float,
+                   request: Dict[str, Any]) -> None:
+        """
+        子进程: 与本地运行相同地运行测试（包括并行模式），把结果事件流式返回给
+        客户端，并更新耗时历史和失败记录
+        """
+        from .runner import OUTPUT_MEMORY_LIMIT
+
+        if self.root not in sys.path:
+            sys.path.insert(0, self.root)
+        events = tester.iter_results(
+            workers=request.get("workers"),
+            trace_memory=bool(request.get("trace_memory")),
+            capture_output=bool(request.get("capture_output")),
+            output_limit=request.get("output_limit") or OUTPUT_MEMORY_LIMIT,
+            evict_modules=bool(request.get("evict_modules")),
+            collect_garbage=bool(request.get("collect_garbage")))
+        for event in events:
+            if event["event"] == "summary":
+                # 从收到请求时算起，包括守护进程中的测试发现
+                event["elapsed"] = time.perf_counter() - start_time
+            _send_event(conn, event)
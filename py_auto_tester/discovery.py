@@ -0,0 +1,187 @@
+"""
+基于 os.scandir 的增量测试发现
+
+按文件名模式匹配测试文件，提前剪除虚拟环境、版本库、依赖目录等不可能
+包含测试的目录，并把每个目录的修改时间和扫描结果保存在索引文件中。
+目录的修改时间只在其直接子项被增删或改名时变化，所以修改时间未变的目录
+可以直接复用上次的扫描结果，只需一次 stat 而不必重新列出全部条目。
+"""
+
+import fnmatch
+import json
+import os
+import re
+import time
+from typing import Dict, Iterable, List, Optional
+
+
+INDEX_VERSION = 1
+
+# 默认剪除的目录（支持通配符），与 pytest 的 norecursedirs 类似
+DEFAULT_EXCLUDE_DIRS = (
+    ".*",
+    "__pycache__",
+    "node_modules",
+    "venv",
+    "site-packages",
+    "build",
+    "dist",
+    "*.egg",
+    "*.egg-info",
+)
+
+# 修改时间与索引写入时间相差小于该值（纳秒）的目录不可信，需要重新扫描，
+# 避免同一时间刻度内的修改被遗漏
+RACY_MTIME_WINDOW_NS = 2 * 10 ** 9
+
+
+def compile_patterns(patterns: Iterable[str]):
+    """
+    把一组 glob 模式编译为一个正则表达式（区分大小写）
+
+    Args:
+        patterns: glob 模式列表
+
+    Returns:
+        编译后的正则表达式，没有模式时返回 None
+    """
+    patterns = list(patterns)
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(p) for p in patterns))
+
+
+class DiscoveryIndex:
+    """
+    持久化的目录扫描索引
+    """
+
+    def __init__(self, root: str, pattern: str = "test_*.py",
+                 exclude_dirs: Optional[Iterable[str]] = None,
+                 index_file: Optional[str] = None):
+        """
+        初始化发现索引
+
+        Args:
+            root: 要扫描的根目录
+            pattern: 测试文件名的 glob 模式
+            exclude_dirs: 要剪除的目录名模式，None 表示使用 DEFAULT_EXCLUDE_DIRS
+            index_file: 索引文件路径，None 表示只在内存中保留索引
+        """
+        self.root = root
+        self.pattern = pattern
+        if exclude_dirs is None:
+            exclude_dirs = DEFAULT_EXCLUDE_DIRS
+        self.exclude_dirs = list(exclude_dirs)
+        self.index_file = index_file
+        self._file_regex = compile_patterns([pattern])
+        self._exclude_regex = compile_patterns(self.exclude_dirs)
+        self._dirs: Dict[str, Dict] = {}
+        self._written_at = 0
+        self.stats = {"scanned": 0, "reused": 0}
+        self._load()
+
+    def _signature(self) -> Dict:
+        return {
+            "version": INDEX_VERSION,
+            "root": os.path.abspath(self.root),
+            "pattern": self.pattern,
+            "exclude_dirs": self.exclude_dirs,
+        }
+
+    def _load(self) -> None:
+        if not self.index_file or not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        # 根目录、模式或剪除规则变化后，旧索引全部作废
+        if data.get("signature") != self._signature():
+            return
+        self._dirs = data.get("dirs", {})
+        self._written_at = data.get("written_at", 0)
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.index_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.index_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"signature": self._signature(), "written_at": self._written_at,
+                       "dirs": self._dirs}, f)
+        os.replace(tmp_path, self.index_file)
+
+    def _is_excluded(self, name: str) -> bool:
+        return (self._exclude_regex is not None
+                and self._exclude_regex.match(name) is not None)
+
+    def _scan_directory(self, path: str):
+        """
+        列出目录中匹配的文件和需要继续深入的子目录
+        """
+        files, subdirs = [], []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                name = entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if not self._is_excluded(name):
+                        subdirs.append(name)
+                elif name == "pyvenv.cfg":
+                    # 虚拟环境的根目录，不论叫什么名字都整体剪除
+                    return [], []
+                elif self._file_regex.match(name) and entry.is_file():
+                    files.append(name)
+        files.sort()
+        subdirs.sort()
+        return files, subdirs
+
+    def discover(self) -> List[str]:
+        """
+        扫描根目录并返回匹配的测试文件
+
+        Returns:
+            测试文件路径列表（目录按深度优先、名称排序）
+        """
+        self.stats = {"scanned": 0, "reused": 0}
+        scan_started = time.time_ns()
+        old_dirs, new_dirs = self._dirs, {}
+        test_files = []
+        stack = [""]
+
+        while stack:
+            relative = stack.pop()
+            path = os.path.join(self.root, relative) if relative else self.root
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+
+            cached = old_dirs.get(relative)
+            if (cached is not None and cached["mtime_ns"] == mtime_ns
+                    and mtime_ns + RACY_MTIME_WINDOW_NS < self._written_at):
+                files, subdirs = cached["files"], cached["subdirs"]
+                self.stats["reused"] += 1
+            else:
+                try:
+                    files, subdirs = self._scan_directory(path)
+                except OSError:
+                    continue
+                self.stats["scanned"] += 1
+
+            new_dirs[relative] = {"mtime_ns": mtime_ns, "files": files,
+                                  "subdirs": subdirs}
+            test_files.extend(os.path.join(path, name) for name in files)
+            stack.extend(os.path.join(relative, name) if relative else name
+                         for name in reversed(subdirs))
+
+        # 以扫描开始的时间作为索引时间，扫描期间发生的修改在下次会被视为不可信
+        self._dirs = new_dirs
+        self._written_at = scan_started
+        if self.index_file:
+            try:
+                self._save()
+            except OSError:
+                pass
+        return test_files
@@ -0,0 +1,324 @@
+"""
+测试耗时和失败历史记录，以及负载均衡调度
+
+每次运行后把每个测试和每个文件的耗时写入本地JSON文件，下次运行时据此
+按"最长处理时间优先"(LPT) 的顺序把文件分派给工作进程。上次运行中失败的
+测试ID也会被记录下来，用于只重新运行失败的测试或优先运行它们，以及在
+有限的时间预算内挑选最值得运行的测试。
+"""
+
+import heapq
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .runner import normalize_path
+
+
+# 没有任何历史数据时，按文件大小估算耗时所用的系数（秒/字节）
+DEFAULT_SECONDS_PER_BYTE = 1e-5
+
+# 新测量值在平滑后的耗时中所占的权重
+SMOOTHING = 0.5
+
+# 按时间预算选择测试时各项信号的分值，分值高的测试优先选入
+BUDGET_SCORE_FAILED = 4
+BUDGET_SCORE_CHANGED = 2
+BUDGET_SCORE_NEW = 1
+
+
+class TimingHistory:
+    """
+    持久化的测试耗时历史
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化耗时历史
+
+        Args:
+            path: 历史记录JSON文件路径，文件不存在时视为空历史
+        """
+        self.path = path
+        self.files: Dict[str, float] = {}
+        self.tests: Dict[str, float] = {}
+        self.load()
+
+    def load(self) -> None:
+        """
+        从磁盘读取历史记录，文件损坏时忽略
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.files = dict(data.get("files", {}))
+            self.tests = dict(data.get("tests", {}))
+        except (OSError, ValueError):
+            self.files, self.tests = {}, {}
+
+    def save(self) -> None:
+        """
+        把历史记录写回磁盘
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files, "tests": self.tests}, f, indent=1,
+                      sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _blend(old: Optional[float], new: float) -> float:
+        if old is None:
+            return new
+        return SMOOTHING * new + (1 - SMOOTHING) * old
+
+    def record_file(self, test_file: str, duration: float) -> None:
+        """
+        记录一个文件的总耗时（包括导入时间）
+        """
+        key = normalize_path(test_file)
+        self.files[key] = self._blend(self.files.get(key), duration)
+
+    def record_test(self, test_id: str, duration: float) -> None:
+        """
+        记录单个测试的耗时
+        """
+        self.tests[test_id] = self._blend(self.tests.get(test_id), duration)
+
+    def estimate_files(self, test_files: Iterable[str]) -> Dict[str, float]:
+        """
+        估算每个文件的耗时
+
+        有历史记录的文件直接使用历史值；其余文件按文件大小乘以已知文件
+        的平均"秒/字节"估算。
+
+        Args:
+            test_files: 测试文件列表
+
+        Returns:
+            文件路径到估算耗时（秒）的映射
+        """
+        test_files = list(test_files)
+        sizes = {}
+        for test_file in test_files:
+            try:
+                sizes[test_file] = os.path.getsize(test_file)
+            except OSError:
+                sizes[test_file] = 0
+
+        known_time = known_size = 0.0
+        for test_file in test_files:
+            duration = self.files.get(normalize_path(test_file))
+            if duration is not None and sizes[test_file]:
+                known_time += duration
+                known_size += sizes[test_file]
+        rate = known_time / known_size if known_size else DEFAULT_SECONDS_PER_BYTE
+
+        estimates = {}
+        for test_file in test_files:
+            duration = self.files.get(normalize_path(test_file))
+            if duration is None:
+                duration = sizes[test_file] * rate
+            estimates[test_file] = duration
+        return estimates
+
+    def estimate_tests(self, collected: Dict[str, List[str]]) -> Dict[str, float]:
+        """
+        估算每个测试的耗时
+
+        有历史记录的测试直接使用历史值；其余测试平分所在文件估算耗时中
+        未被已知测试占用的部分。没有静态收集到测试的文件以文件路径作为键。
+
+        Args:
+            collected: 测试文件到其测试ID列表的映射
+
+        Returns:
+            测试ID（或文件路径）到估算耗时（秒）的映射
+        """
+        file_estimates = self.estimate_files(collected)
+        estimates = {}
+        for test_file, test_ids in collected.items():
+            if not test_ids:
+                estimates[test_file] = file_estimates[test_file]
+                continue
+            unknown = [test_id for test_id in test_ids if test_id not in self.tests]
+            known_total = sum(self.tests[t] for t in test_ids if t in self.tests)
+            share = 0.0
+            if unknown:
+                share = max(file_estimates[test_file] - known_total, 0.0) / len(unknown)
+            for test_id in test_ids:
+                estimates[test_id] = self.tests.get(test_id, share)
+        return estimates
+
+
+def _parent_test_id(test_id: str) -> str:
+    """
+    子测试ID对应的所属测试ID（"路径::类名::方法名 (参数)" -> "路径::类名::方法名"）
+    """
+    head, sep, tail = test_id.rpartition("::")
+    return head + sep + tail.split(" ", 1)[0] if sep else test_id
+
+
+def _is_single_test(test_id: str) -> bool:
+    """
+    是否为单个测试的ID（"路径::类名::方法名"），而不是夹具错误（例如
+    "路径::setUpClass (模块.类名)"）或整个文件的记录
+    """
+    _, sep, name = test_id.partition("::")
+    return bool(sep) and "::" in name and " " not in name
+
+
+class FailureHistory:
+    """
+    持久化的失败测试记录
+
+    每次运行后，本次运行过的测试以本次结果为准，没有运行的测试保留原来的
+    记录，因此只运行一部分测试不会丢失其余测试的失败状态。失败的子测试记为
+    所属的测试；夹具错误、加载失败或工作进程崩溃时记录的ID不是单个测试，
+    选择时按整个文件处理，该文件再次运行后以本次结果为准。
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化失败记录
+
+        Args:
+            path: 记录文件路径，文件不存在时视为没有失败
+        """
+        self.path = path
+        self.failed: Set[str] = set()
+        self._ran: Set[str] = set()
+        self._new_failures: Set[str] = set()
+        self.load()
+
+    def load(self) -> None:
+        """
+        从磁盘读取失败记录，文件损坏时忽略
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.failed = set(json.load(f).get("failed", []))
+        except (OSError, ValueError, AttributeError):
+            self.failed = set()
+
+    def save(self) -> None:
+        """
+        合并本次运行的结果并写回磁盘
+        """
+        stale = {failure for failure in self.failed
+                 if failure in self._ran
+                 or (not _is_single_test(failure)
+                     and failure.partition("::")[0] in self._ran)}
+        self.failed = (self.failed - stale) | self._new_failures
+        self._ran, self._new_failures = set(), set()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"failed": sorted(self.failed)}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def record(self, event: Dict[str, Any]) -> None:
+        """
+        记录一个结果事件
+        """
+        kind = event["event"]
+        if kind == "start":
+            self._ran.add(event["id"])
+        elif kind in ("fail", "error"):
+            test_id = event["id"]
+            if event.get("subtest"):
+                test_id = _parent_test_id(test_id)
+            elif "::" not in test_id:
+                test_id = normalize_path(test_id)
+            self._new_failures.add(test_id)
+        elif kind == "timing":
+            # 文件整体的失败记录（加载失败、崩溃）以文件路径为ID
+            test_file = normalize_path(event["file"])
+            self._ran.add(test_file)
+            if event.get("load_error"):
+                self._new_failures.add(test_file)
+
+    def select(self, collected: Dict[str, List[str]]) -> Dict[str, Optional[List[str]]]:
+        """
+        选出上次失败的测试
+
+        Args:
+            collected: 测试文件到其测试ID列表的映射
+
+        Returns:
+            包含失败测试的文件到要运行的测试ID列表的映射，None 表示运行整个文件
+        """
+        selected: Dict[str, Optional[List[str]]] = {}
+        for test_file, test_ids in collected.items():
+            prefix = normalize_path(test_file)
+            failed = {failure for failure in self.failed
+                      if failure == prefix or failure.startswith(prefix + "::")}
+            if not failed:
+                continue
+            if failed <= set(test_ids):
+                selected[test_file] = [test_id for test_id in test_ids
+                                       if test_id in failed]
+            else:
+                selected[test_file] = None
+        return selected
+
+
+def select_within_budget(estimates: Dict[str, float], scores: Dict[str, int],
+                         budget: float) -> Tuple[List[str], List[str]]:
+    """
+    在时间预算内选择测试
+
+    按分值从高到低、分值相同时按估算耗时从短到长依次考虑每个测试，放得下
+    就选入，放不下的推迟，继续考虑后面更短的测试。这样上次失败、最近修改
+    和从未运行过的测试优先，同一档内尽量多运行测试。
+
+    Args:
+        estimates: 测试ID到估算耗时（秒）的映射
+        scores: 测试ID到分值的映射，缺省为0
+        budget: 时间预算（秒）
+
+    Returns:
+        (选中的测试ID, 推迟的测试ID)，各自按上述顺序排列
+    """
+    order = sorted(estimates,
+                   key=lambda name: (-scores.get(name, 0), estimates[name], name))
+    chosen, deferred = [], []
+    remaining = budget
+    for name in order:
+        if estimates[name] <= remaining:
+            chosen.append(name)
+            remaining -= estimates[name]
+        else:
+            deferred.append(name)
+    return chosen, deferred
+
+
+def schedule_lpt(estimates: Dict[Any, float], workers: int) -> Tuple[List[Any], float]:
+    """
+    按最长处理时间优先排序任务，并预测完成时间
+
+    工作进程空闲时才领取下一个任务，所以按耗时降序分派就等价于经典的
+    LPT 列表调度：每个任务都落到最早空闲的工作进程上。
+
+    Args:
+        estimates: 任务到估算耗时的映射
+        workers: 工作进程数
+
+    Returns:
+        (分派顺序, 预测的总完成时间)
+    """
+    # 耗时相同时按名称排序，保证顺序确定
+    order = sorted(estimates, key=lambda name: (-estimates[name], name))
+    loads = [0.0] * max(1, min(workers, len(order)))
+    for name in order:
+        heapq.heapreplace(loads, loads[0] + estimates[name])
+    return order, max(loads) if order else 0.0
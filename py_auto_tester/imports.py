@@ -0,0 +1,302 @@
+"""
+基于 ast 的项目内部导入关系图
+
+解析项目中每个 Python 文件的 import 语句，把能解析到项目内文件的导入记为
+一条边。修改某个文件后，沿反向边找到直接或间接导入了它的全部文件，就能
+只重新运行受影响的测试文件。每个文件的解析结果按内容哈希缓存。
+"""
+
+import ast
+import hashlib
+import json
+import os
+import subprocess
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .discovery import DiscoveryIndex
+
+
+CACHE_VERSION = 1
+
+
+# (模块名, 相对导入层级, from 导入的名称列表)
+ImportEntry = Tuple[str, int, List[str]]
+
+
+def parse_imports(source: str) -> List[ImportEntry]:
+    """
+    找出源代码中的全部 import 语句（包括函数内部和条件分支中的导入）
+
+    Args:
+        source: Python 源代码
+
+    Returns:
+        导入列表，每项为 (模块名, 相对导入层级, from 导入的名称列表)
+    """
+    imports = []
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imports.append((alias.name, 0, []))
+        elif isinstance(node, ast.ImportFrom):
+            imports.append((node.module or "", node.level,
+                            [alias.name for alias in node.names if alias.name != "*"]))
+    return imports
+
+
+class ImportGraph:
+    """
+    项目内部文件之间的导入关系图
+    """
+
+    def __init__(self, root: str = ".", exclude_dirs: Optional[Iterable[str]] = None,
+                 search_paths: Optional[List[str]] = None,
+                 cache_file: Optional[str] = None):
+        """
+        初始化导入关系图
+
+        Args:
+            root: 项目根目录，其中的全部 .py 文件都会被解析
+            exclude_dirs: 扫描时跳过的目录名模式，None 表示使用默认规则
+            search_paths: 解析绝对导入时搜索的目录，默认为根目录及其 src 子目录
+            cache_file: 按文件内容哈希缓存解析结果的文件路径，None 表示不缓存
+        """
+        self.root = os.path.abspath(root)
+        if search_paths is None:
+            search_paths = [self.root]
+            if os.path.isdir(os.path.join(self.root, "src")):
+                search_paths.append(os.path.join(self.root, "src"))
+        self.search_paths = [os.path.abspath(path) for path in search_paths]
+        self._index = DiscoveryIndex(self.root, pattern="*.py",
+                                     exclude_dirs=exclude_dirs)
+        self._parsed: Dict[str, Tuple[int, List[ImportEntry]]] = {}
+        self.edges: Dict[str, Set[str]] = {}
+        self._resolved: Dict[tuple, List[str]] = {}
+        self.cache_file = cache_file
+        self._cache: Dict[str, Dict] = {}
+        self._dirty = False
+        self.stats = {"parsed": 0, "cached": 0}
+        if cache_file and os.path.exists(cache_file):
+            try:
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == CACHE_VERSION:
+                    self._cache = data.get("files", {})
+            except (OSError, ValueError):
+                self._cache = {}
+
+    def _parse_file(self, path: str) -> List[ImportEntry]:
+        """
+        解析单个文件的导入，内容哈希未变时使用缓存
+        """
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError:
+            return []
+        digest = hashlib.sha1(content).hexdigest()
+        key = os.path.relpath(path, self.root)
+        cached = self._cache.get(key)
+        if cached is not None and cached["hash"] == digest:
+            self.stats["cached"] += 1
+            return [tuple(entry) for entry in cached["imports"]]
+
+        self.stats["parsed"] += 1
+        try:
+            imports = parse_imports(content.decode("utf-8"))
+        except (SyntaxError, UnicodeDecodeError, ValueError):
+            imports = []
+        self._cache[key] = {"hash": digest, "imports": imports}
+        self._dirty = True
+        return imports
+
+    def update(self) -> None:
+        """
+        重新扫描项目，只解析新增或修改过的文件，并重建导入边
+        """
+        files = [os.path.abspath(path) for path in self._index.discover()]
+        self.stats = {"parsed": 0, "cached": 0}
+        parsed = {}
+        for path in files:
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            cached = self._parsed.get(path)
+            if cached is not None and cached[0] == mtime_ns:
+                parsed[path] = cached
+            else:
+                parsed[path] = (mtime_ns, self._parse_file(path))
+        self._parsed = parsed
+        self._resolved: Dict[tuple, List[str]] = {}
+        self.edges = {path: self._resolve_all(path, imports)
+                      for path, (_, imports) in parsed.items()}
+        self.save()
+
+    def save(self) -> None:
+        """
+        缓存有变化时写回磁盘，只保留仍然存在的文件
+        """
+        if not self.cache_file or not self._dirty:
+            return
+        live = {os.path.relpath(path, self.root) for path in self._parsed}
+        files = {key: value for key, value in self._cache.items() if key in live}
+        directory = os.path.dirname(self.cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.cache_file + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "files": files}, f)
+            os.replace(tmp_path, self.cache_file)
+            self._dirty = False
+        except OSError:
+            pass
+
+    def _resolve_all(self, path: str, imports: List[ImportEntry]) -> Set[str]:
+        targets = set()
+        directory = os.path.dirname(path)
+        for module, level, names in imports:
+            # 同一目录中的文件对同一条导入的解析结果相同，避免重复 stat
+            key = (directory, module, level, tuple(names))
+            if key not in self._resolved:
+                self._resolved[key] = self.resolve(path, module, level, names)
+            targets.update(self._resolved[key])
+        targets.discard(path)
+        return targets
+
+    def resolve(self, from_file: str, module: str, level: int = 0,
+                names: Iterable[str] = ()) -> List[str]:
+        """
+        把一条导入解析为项目内的文件
+
+        导入 a.b.c 时会依次执行 a/__init__.py、a/b/__init__.py 和 a/b/c.py，
+        所以它们都算作依赖；from a.b import x 中的 x 若是子模块也同样计入。
+        除搜索路径外还会在导入方所在目录中查找，与以脚本方式运行时一致。
+
+        Args:
+            from_file: 导入方文件的绝对路径
+            module: 模块名，相对导入时可以为空
+            level: 相对导入层级，0 表示绝对导入
+            names: from 导入的名称
+
+        Returns:
+            项目内被导入的文件列表
+        """
+        parts = module.split(".") if module else []
+        if level:
+            base = os.path.dirname(from_file)
+            for _ in range(level - 1):
+                base = os.path.dirname(base)
+            bases = [base]
+        else:
+            bases = self.search_paths + [os.path.dirname(from_file)]
+
+        for base in bases:
+            found = []
+            directory = base
+            for i, part in enumerate(parts):
+                package = os.path.join(directory, part)
+                init = os.path.join(package, "__init__.py")
+                if os.path.isfile(init):
+                    found.append(init)
+                elif i == len(parts) - 1 and os.path.isfile(package + ".py"):
+                    found.append(package + ".py")
+                    break
+                elif not os.path.isdir(package):
+                    # 命名空间包之外找不到这一段，换下一个搜索路径
+                    found = None
+                    break
+                directory = package
+            else:
+                init_file = os.path.join(directory, "__init__.py")
+                if level and not parts and os.path.isfile(init_file):
+                    found.append(init_file)
+                for name in names:
+                    submodule = os.path.join(directory, name)
+                    if os.path.isfile(submodule + ".py"):
+                        found.append(submodule + ".py")
+                    elif os.path.isfile(os.path.join(submodule, "__init__.py")):
+                        found.append(os.path.join(submodule, "__init__.py"))
+            if found:
+                return [os.path.normpath(path) for path in found]
+        return []
+
+    def dependents(self, changed_files: Iterable[str]) -> Set[str]:
+        """
+        找出直接或间接导入了任一修改文件的全部文件
+
+        Args:
+            changed_files: 修改过的文件路径
+
+        Returns:
+            受影响的文件绝对路径集合，包括修改的文件本身
+        """
+        reverse: Dict[str, Set[str]] = {}
+        for path, targets in self.edges.items():
+            for target in targets:
+                reverse.setdefault(target, set()).add(path)
+
+        affected = set()
+        stack = [os.path.abspath(path) for path in changed_files]
+        while stack:
+            path = stack.pop()
+            if path in affected:
+                continue
+            affected.add(path)
+            stack.extend(reverse.get(path, ()))
+        return affected
+
+    def affected_tests(self, changed_files: Iterable[str],
+                       test_files: Iterable[str]) -> List[str]:
+        """
+        从测试文件中选出受修改影响的文件
+
+        Args:
+            changed_files: 修改过的文件路径
+            test_files: 候选测试文件路径
+
+        Returns:
+            受影响的测试文件，保持 test_files 中的顺序和路径写法
+        """
+        affected = self.dependents(changed_files)
+        return [test_file for test_file in test_files
+                if os.path.abspath(test_file) in affected]
+
+
+def _git(args: List[str], cwd: str) -> str:
+    try:
+        completed = subprocess.run(["git"] + args, cwd=cwd, capture_output=True,
+                                   text=True)
+    except OSError as e:
+        raise ValueError(f"无法运行 git: {e}")
+    if completed.returncode != 0:
+        raise ValueError(f"git {' '.join(args)} 失败: {completed.stderr.strip()}")
+    return completed.stdout
+
+
+def git_changed_files(since: str, cwd: str = ".") -> List[str]:
+    """
+    列出相对某个 git 引用修改过的文件
+
+    与 since 和 HEAD 的合并基点比较，包括已提交、未提交和未跟踪的文件，
+    因此在 PR 分支上传入目标分支名时不会把目标分支自己的新提交算进来。
+
+    Args:
+        since: git 引用，例如 origin/main 或 HEAD~3
+        cwd: git 仓库中的目录
+
+    Returns:
+        修改过的文件的绝对路径列表（包括已删除的文件）
+
+    Raises:
+        ValueError: git 不可用或引用无效
+    """
+    top = _git(["rev-parse", "--show-toplevel"], cwd).strip()
+    try:
+        base = _git(["merge-base", since, "HEAD"], cwd).strip()
+    except ValueError:
+        base = since
+    names = _git(["diff", "--name-only", base], cwd).splitlines()
+    names += _git(["ls-files", "--others", "--exclude-standard"], top).splitlines()
+    return sorted({os.path.join(top, name) for name in names if name})
@@ -0,0 +1,447 @@
+"""
+变异测试: 在内存中修改被测模块，检查测试能否发现这些修改
+
+每个变体（mutant）只改动源码中的一处: 交换运算符、调整常量或对条件取反。
+为了比逐个变体重新运行全部测试快得多:
+
+- 先按测试收集一次覆盖率，每个变体只运行覆盖了被修改语句的测试，按上次的
+  耗时从短到长运行，第一个失败的测试出现后立即停止（变体被"杀死"）
+- 不改写源文件: 修改发生在函数内部时只替换已导入的函数对象的 __code__，
+  测试模块中 from ... import 得到的引用同样生效；修改在模块级或类体中时在
+  原模块的命名空间中重新执行修改后的模块代码，结束后再执行原来的代码恢复
+- 变体分派到 fork 出的进程池中并行运行，工作进程继承父进程中已导入的被测模块
+
+被测模块中的死循环等由 Watchdog 的超时中断，记为被杀死（timeout）。
+"""
+
+import ast
+import copy
+import multiprocessing
+import os
+import sys
+import time
+import types
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .cover import statement_lines
+from .runner import iter_file_events, normalize_path
+
+
+# 每个变体的超时时间为覆盖它的测试上次耗时之和的倍数，加上固定的余量（秒）
+TIMEOUT_FACTOR = 10.0
+TIMEOUT_GRACE = 1.0
+
+# 变体结果状态在控制台上显示的符号
+MUTANT_SYMBOLS = {"killed": ".", "timeout": "T", "survived": "S", "no_coverage": "-"}
+
+_BINARY_SWAPS = {
+    ast.Add: ast.Sub, ast.Sub: ast.Add, ast.Mult: ast.Div, ast.Div: ast.Mult,
+    ast.FloorDiv: ast.Mult, ast.Mod: ast.FloorDiv, ast.Pow: ast.Mult,
+    ast.BitAnd: ast.BitOr, ast.BitOr: ast.BitAnd, ast.BitXor: ast.BitAnd,
+    ast.LShift: ast.RShift, ast.RShift: ast.LShift,
+}
+
+_COMPARE_SWAPS = {
+    ast.Lt: ast.LtE, ast.LtE: ast.Lt, ast.Gt: ast.GtE, ast.GtE: ast.Gt,
+    ast.Eq: ast.NotEq, ast.NotEq: ast.Eq, ast.Is: ast.IsNot, ast.IsNot: ast.Is,
+    ast.In: ast.NotIn, ast.NotIn: ast.In,
+}
+
+_BOOL_SWAPS = {ast.And: ast.Or, ast.Or: ast.And}
+
+_OPERATOR_TEXT = {
+    ast.Add: "+", ast.Sub: "-", ast.Mult: "*", ast.Div: "/", ast.FloorDiv: "//",
+    ast.Mod: "%", ast.Pow: "**", ast.BitAnd: "&", ast.BitOr: "|", ast.BitXor: "^",
+    ast.LShift: "<<", ast.RShift: ">>", ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">",
+    ast.GtE: ">=", ast.Eq: "==", ast.NotEq: "!=", ast.Is: "is", ast.IsNot: "is not",
+    ast.In: "in", ast.NotIn: "not in", ast.And: "and", ast.Or: "or",
+}
+
+
+class _Mutator(ast.NodeTransformer):
+    """
+    按固定的遍历顺序给每个可变异的位置编号
+
+    target 为 None 时只记录各位置（points），否则只修改编号为 target 的位置。
+    两种模式的遍历顺序相同，因此编号一致。
+    """
+
+    def __init__(self, tree: ast.AST, target: Optional[int] = None):
+        self.target = target
+        self.points: List[Dict[str, Any]] = []
+        self.scope: Optional[Tuple[str, ...]] = None
+        self._path: List[str] = []
+        # 当前所在的最外层函数的路径（类中的方法包含类名），不在函数中时为 None
+        self._function: Optional[Tuple[str, ...]] = None
+        # 文档字符串不是可变异的常量
+        self._docstrings = set()
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef,
+                                 ast.AsyncFunctionDef)) and node.body:
+                first = node.body[0]
+                if (isinstance(first, ast.Expr)
+                        and isinstance(first.value, ast.Constant)
+                        and isinstance(first.value.value, str)):
+                    self._docstrings.add(id(first.value))
+
+    def _point(self, node: ast.AST, description: str) -> bool:
+        """
+        记录一个可变异的位置，返回是否应修改它
+        """
+        index = len(self.points)
+        self.points.append({"id": index, "line": node.lineno, "col": node.col_offset,
+                            "description": description})
+        if index != self.target:
+            return False
+        self.scope = self._function
+        return True
+
+    def _visit_fields(self, node: ast.AST, fields: Sequence[str]) -> None:
+        for field in fields:
+            value = getattr(node, field, None)
+            if isinstance(value, list):
+                setattr(node, field, [self.visit(item) if isinstance(item, ast.AST)
+                                      else item for item in value])
+            elif isinstance(value, ast.AST):
+                setattr(node, field, self.visit(value))
+
+    def _visit_scope(self, node, is_function: bool):
+        # 装饰器、默认值、注解和基类在定义时求值，属于外层作用域
+        self._visit_fields(node, ("decorator_list", "args", "returns", "bases",
+                                  "keywords"))
+        self._path.append(node.name)
+        outermost = is_function and self._function is None
+        if outermost:
+            self._function = tuple(self._path)
+        self._visit_fields(node, ("body",))
+        if outermost:
+            self._function = None
+        self._path.pop()
+        return node
+
+    def visit_ClassDef(self, node):
+        return self._visit_scope(node, False)
+
+    def visit_FunctionDef(self, node):
+        return self._visit_scope(node, True)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def _swap(self, node, op_field: str, swaps: Dict[type, type]):
+        op = getattr(node, op_field)
+        replacement = swaps.get(type(op))
+        if replacement is not None and self._point(
+                node, f"{_OPERATOR_TEXT[type(op)]} → {_OPERATOR_TEXT[replacement]}"):
+            setattr(node, op_field, replacement())
+
+    def visit_BinOp(self, node):
+        self._swap(node, "op", _BINARY_SWAPS)
+        return self.generic_visit(node)
+
+    def visit_AugAssign(self, node):
+        self._swap(node, "op", _BINARY_SWAPS)
+        return self.generic_visit(node)
+
+    def visit_BoolOp(self, node):
+        self._swap(node, "op", _BOOL_SWAPS)
+        return self.generic_visit(node)
+
+    def visit_Compare(self, node):
+        for position, op in enumerate(node.ops):
+            replacement = _COMPARE_SWAPS.get(type(op))
+            if replacement is not None and self._point(
+                    node, f"{_OPERATOR_TEXT[type(op)]} → "
+                          f"{_OPERATOR_TEXT[replacement]}"):
+                node.ops[position] = replacement()
+        return self.generic_visit(node)
+
+    def visit_Constant(self, node):
+        if id(node) in self._docstrings:
+            return node
+        return self._mutate_constant(node, node.value)
+
+    # Python 3.7 的 ast.parse 生成 Num/NameConstant 而不是 Constant；
+    # 3.8 起 visit_Constant 优先，这两个方法不会被调用
+    def visit_Num(self, node):
+        return self._mutate_constant(node, node.n)
+
+    def visit_NameConstant(self, node):
+        return self._mutate_constant(node, node.value)
+
+    def _mutate_constant(self, node, value):
+        if isinstance(value, bool):
+            if self._point(node, f"{value} → {not value}"):
+                return ast.copy_location(ast.Constant(value=not value), node)
+        elif isinstance(value, (int, float)) and not isinstance(value, complex):
+            if self._point(node, f"{value!r} → {value + 1!r}"):
+                return ast.copy_location(ast.Constant(value=value + 1), node)
+        return node
+
+    def _negate_test(self, node):
+        if self._point(node.test, "条件取反"):
+            node.test = ast.copy_location(ast.UnaryOp(op=ast.Not(), operand=node.test),
+                                          node.test)
+        return self.generic_visit(node)
+
+    visit_If = visit_While = visit_IfExp = _negate_test
+
+
+def find_mutants(source: str) -> List[Dict[str, Any]]:
+    """
+    列出源码中所有可变异的位置
+
+    Args:
+        source: 模块源码
+
+    Returns:
+        变体列表，每项包含 id、line、col 和 description（例如 "+ → -"）
+    """
+    tree = ast.parse(source)
+    mutator = _Mutator(tree)
+    mutator.visit(tree)
+    return mutator.points
+
+
+def compile_mutant(tree: ast.Module, mutant_id: int,
+                   filename: str) -> Tuple[types.CodeType, Optional[Tuple[str, ...]]]:
+    """
+    编译只修改了一处的模块代码
+
+    Args:
+        tree: 原模块的语法树（不会被修改）
+        mutant_id: 变体编号
+        filename: 编译时使用的文件名，与原模块相同，回溯中显示原文件的行
+
+    Returns:
+        (模块代码, 被修改的最外层函数的路径)，路径为 None 表示修改在模块级或类体中
+    """
+    tree = copy.deepcopy(tree)
+    mutator = _Mutator(tree, mutant_id)
+    tree = ast.fix_missing_locations(mutator.visit(tree))
+    return compile(tree, filename, "exec"), mutator.scope
+
+
+def _find_code(code: types.CodeType, path: Sequence[str]) -> Optional[types.CodeType]:
+    """
+    在模块代码中按名称路径查找函数（类体中的方法）的代码对象
+    """
+    for name in path:
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType) and const.co_name == name:
+                code = const
+                break
+        else:
+            return None
+    return code
+
+
+def _find_function(module: types.ModuleType,
+                   path: Sequence[str]) -> Optional[types.FunctionType]:
+    """
+    在已导入的模块中按名称路径查找函数对象，跳过 staticmethod 等包装
+    """
+    obj: Any = module
+    for name in path:
+        namespace = getattr(obj, "__dict__", {})
+        if name not in namespace:
+            return None
+        obj = namespace[name]
+        obj = getattr(obj, "__func__", obj)
+        obj = getattr(obj, "fget", obj)
+        # functools.wraps 装饰的函数
+        while not isinstance(obj, types.FunctionType) and hasattr(obj, "__wrapped__"):
+            obj = obj.__wrapped__
+    return obj if isinstance(obj, types.FunctionType) else None
+
+
+class _ModulePatch:
+    """
+    把一个变体应用到已导入的模块上，退出时恢复
+    """
+
+    def __init__(self, modules: List[types.ModuleType], original: types.CodeType,
+                 mutated: types.CodeType, scope: Optional[Tuple[str, ...]]):
+        self.modules = modules
+        self.original = original
+        self.mutated = mutated
+        self.scope = scope
+        self._replaced: List[Tuple[types.FunctionType, types.CodeType]] = []
+
+    def __enter__(self):
+        if self.scope is not None:
+            new_code = _find_code(self.mutated, self.scope)
+            functions = [_find_function(module, self.scope) for module in self.modules]
+            if new_code is not None and all(function is not None
+                                            for function in functions):
+                for function in functions:
+                    if function.__code__.co_freevars != new_code.co_freevars:
+                        break
+                else:
+                    for function in functions:
+                        self._replaced.append((function, function.__code__))
+                        function.__code__ = new_code
+                    return self
+        try:
+            for module in self.modules:
+                exec(self.mutated, module.__dict__)
+        except BaseException:
+            self.__exit__()
+            raise
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        if self._replaced:
+            for function, code in self._replaced:
+                function.__code__ = code
+        else:
+            for module in self.modules:
+                exec(self.original, module.__dict__)
+        return False
+
+
+def loaded_modules(path: str) -> List[types.ModuleType]:
+    """
+    当前进程中从指定源文件导入的模块（同一文件可能以不同名称导入多次）
+    """
+    path = os.path.abspath(path)
+    return [module for module in list(sys.modules.values())
+            if os.path.abspath(getattr(module, "__file__", None) or "") == path]
+
+
+# 工作进程从 fork 前的父进程继承的状态，避免把语法树和代码对象逐个序列化
+_STATE: Dict[str, Any] = {}
+
+
+def _run_mutant(job: Tuple[Dict[str, Any], List[Tuple[str, List[str]]], float]
+                ) -> Dict[str, Any]:
+    """
+    运行一个变体: 依次运行覆盖它的测试，遇到第一个失败或错误时停止
+    """
+    mutant, groups, timeout = job
+    result = dict(mutant, status="survived", killed_by=None, tests_run=0)
+    start = time.perf_counter()
+    try:
+        mutated, scope = compile_mutant(_STATE["tree"], mutant["id"],
+                                        _STATE["filename"])
+    except (SyntaxError, ValueError, TypeError) as e:
+        # 修改后无法编译的变体不计入结果
+        result.update(status="invalid", error=str(e))
+        return result
+    patch = _ModulePatch(loaded_modules(_STATE["filename"]), _STATE["original"],
+                         mutated, scope)
+    try:
+        patch.__enter__()
+    except Exception as e:
+        # 修改后模块级代码出错，任何导入该模块的测试都会失败
+        result.update(status="killed", killed_by=f"{type(e).__name__}: {e}",
+                      duration=time.perf_counter() - start)
+        return result
+    try:
+        for test_file, test_ids in groups:
+            events = iter_file_events(test_file, test_ids, timeout=timeout)
+            killed = None
+            for event in events:
+                kind = event["event"]
+                if (kind in ("pass", "fail", "error", "xfail", "xpass")
+                        and not event.get("subtest")):
+                    result["tests_run"] += 1
+                if kind in ("fail", "error", "xpass") and killed is None:
+                    killed = event
+                    break
+            events.close()
+            if killed is not None:
+                timed_out = "TimeoutExceeded" in (killed.get("traceback") or "")
+                result.update(status="timeout" if timed_out else "killed",
+                              killed_by=killed["id"].split(" (")[0])
+                break
+    finally:
+        patch.__exit__()
+    result["duration"] = time.perf_counter() - start
+    return result
+
+
+def iter_mutation_results(source_file: str, test_lines: Dict[str, List[int]],
+                          test_files: Sequence[str], durations: Dict[str, float],
+                          workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    运行源文件的全部变体，按完成顺序产出每个变体的结果
+
+    被测模块必须已在当前进程中导入（例如刚刚运行过覆盖率）。工作进程由 fork
+    创建，不支持 fork 的平台上在当前进程中逐个运行。
+
+    Args:
+        source_file: 被测源文件
+        test_lines: {测试ID: [该测试在源文件中覆盖的语句行号]}
+        test_files: 测试文件路径（用于从测试ID找到文件）
+        durations: 各测试上次运行的耗时（秒），决定运行顺序和超时时间
+        workers: 进程数，None 或 1 表示在当前进程中运行
+
+    Returns:
+        变体结果的迭代器，每项在 find_mutants 的字段之外还有 status（killed、
+        timeout、survived、no_coverage 或 invalid）、killed_by、tests_run 和 duration
+    """
+    with open(source_file, encoding="utf-8") as f:
+        source = f.read()
+    tree = ast.parse(source)
+    filename = os.path.abspath(source_file)
+    _STATE.update(tree=tree, filename=filename,
+                  original=compile(tree, filename, "exec"))
+
+    paths = {normalize_path(test_file): test_file for test_file in test_files}
+    statements = statement_lines(source_file)
+    covering: Dict[int, List[str]] = {}
+    for test_id, lines in test_lines.items():
+        for line in lines:
+            covering.setdefault(line, []).append(test_id)
+
+    jobs = []
+    for mutant in find_mutants(source):
+        tests = covering.get(statements.get(mutant["line"], mutant["line"]), [])
+        if not tests:
+            yield dict(mutant, status="no_coverage", killed_by=None, tests_run=0,
+                       duration=0.0)
+            continue
+        tests = sorted(tests,
+                       key=lambda test_id: (durations.get(test_id, 0.0), test_id))
+        groups: List[Tuple[str, List[str]]] = []
+        for test_id in tests:
+            test_file = test_id.split("::", 1)[0]
+            test_file = paths.get(test_file, test_file)
+            if groups and groups[-1][0] == test_file:
+                groups[-1][1].append(test_id)
+            else:
+                groups.append((test_file, [test_id]))
+        timeout = TIMEOUT_GRACE + TIMEOUT_FACTOR * sum(durations.get(t, 0.0)
+                                                       for t in tests)
+        jobs.append((mutant, groups, timeout))
+
+    try:
+        if (workers and workers > 1
+                and "fork" in multiprocessing.get_all_start_methods()):
+            context = multiprocessing.get_context("fork")
+            with context.Pool(workers) as pool:
+                yield from pool.imap_unordered(_run_mutant, jobs)
+        else:
+            for job in jobs:
+                yield _run_mutant(job)
+    finally:
+        _STATE.clear()
+
+
+def summarize_mutants(results: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    汇总变体结果
+
+    Returns:
+        各状态的计数、total（不含无法编译的变体）、变异得分 score（被杀死和超时
+        的变体占有测试覆盖的变体的百分比）以及按位置排序的 mutants
+    """
+    counts = {status: 0 for status in ("killed", "timeout", "survived", "no_coverage",
+                                       "invalid")}
+    for result in results:
+        counts[result["status"]] += 1
+    killed = counts["killed"] + counts["timeout"]
+    covered = killed + counts["survived"]
+    return dict(counts, total=covered + counts["no_coverage"],
+                score=100.0 * killed / covered if covered else 100.0,
+                mutants=sorted(results, key=lambda r: (r["line"], r["col"], r["id"])))
@@ -0,0 +1,644 @@
+"""
+基于进程池的并行测试执行
+
+父进程把测试文件逐个分派给空闲的工作进程。工作进程在测试进行的同时把
+事件成批发回父进程，父进程按到达顺序产出这些事件，由使用方统一输出和汇总。
+
+每个工作进程通过自己的管道发回事件。工作进程在写入过程中被终止时，只有它
+自己的管道中留下不完整的消息，父进程读到 EOF 后按进程退出处理，不会阻塞。
+"""
+
+import importlib
+import math
+import multiprocessing
+import multiprocessing.connection
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple, Union
+
+from .cover import CoverageCollector
+from .report import STATUS_SYMBOLS, ConsoleReporter, ResultAggregator
+from .runner import OUTPUT_MEMORY_LIMIT, current_rss, iter_file_events
+from .timeouts import WATCHDOG_GRACE
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def default_worker_count() -> int:
+    """
+    默认的工作进程数，等于CPU核心数
+    """
+    return os.cpu_count() or 1
+
+
+# 任务: 测试文件路径，或 (测试文件路径, 要运行的测试ID列表[, 要排除的测试ID])
+Task = Union[str, Tuple[str, Optional[List[str]]],
+             Tuple[str, Optional[List[str]], Sequence[str]]]
+
+# 工作进程积攒事件的最长时间（秒），兼顾实时性和进程间通信的开销
+EVENT_FLUSH_INTERVAL = 0.05
+
+
+class ResourceLimitExceeded(Exception):
+    """
+    工作进程超出 CPU 时间限制时，在正在运行的测试中抛出
+    """
+
+
+# 工作进程向父进程报告当前测试ID的共享内存大小（字节）
+STATUS_SIZE = 1024
+
+# 工作进程地址空间上限相对于内存上限的倍数（虚拟内存总是大于常驻内存）
+AS_LIMIT_FACTOR = 2
+
+
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _set_cpu_budget(seconds: float) -> None:
+    """
+    把 CPU 时间软限制设为已用时间之后 seconds 秒，超出时内核发送 SIGXCPU
+    """
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(math.ceil(_cpu_seconds() + seconds))
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _apply_limits(memory_limit: Optional[int], cpu_limit: Optional[float]) -> None:
+    """
+    在工作进程中设置资源限制
+
+    Linux 不执行 RLIMIT_RSS，常驻内存由每个测试结束后的检查限制；另外把地址
+    空间（RLIMIT_AS）限制在内存上限的 AS_LIMIT_FACTOR 倍，失控的分配直接在
+    测试中得到 MemoryError，不会拖垮整台机器。CPU 时间限制只调整软限制，超出
+    时 SIGXCPU 的处理函数在正在运行的测试中抛出 ResourceLimitExceeded。
+    """
+    if memory_limit:
+        for name, limit in (("RLIMIT_RSS", memory_limit),
+                            ("RLIMIT_AS", memory_limit * AS_LIMIT_FACTOR)):
+            if not hasattr(resource, name):
+                continue
+            which = getattr(resource, name)
+            _, hard = resource.getrlimit(which)
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            resource.setrlimit(which, (limit, hard))
+    if cpu_limit:
+        def on_cpu_limit(signum, frame):
+            # 先放宽软限制，避免内核每秒重复发送 SIGXCPU
+            _set_cpu_budget(cpu_limit)
+            raise ResourceLimitExceeded(f"工作进程超出 CPU 时间限制 ({cpu_limit}s)")
+        signal.signal(signal.SIGXCPU, on_cpu_limit)
+
+
+def _limit_tripped(event: Dict[str, Any], memory_limit: Optional[int],
+                   cpu_limit: Optional[float], check_rss: bool = True) -> Optional[str]:
+    """
+    检查一个测试结果是否触发了资源限制
+
+    常驻内存超出限制时把该结果改为错误（已失败的测试在回溯后补充说明），
+    这样计数与测试一一对应。同一任务中常驻内存超限后内存不会回落，之后的
+    测试不再检查（check_rss 为假），以免把它们都记为错误。
+
+    Returns:
+        触发的限制: "cpu"、"memory"（MemoryError）或 "rss"，未触发时为 None。
+        触发后该工作进程运行完当前任务被替换
+    """
+    traceback = event.get("traceback", "")
+    if event["event"] == "error":
+        if cpu_limit and "ResourceLimitExceeded" in traceback:
+            return "cpu"
+        if memory_limit and "MemoryError" in traceback:
+            return "memory"
+    if memory_limit and check_rss and not event.get("subtest"):
+        rss = current_rss()
+        if rss is not None and rss > memory_limit:
+            message = (f"工作进程常驻内存 {rss // 2**20} MiB 超出限制 "
+                       f"{memory_limit // 2**20} MiB，运行完本文件后替换该进程\n")
+            if event["event"] in ("fail", "error"):
+                event["traceback"] = f"{traceback.rstrip()}\n{message}"
+            else:
+                event.update(event="error", status="error", traceback=message)
+                event.pop("reason", None)
+            return "rss"
+    return None
+
+
+def _worker_main(worker_id: int, task_queue, conn,
+                 file_options: Optional[Dict[str, Any]] = None,
+                 limits: Optional[Dict[str, Any]] = None, status=None,
+                 dump_file: Optional[str] = None,
+                 coverage: Optional[Dict[str, Any]] = None) -> None:
+    """
+    工作进程主循环: 从自己的任务队列取测试任务并执行，None 表示退出
+
+    file_options 为传给 iter_file_events 的关键字参数（trace_memory 等）；limits
+    为资源限制 memory（字节）和 cpu（秒）；status 为共享内存，记录正在运行的
+    测试ID，工作进程被强制终止时父进程据此报告出错的测试；dump_file 为测试
+    超时后无法中断时看门狗写入调用栈的文件；coverage 为 CoverageCollector 的
+    参数，指定时收集覆盖率，每个任务结束后写入该进程自己的数据文件。
+
+    执行过程中产生的事件成批写入管道 conn: ("events", ...) 为中间批次，任务
+    结束时发送 ("done", ...) 并附带剩余的事件，以及是否因触发资源限制需要换用
+    新进程。
+    """
+    memory_limit = (limits or {}).get("memory")
+    cpu_limit = (limits or {}).get("cpu")
+    _apply_limits(memory_limit, cpu_limit)
+    collector = None
+    if coverage is not None:
+        collector = CoverageCollector(**coverage)
+        collector.start()
+    options = dict(file_options or {}, watchdog_file=dump_file)
+    if collector is not None and collector.contexts:
+        options["coverage_context"] = collector.switch_context
+    if status is not None:
+        def on_test_start(test_id):
+            status.value = test_id.encode("utf-8")[:STATUS_SIZE - 1]
+        options["on_test_start"] = on_test_start
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, test_file, test_ids, exclude_ids = task
+        if cpu_limit:
+            _set_cpu_budget(cpu_limit)
+        batch = []
+        tripped = False
+        check_rss = True
+        flushed_at = time.perf_counter()
+        try:
+            for event in iter_file_events(test_file, test_ids, exclude_ids=exclude_ids,
+                                          **options):
+                batch.append(event)
+                if event["event"] in STATUS_SYMBOLS and limits:
+                    reason = _limit_tripped(event, memory_limit, cpu_limit, check_rss)
+                    if reason is not None:
+                        tripped = True
+                        check_rss = check_rss and reason != "rss"
+                # start 事件之后不刷新，使它与随后的结果在同一批中发送
+                if event["event"] == "start":
+                    continue
+                now = time.perf_counter()
+                if now - flushed_at >= EVENT_FLUSH_INTERVAL:
+                    conn.send(("events", worker_id, task_id, batch, False))
+                    batch = []
+                    flushed_at = now
+        except BaseException as e:
+            batch.append({"event": "timing", "file": test_file, "tests_run": 0,
+                          "load_error": f"{type(e).__name__}: {e}", "duration": 0.0})
+            tripped = tripped or isinstance(e, (ResourceLimitExceeded, MemoryError))
+        if status is not None:
+            status.value = b""
+        if collector is not None:
+            collector.save()
+        conn.send(("done", worker_id, task_id, batch, tripped))
+    if collector is not None:
+        collector.stop()
+    conn.close()
+
+
+class ParallelRunner:
+    """
+    把测试任务分片到多个工作进程中运行
+
+    任务可以是整个测试文件，也可以是文件中的一部分测试（例如一个测试类）。
+
+    每个工作进程同一时间只持有一个任务，父进程因此总能知道哪个文件在哪个
+    进程上运行；工作进程意外退出时，正在运行的测试（未知时为该文件）记为
+    错误并补充新的工作进程。
+
+    可以限制每个工作进程运行的测试数、内存和 CPU 时间。测试触发内存或 CPU
+    限制时记为错误，该工作进程运行完当前任务后被替换，整个运行不受影响。
+
+    测试超时（见 timeouts 模块）时记为错误；超时后仍无法中断的测试由看门狗
+    终止工作进程。进程被强制终止后，任务中尚未得到结果的其余测试在新进程中
+    继续运行。
+
+    指定 preload 时以"zygote"方式运行: 父进程先导入这些共享依赖，再用 fork
+    为每 tasks_per_worker 个任务创建一个全新的子进程。子进程继承已导入的
+    模块，既保证测试文件之间相互隔离，又不必重复支付导入开销。
+    """
+
+    def __init__(self, workers: int, verbose: bool = True,
+                 stream: Optional[TextIO] = None,
+                 preload: Optional[Sequence[str]] = None,
+                 tasks_per_worker: Optional[int] = None,
+                 trace_memory: bool = False,
+                 capture_output: bool = False,
+                 output_limit: int = OUTPUT_MEMORY_LIMIT,
+                 evict_modules: bool = False,
+                 collect_garbage: bool = False,
+                 max_tests_per_worker: Optional[int] = None,
+                 worker_memory_limit: Optional[int] = None,
+                 worker_cpu_limit: Optional[float] = None,
+                 timeout: Optional[float] = None,
+                 file_timeout: Optional[float] = None,
+                 exitfirst: bool = False,
+                 coverage_dir: Optional[str] = None,
+                 coverage_source: Optional[Sequence[str]] = None,
+                 coverage_backend: str = "auto",
+                 coverage_contexts: bool = False):
+        """
+        初始化并行执行器
+
+        Args:
+            workers: 同时运行的工作进程数
+            verbose: 是否逐个显示测试结果
+            stream: 输出流，默认为 sys.stderr（与 unittest 一致）
+            preload: 在父进程中预先导入的模块名，指定时使用 fork 创建工作进程
+            tasks_per_worker: 每个工作进程最多运行的任务数，达到后换用新进程；
+                None 表示不限制。zygote 模式下默认为1，即每个文件一个新进程
+            trace_memory: 是否用 tracemalloc 记录每个测试的内存分配峰值
+            capture_output: 是否捕获每个测试的标准输出和标准错误
+            output_limit: 捕获输出时每个流在内存中最多保留的字符数
+            evict_modules: 每个文件运行后是否淘汰其间新导入的项目模块
+            collect_garbage: 每个文件运行后是否执行 gc.collect()
+            max_tests_per_worker: 每个工作进程最多运行的测试数，在达到后的任务
+                边界换用新进程；None 表示不限制
+            worker_memory_limit: 每个工作进程的内存上限（字节），测试结束后常驻
+                内存超出时该测试记为错误；地址空间限制为它的 AS_LIMIT_FACTOR 倍
+            worker_cpu_limit: 每个工作进程运行一个任务的 CPU 时间上限（秒）
+            timeout: 每个测试的默认超时时间（秒）
+            file_timeout: 每个任务（测试文件或其中的一部分）的超时时间（秒）
+            exitfirst: 是否在第一个失败或错误后终止所有工作进程，停止运行
+            coverage_dir: 指定时每个工作进程收集覆盖率，数据文件写入该目录，
+                由调用方在运行结束后合并（见 cover.combine_coverage）
+            coverage_source: 只统计这些目录或包中的代码
+            coverage_backend: 覆盖率后端，见 cover.resolve_backend
+            coverage_contexts: 是否按测试记录覆盖的行
+        """
+        self.workers = max(1, workers)
+        self.verbose = verbose
+        self.stream = stream if stream is not None else sys.stderr
+        self.preload = list(preload) if preload is not None else None
+        if self.preload is not None and tasks_per_worker is None:
+            tasks_per_worker = 1
+        self.tasks_per_worker = tasks_per_worker
+        self.file_options = {"trace_memory": trace_memory,
+                             "capture_output": capture_output,
+                             "output_limit": output_limit,
+                             "evict_modules": evict_modules,
+                             "collect_garbage": collect_garbage, "timeout": timeout,
+                             "file_timeout": file_timeout}
+        self.max_tests_per_worker = max_tests_per_worker
+        self.exitfirst = exitfirst
+        self.coverage = None
+        if coverage_dir is not None:
+            self.coverage = {"data_dir": coverage_dir, "source": coverage_source,
+                             "backend": coverage_backend, "contexts": coverage_contexts}
+        self.limits = None
+        if worker_memory_limit or worker_cpu_limit:
+            if resource is None:
+                print("警告: 当前平台不支持 resource 模块，忽略工作进程的资源限制")
+            else:
+                self.limits = {"memory": worker_memory_limit, "cpu": worker_cpu_limit}
+        fork_available = "fork" in multiprocessing.get_all_start_methods()
+        if self.preload is not None and fork_available:
+            self._context = multiprocessing.get_context("fork")
+        else:
+            if self.preload is not None:
+                print("警告: 当前平台不支持 fork，预加载的模块不会被工作进程继承")
+            self._context = multiprocessing.get_context()
+        self.preload_stats: Optional[Dict[str, Any]] = None
+
+    def _preload_modules(self) -> float:
+        """
+        在父进程中导入共享依赖
+
+        Returns:
+            冷导入耗时（秒），已导入过的模块不计入
+        """
+        elapsed = 0.0
+        for name in self.preload:
+            if name in sys.modules:
+                continue
+            start_time = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                print(f"预加载模块 {name} 失败: {e}")
+            elapsed += time.perf_counter() - start_time
+        return elapsed
+
+    def run(self, tasks: Sequence[Task],
+            predicted_makespan: Optional[float] = None,
+            estimates: Optional[Sequence[float]] = None,
+            expected_tests: Optional[int] = None) -> Dict[str, Any]:
+        """
+        并行运行测试任务，输出结果并汇总
+
+        参数与 iter_events 相同。
+
+        Returns:
+            合并后的测试结果统计信息
+        """
+        reporter = ConsoleReporter(self.verbose, self.stream)
+        aggregator = ResultAggregator()
+        events = self.iter_events(tasks, predicted_makespan, estimates, expected_tests)
+        for event in events:
+            reporter.handle(event)
+            aggregator.add(event)
+        return aggregator.results()
+
+    def iter_events(self, tasks: Sequence[Task],
+                    predicted_makespan: Optional[float] = None,
+                    estimates: Optional[Sequence[float]] = None,
+                    expected_tests: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        并行运行测试任务，按到达顺序产出各工作进程的事件
+
+        除 runner 模块定义的测试事件外，提供估算耗时时每个任务结束后还产出
+        progress 事件（tests、expected、eta），最后产出 summary 事件（计数、
+        elapsed、workers，以及 schedule 和 preload 信息）。
+
+        Args:
+            tasks: 任务列表，按列表顺序分派
+            predicted_makespan: 调度器预测的总耗时，提供时与实际耗时一起报告
+            estimates: 与 tasks 一一对应的估算耗时，用于估算剩余时间
+            expected_tests: 静态收集得到的测试总数，用于显示进度
+
+        Returns:
+            事件的迭代器
+        """
+        normalized = [(task, None, ()) if isinstance(task, str)
+                      else (tuple(task) + ((),))[:3]
+                      for task in tasks]
+        self._estimates = list(estimates) if estimates is not None else None
+        self._expected_tests = expected_tests
+        preload_time = self._preload_modules() if self.preload else 0.0
+        self._spawned = 0
+        self._respawned = 0
+        self._stopped = False
+        counter = ResultAggregator(keep_details=False)
+        start_time = time.perf_counter()
+        for event in self._execute(normalized):
+            counter.add(event)
+            yield event
+        elapsed = time.perf_counter() - start_time
+
+        summary = dict(counter.counts(), event="summary", elapsed=elapsed,
+                       workers=self.workers)
+        if self._respawned:
+            summary["respawned"] = self._respawned
+        if self._stopped:
+            summary["stopped"] = True
+        if predicted_makespan is not None:
+            summary["schedule"] = {"predicted_makespan": predicted_makespan,
+                                   "actual_makespan": elapsed}
+        if self.preload:
+            # 每个子进程若从头启动都要重新导入这些依赖，fork 后则直接继承
+            self.preload_stats = {"modules": self.preload, "import_time": preload_time,
+                                  "children": self._spawned,
+                                  "saved_time": preload_time * self._spawned}
+            summary["preload"] = self.preload_stats
+        yield summary
+
+    def _execute(self, tasks: List[Tuple[str, Optional[List[str]], Sequence[str]]]
+                 ) -> Iterator[Dict[str, Any]]:
+        """
+        分派任务并产出工作进程发回的事件
+        """
+        pending = [(task_id, test_file, test_ids, tuple(exclude_ids))
+                   for task_id, (test_file, test_ids, exclude_ids) in enumerate(tasks)]
+        pending.reverse()
+        self._progress = {"tests": 0, "estimated_done": 0.0, "actual_done": 0.0,
+                          "remaining": sum(self._estimates) if self._estimates else 0.0}
+        workers = {}
+        # 工作进程 -> 父进程一端的管道，读到 EOF 后移除
+        connections = {}
+        assigned = {}
+        tasks_done = {}
+        tests_done = {}
+        statuses = {}
+        # 工作进程 -> 最近收到的 start 事件的测试ID和是否已收到其结果
+        last_started = {}
+        # 工作进程 -> 当前任务中已收到结果的测试ID
+        reported = {}
+        retired = []
+        next_worker_id = [0]
+        dump_dir = tempfile.mkdtemp(prefix="py_auto_tester-")
+
+        def spawn():
+            worker_id = next_worker_id[0]
+            next_worker_id[0] += 1
+            task_queue = self._context.Queue()
+            status = self._context.Array("c", STATUS_SIZE, lock=False)
+            receiver, sender = self._context.Pipe(duplex=False)
+            process = self._context.Process(
+                target=_worker_main,
+                args=(worker_id, task_queue, sender, self.file_options, self.limits,
+                      status, os.path.join(dump_dir, f"worker-{worker_id}.txt"),
+                      self.coverage),
+                daemon=True,
+            )
+            process.start()
+            # 父进程不保留写入端，工作进程退出后读取端才能读到 EOF
+            sender.close()
+            self._spawned += 1
+            workers[worker_id] = (process, task_queue)
+            connections[worker_id] = receiver
+            statuses[worker_id] = status
+            tasks_done[worker_id] = 0
+            tests_done[worker_id] = 0
+            return worker_id
+
+        def dispatch(worker_id):
+            _, task_queue = workers[worker_id]
+            if pending:
+                task = pending.pop()
+                assigned[worker_id] = (task, time.perf_counter())
+                reported[worker_id] = set()
+                task_queue.put(task)
+            else:
+                assigned.pop(worker_id, None)
+                task_queue.put(None)
+
+        def retire(worker_id):
+            process, task_queue = workers.pop(worker_id)
+            statuses.pop(worker_id)
+            connection = connections.pop(worker_id, None)
+            if connection is not None:
+                connection.close()
+            task_queue.put(None)
+            task_queue.close()
+            retired.append(process)
+
+        def receive(connection):
+            try:
+                return connection.recv()
+            except (EOFError, OSError):
+                # 工作进程已退出，或在写入消息的过程中被终止
+                return None
+
+        for _ in range(min(self.workers, len(tasks))):
+            dispatch(spawn())
+
+        try:
+            while assigned:
+                # 回收已退出的旧进程，避免长时间运行时积累僵尸进程
+                retired[:] = [process for process in retired if process.is_alive()]
+                ready = multiprocessing.connection.wait(list(connections.values()),
+                                                        timeout=0.5)
+                for connection in ready:
+                    message = receive(connection)
+                    if message is None:
+                        for worker_id, other in list(connections.items()):
+                            if other is connection:
+                                del connections[worker_id]
+                        connection.close()
+                        continue
+                    kind, worker_id, task_id, events, tripped = message
+                    if worker_id not in workers:
+                        continue
+                    for event in events:
+                        yield event
+                        if self.exitfirst and event["event"] in ("fail", "error"):
+                            self._stopped = True
+                            return
+                        if event["event"] == "start":
+                            tests_done[worker_id] += 1
+                            last_started[worker_id] = (event["id"], False)
+                        elif (event["event"] in STATUS_SYMBOLS
+                              and not event.get("subtest")):
+                            last_started[worker_id] = (event["id"], True)
+                            reported.setdefault(worker_id, set()).add(event["id"])
+                        elif event["event"] == "timing":
+                            yield from self._progress_events(task_id, event)
+                    if kind == "done":
+                        assigned.pop(worker_id, None)
+                        tasks_done[worker_id] += 1
+                        if tripped:
+                            self._respawned += 1
+                        if (tripped
+                                or (self.tasks_per_worker is not None
+                                    and tasks_done[worker_id] >= self.tasks_per_worker)
+                                or (self.max_tests_per_worker is not None
+                                    and tests_done[worker_id]
+                                    >= self.max_tests_per_worker)):
+                            # 触发资源限制或达到任务数、测试数上限，换一个全新的工作进程
+                            retire(worker_id)
+                            if pending:
+                                dispatch(spawn())
+                        else:
+                            dispatch(worker_id)
+
+                # 检查持有任务的工作进程是否意外退出。先读完它的管道（读到 EOF），
+                # 保证退出前发出的事件都已处理
+                for worker_id in list(assigned):
+                    process, _ = workers[worker_id]
+                    if process.is_alive():
+                        continue
+                    connection = connections.get(worker_id)
+                    if connection is not None:
+                        if connection.poll():
+                            continue
+                        # 管道已读空，但写入端被测试启动的子进程继承，读不到 EOF
+                        del connections[worker_id]
+                        connection.close()
+                    task, dispatched_at = assigned.pop(worker_id)
+                    task_id, test_file, test_ids, excluded = task
+                    test_id = statuses.pop(worker_id).value.decode("utf-8", "replace")
+                    started_id, finished = last_started.pop(worker_id, (None, False))
+                    if test_id and test_id == started_id and finished:
+                        # 最后一个测试已经结束，进程在之后的清理阶段退出
+                        test_id = ""
+                    if not test_id or test_id != started_id:
+                        # 该测试的 start 事件随未发送的批次一起丢失，这里补上
+                        yield {"event": "start", "id": test_id or test_file,
+                               "file": test_file, "description": test_id or test_file}
+                    dump_file = os.path.join(dump_dir, f"worker-{worker_id}.txt")
+                    yield {"event": "error", "id": test_id or test_file,
+                           "file": test_file,
+                           "description": test_id or test_file, "status": "error",
+                           "traceback": self._exit_message(process.exitcode, dump_file),
+                           "duration": 0.0}
+                    if self.exitfirst:
+                        self._stopped = True
+                        return
+                    if test_id:
+                        # 跳过已有结果的测试和导致退出的测试，在新进程中继续运行该任务
+                        skip = (set(excluded) | reported.pop(worker_id, set())
+                                | {test_id})
+                        pending.append((task_id, test_file, test_ids, tuple(skip)))
+                    else:
+                        timing = {"event": "timing", "file": test_file, "tests_run": 0,
+                                  "load_error": None,
+                                  "duration": time.perf_counter() - dispatched_at}
+                        yield timing
+                        yield from self._progress_events(task_id, timing)
+                    del workers[worker_id]
+                    self._respawned += 1
+                    if pending:
+                        dispatch(spawn())
+        finally:
+            for process, task_queue in workers.values():
+                if self._stopped:
+                    # 不等待正在运行的测试结束
+                    process.terminate()
+                elif process.is_alive():
+                    task_queue.put(None)
+            for process in retired + [process for process, _ in workers.values()]:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+            for connection in connections.values():
+                connection.close()
+            shutil.rmtree(dump_dir, ignore_errors=True)
+
+    def _exit_message(self, exitcode: int, dump_file: str) -> str:
+        """
+        工作进程意外退出时的错误信息，看门狗终止进程时附带它写下的调用栈
+        """
+        try:
+            with open(dump_file, encoding="utf-8", errors="replace") as f:
+                stacks = f.read()
+        except OSError:
+            stacks = ""
+        if stacks:
+            return (f"各线程的调用栈:\n{stacks}\n测试超时后在 {WATCHDOG_GRACE} 秒内未能中断，"
+                    f"看门狗终止了工作进程")
+        if exitcode is not None and exitcode < 0:
+            try:
+                reason = f"被信号 {signal.Signals(-exitcode).name} 终止"
+            except ValueError:
+                reason = f"被信号 {-exitcode} 终止"
+        else:
+            reason = f"退出码 {exitcode}"
+        message = f"工作进程异常退出 ({reason})"
+        if self.limits:
+            message += "，可能超出了工作进程的资源限制"
+        return message
+
+    def _progress_events(self, task_id: int,
+                         timing: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        在每个任务结束后产出测试进度和预计剩余时间
+        """
+        progress = self._progress
+        progress["tests"] += timing["tests_run"]
+        if self._estimates is None:
+            return
+        estimate = self._estimates[task_id]
+        progress["remaining"] -= estimate
+        progress["estimated_done"] += estimate
+        progress["actual_done"] += timing["duration"]
+        if progress["estimated_done"] <= 0:
+            return
+
+        # 用已完成任务的实际/估算耗时比例修正剩余任务的估算
+        ratio = progress["actual_done"] / progress["estimated_done"]
+        eta = max(0.0, progress["remaining"]) * ratio / self.workers
+        yield {"event": "progress", "tests": progress["tests"],
+               "expected": self._expected_tests, "eta": eta}
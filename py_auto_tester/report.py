@@ -0,0 +1,391 @@
+"""
+测试结果的汇总与文本输出
+
+汇总和输出都以 runner 模块定义的事件流为输入，边运行边处理，不需要保留完整
+的测试记录。只依赖标准库中的轻量模块，守护进程的客户端也使用这里的类输出结果。
+"""
+
+import sys
+from typing import Any, Dict, List, Optional, Set, TextIO, Tuple
+
+
+# 每种测试状态在非详细模式和详细模式下的显示形式
+STATUS_SYMBOLS = {
+    "pass": (".", "ok"),
+    "fail": ("F", "FAIL"),
+    "error": ("E", "ERROR"),
+    "skip": ("s", "skipped"),
+    "xfail": ("x", "expected failure"),
+    "xpass": ("u", "unexpected success"),
+}
+
+
+# 汇总中保存的每条回溯的默认最大字符数
+TRACEBACK_LIMIT = 20000
+
+
+def truncate_text(text: str, limit: Optional[int]) -> str:
+    """
+    把过长的文本截断到 limit 个字符左右，保留开头和结尾（回溯的结尾是异常信息）
+
+    Args:
+        text: 原文本
+        limit: 最大字符数，None 表示不截断
+
+    Returns:
+        截断后的文本，中间以一行说明代替被省略的部分
+    """
+    if limit is None or len(text) <= limit:
+        return text
+    head = limit // 3
+    tail = limit - head
+    return (f"{text[:head]}\n... [省略了 {len(text) - limit} 个字符] ...\n"
+            f"{text[len(text) - tail:]}")
+
+
+def timing_entry(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    从测试记录（或测试结果事件）中提取耗时和内存信息
+
+    Returns:
+        包含 id、status、duration、cpu_time，记录了内存时还有 memory_peak 的字典
+    """
+    entry = {"id": record["id"], "status": record["status"],
+             "duration": record["duration"], "cpu_time": record.get("cpu_time", 0.0)}
+    if "memory_peak" in record:
+        entry["memory_peak"] = record["memory_peak"]
+    return entry
+
+
+class ResultAggregator:
+    """
+    把事件流汇总成 run_tests 返回的统计字典
+
+    只保留失败和错误的回溯（截断到 traceback_limit 个字符）、失败测试捕获的
+    输出以及每个测试的耗时信息，不保留完整的测试记录。
+
+    计数以测试为单位: 有多个子测试失败的测试只计一次（按第一个失败结果计为
+    失败或错误），每个失败的子测试仍分别记录回溯。
+    """
+
+    def __init__(self, keep_details: bool = True,
+                 traceback_limit: Optional[int] = TRACEBACK_LIMIT,
+                 keep_timings: bool = True):
+        """
+        初始化汇总器
+
+        Args:
+            keep_details: 是否保留失败详情和每个测试的耗时，为假时只计数
+            traceback_limit: 每条回溯保存的最大字符数，None 表示不截断
+            keep_timings: 是否保留每个测试和每个文件的耗时，为假时只保留失败详情
+        """
+        self.keep_details = keep_details
+        self.keep_timings = keep_details and keep_timings
+        self.traceback_limit = traceback_limit
+        self.total = 0
+        self.failed = 0
+        self.errors = 0
+        self.failures: List[Tuple[str, str]] = []
+        self.error_details: List[Tuple[str, str]] = []
+        self.tests: List[Dict[str, Any]] = []
+        self.outputs: Dict[str, Dict[str, str]] = {}
+        self.files: List[Dict[str, Any]] = []
+        self.extra: Dict[str, Any] = {}
+        # 已计入 failed 或 errors 的测试ID
+        self._counted: Set[str] = set()
+
+    def add(self, event: Dict[str, Any]) -> None:
+        """
+        处理一个事件
+        """
+        kind = event["event"]
+        if kind == "start":
+            self.total += 1
+        elif kind in STATUS_SYMBOLS:
+            if kind in ("fail", "error"):
+                test_id = event.get("parent", event["id"])
+                if test_id not in self._counted:
+                    self._counted.add(test_id)
+                    if kind == "fail":
+                        self.failed += 1
+                    else:
+                        self.errors += 1
+                if self.keep_details:
+                    target = self.failures if kind == "fail" else self.error_details
+                    traceback = truncate_text(event["traceback"], self.traceback_limit)
+                    target.append((event["id"], traceback))
+                    output = {name: event[name] for name in ("stdout", "stderr")
+                              if name in event}
+                    if output:
+                        self.outputs[event["id"]] = output
+            # 子测试和夹具错误不是独立的测试，不计入耗时列表
+            if self.keep_timings and not (event.get("subtest") or event.get("fixture")):
+                self.tests.append(timing_entry(event))
+        elif kind == "timing" and self.keep_timings:
+            self.files.append({key: event.get(key) for key in
+                               ("file", "duration", "tests_run", "rss", "rss_delta")})
+        elif kind == "summary":
+            self.extra = {key: event[key] for key in
+                          ("schedule", "preload", "respawned", "stopped", "coverage")
+                          if key in event}
+
+    def counts(self) -> Dict[str, int]:
+        """
+        返回 total、passed、failed、errors 计数
+
+        夹具错误没有对应的 start 事件，passed 不会小于0。
+        """
+        passed = max(0, self.total - self.failed - self.errors)
+        return {"total": self.total, "passed": passed,
+                "failed": self.failed, "errors": self.errors}
+
+    def results(self) -> Dict[str, Any]:
+        """
+        返回与 run_tests 格式一致的统计字典，失败和错误以 (测试ID, 回溯) 元组给出，
+        失败测试捕获的输出按测试ID放在 outputs 中，每个文件的耗时和常驻内存放在 files 中
+        """
+        results = self.counts()
+        results.update(failures=self.failures, error_details=self.error_details,
+                       tests=self.tests, outputs=self.outputs, files=self.files)
+        results.update(self.extra)
+        return results
+
+
+class ConsoleReporter:
+    """
+    把事件流输出为与 unittest.TextTestRunner 一致的文本
+
+    测试结果在事件到达时立即输出，失败详情在收到 summary 事件时统一输出。
+    """
+
+    def __init__(self, verbose: bool, stream: Optional[TextIO] = None,
+                 traceback_limit: Optional[int] = TRACEBACK_LIMIT):
+        """
+        初始化文本输出
+
+        Args:
+            verbose: 是否逐个显示测试
+            stream: 输出流，默认为 sys.stderr（与 unittest 一致）
+            traceback_limit: 每条回溯显示的最大字符数，None 表示不截断
+        """
+        self.verbose = verbose
+        self.stream = stream if stream is not None else sys.stderr
+        # 只为最后输出失败详情，不保留每个测试的耗时
+        self._failures = ResultAggregator(traceback_limit=traceback_limit,
+                                          keep_timings=False)
+
+    def handle(self, event: Dict[str, Any]) -> None:
+        """
+        处理一个事件
+        """
+        kind = event["event"]
+        if kind == "start":
+            self._failures.add(event)
+        elif kind in STATUS_SYMBOLS:
+            self._failures.add(event)
+            symbol, word = STATUS_SYMBOLS[kind]
+            if self.verbose:
+                if kind == "skip":
+                    word = f"skipped {event.get('reason', '')!r}"
+                self.stream.write(f"{event['description']} ... {word}\n")
+            else:
+                self.stream.write(symbol)
+            self.stream.flush()
+        elif kind == "timing" and event["load_error"]:
+            print(f"加载测试文件 {event['file']} 时出错: {event['load_error']}")
+        elif kind == "progress" and self.verbose:
+            total = f"/{event['expected']}" if event.get("expected") else ""
+            self.stream.write(f"[进度 {event['tests']}{total} 个测试, "
+                              f"预计剩余 {event['eta']:.1f}s]\n")
+            self.stream.flush()
+        elif kind == "summary":
+            self._print_summary(event)
+
+    def _print_summary(self, event: Dict[str, Any]) -> None:
+        results = self._failures.results()
+        results.update(event)
+        print_summary(results, event["elapsed"], self.verbose, self.stream,
+                      event.get("workers"))
+        schedule = event.get("schedule")
+        if schedule:
+            self.stream.write(f"负载均衡: 预计耗时 {schedule['predicted_makespan']:.3f}s, "
+                              f"实际耗时 {schedule['actual_makespan']:.3f}s\n")
+        preload = event.get("preload")
+        if preload:
+            self.stream.write(f"预加载 {len(preload['modules'])} 个模块耗时 "
+                              f"{preload['import_time']:.3f}s, "
+                              f"fork 了 {preload['children']} 个子进程, "
+                              f"相比冷启动约节省 {preload['saved_time']:.3f}s 导入时间\n")
+        if event.get("stopped"):
+            self.stream.write("遇到第一个失败后停止了运行，其余的测试没有运行\n")
+        if event.get("respawned"):
+            self.stream.write(f"因进程崩溃或超出资源限制替换了 {event['respawned']} 个工作进程\n")
+        self.stream.flush()
+
+
+def print_summary(results: Dict[str, Any], elapsed: float, verbose: bool,
+                  stream: TextIO, workers: Optional[int] = None) -> None:
+    """
+    输出失败详情（包括捕获的输出）和运行汇总
+
+    Args:
+        results: 汇总后的统计字典
+        elapsed: 运行耗时（秒）
+        verbose: 是否为详细模式
+        stream: 输出流
+        workers: 工作进程数，提供时显示在汇总行中
+    """
+    if not verbose:
+        stream.write("\n")
+    outputs = results.get("outputs", {})
+    for flavour, entries in (("ERROR", results["error_details"]),
+                             ("FAIL", results["failures"])):
+        for test_id, traceback in entries:
+            stream.write("=" * 70 + "\n")
+            stream.write(f"{flavour}: {test_id}\n")
+            stream.write("-" * 70 + "\n")
+            stream.write(f"{traceback}\n")
+            # 与 unittest 的 buffer 模式一致，输出附在回溯之后
+            for name, label in (("stdout", "Stdout"), ("stderr", "Stderr")):
+                output = outputs.get(test_id, {}).get(name)
+                if output:
+                    newline = "" if output.endswith("\n") else "\n"
+                    stream.write(f"{label}:\n{output}{newline}")
+    stream.write("-" * 70 + "\n")
+    suffix = f" ({workers} workers)" if workers else ""
+    stream.write(f"Ran {results['total']} tests in {elapsed:.3f}s{suffix}\n\n")
+    if results["failed"] or results["errors"]:
+        details = []
+        if results["failed"]:
+            details.append(f"failures={results['failed']}")
+        if results["errors"]:
+            details.append(f"errors={results['errors']}")
+        stream.write(f"FAILED ({', '.join(details)})\n")
+    else:
+        stream.write("OK\n")
+    stream.flush()
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def print_durations(tests: List[Dict[str, Any]], count: int, stream: TextIO) -> None:
+    """
+    输出最慢的测试，以及（记录了内存时）内存分配峰值最高的测试
+
+    Args:
+        tests: run_tests 返回的每个测试的耗时信息
+        count: 每个列表显示的测试数，0 表示全部显示
+        stream: 输出流
+    """
+    limit = count or None
+    slowest = sorted(tests, key=lambda t: t["duration"], reverse=True)[:limit]
+    stream.write(f"最慢的 {len(slowest)} 个测试:\n")
+    for test in slowest:
+        stream.write(f"  {test['duration']:8.3f}s 墙钟  {test['cpu_time']:8.3f}s CPU  "
+                     f"{test['id']}\n")
+
+    traced = [t for t in tests if "memory_peak" in t]
+    if traced:
+        hungriest = sorted(traced, key=lambda t: t["memory_peak"], reverse=True)[:limit]
+        stream.write(f"内存分配峰值最高的 {len(hungriest)} 个测试:\n")
+        for test in hungriest:
+            stream.write(f"  {_format_bytes(test['memory_peak']):>12}  {test['id']}\n")
+    stream.flush()
+
+
+def print_rss_report(files: List[Dict[str, Any]], count: int, stream: TextIO) -> None:
+    """
+    输出运行期间的最高常驻内存，以及运行后内存增长最多的测试文件
+
+    Args:
+        files: run_tests 返回的每个文件的信息
+        count: 显示的文件数，0 表示全部显示
+        stream: 输出流
+    """
+    measured = [f for f in files if f.get("rss") is not None]
+    if not measured:
+        stream.write("当前平台无法获取常驻内存\n")
+        stream.flush()
+        return
+    stream.write(f"常驻内存: 最高 {_format_bytes(max(f['rss'] for f in measured))}, "
+                 f"最后一个文件结束后 {_format_bytes(measured[-1]['rss'])}\n")
+    grown = [f for f in measured if f.get("rss_delta") is not None]
+    grown = sorted(grown, key=lambda f: f["rss_delta"], reverse=True)[:count or None]
+    stream.write(f"常驻内存增长最多的 {len(grown)} 个测试文件:\n")
+    for test_file in grown:
+        delta = test_file["rss_delta"]
+        change = ("+" if delta >= 0 else "-") + _format_bytes(abs(delta))
+        stream.write(f"  {change:>12}  "
+                     f"(之后 {_format_bytes(test_file['rss'])})  {test_file['file']}\n")
+    stream.flush()
+
+
+def print_coverage_report(coverage: Dict[str, Any], stream: TextIO) -> None:
+    """
+    输出每个文件的覆盖率和未覆盖的行
+
+    Args:
+        coverage: run_tests 返回的 coverage 汇总
+        stream: 输出流
+    """
+    if not coverage.get("coverage_available"):
+        stream.write(f"覆盖率信息不可用: {coverage.get('message', '')}\n")
+        stream.flush()
+        return
+    covered = coverage["statements"] - coverage["missing"]
+    stream.write(f"覆盖率 {coverage['percent']:.1f}% "
+                 f"({covered}/{coverage['statements']} 行):\n")
+    for entry in coverage["files"]:
+        lines = f"{entry['statements'] - entry['missing']}/{entry['statements']}"
+        missing = f"  未覆盖: {entry['missing_lines']}" if entry["missing_lines"] else ""
+        stream.write(f"  {entry['percent']:6.1f}%  {lines:>11}  "
+                     f"{entry['file']}{missing}\n")
+    stream.write(f"数据文件: {coverage['data_file']}\n")
+    stream.flush()
+
+
+def print_minimize_report(minimized: Dict[str, Any], stream: TextIO) -> None:
+    """
+    输出覆盖相同语句的最小化测试子集
+
+    Args:
+        minimized: AutoTester.minimize_tests 的返回值
+        stream: 输出流
+    """
+    selected = len(minimized["selected"])
+    total = selected + len(minimized["redundant"])
+    stream.write(f"最小化: {total} 个测试中的 {selected} 个即覆盖相同的 "
+                 f"{minimized['lines']} 行，")
+    stream.write(f"耗时 {minimized['selected_duration']:.2f}s / "
+                 f"{minimized['duration']:.2f}s\n")
+    stream.write(f"可以省略 {len(minimized['redundant'])} 个测试，列表见 {minimized['file']}\n")
+    stream.flush()
+
+
+def print_mutation_report(summary: Dict[str, Any], source_file: str,
+                          stream: TextIO) -> None:
+    """
+    输出变异得分和存活的变体
+
+    Args:
+        summary: summarize_mutants 的返回值
+        source_file: 被测源文件
+        stream: 输出流
+    """
+    killed = summary["killed"] + summary["timeout"]
+    covered = killed + summary["survived"]
+    stream.write(f"变异得分 {summary['score']:.1f}% ({killed}/{covered} 个变体被杀死，"
+                 f"其中超时 {summary['timeout']} 个；{summary['no_coverage']} 个没有测试覆盖)\n")
+    survivors = [m for m in summary["mutants"]
+                 if m["status"] in ("survived", "no_coverage")]
+    for mutant in survivors:
+        label = "存活" if mutant["status"] == "survived" else "未覆盖"
+        stream.write(f"  {source_file}:{mutant['line']}:{mutant['col'] + 1}  "
+                     f"{mutant['description']}  [{label}]\n")
+    stream.flush()
@@ -0,0 +1,219 @@
+"""
+写入文件的结果报告: JUnit XML 和 JSON 行
+
+报告器与 ConsoleReporter 一样逐个处理 runner 模块定义的事件，在测试进行的
+同时增量写入文件，内存中只保留尚未写出的少量内容。写入定期刷新到磁盘，
+运行被中途终止时文件中仍是已完成测试的有效结果:
+
+- JSON 行文件每行一个完整事件，截断在行边界上
+- JUnit XML 文件每次刷新都把结束标签写在末尾，下次刷新时再覆盖掉，
+  因此任何时刻都是格式完整的 XML 文档
+"""
+
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+
+# 两次刷新之间的最长时间（秒）和最多积攒的条目数
+FLUSH_INTERVAL = 1.0
+FLUSH_MAX_PENDING = 200
+
+# XML 1.0 不允许出现的控制字符
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def parse_report_spec(spec: str) -> Tuple[str, str]:
+    """
+    解析 "类型:路径" 形式的报告说明
+
+    Args:
+        spec: 报告说明，例如 "junit:reports/junit.xml"
+
+    Returns:
+        (类型, 路径) 元组
+
+    Raises:
+        ValueError: 格式无效或类型不受支持
+    """
+    kind, sep, path = spec.partition(":")
+    if not sep or not path:
+        raise ValueError(f"无效的报告说明: {spec!r}，应为 类型:路径")
+    if kind not in REPORTERS:
+        raise ValueError(f"不支持的报告类型: {kind!r}，可选 {', '.join(sorted(REPORTERS))}")
+    return kind, path
+
+
+def create_reporter(spec: str):
+    """
+    按 "类型:路径" 形式的报告说明创建报告器
+
+    Raises:
+        ValueError: 报告说明无效
+    """
+    kind, path = parse_report_spec(spec)
+    return REPORTERS[kind](path)
+
+
+class _FileReporter:
+    """
+    增量写入文件的报告器的公共部分: 积攒条目并按时间和数量定期刷新
+    """
+
+    def __init__(self, path: str, flush_interval: float = FLUSH_INTERVAL):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pending: List[str] = []
+        self._flushed_at = time.monotonic()
+        self._file = open(path, "wb")
+
+    def handle(self, event: Dict[str, Any]) -> None:
+        """
+        处理一个事件
+        """
+        self._add(event)
+        if (event["event"] == "summary" or len(self._pending) >= FLUSH_MAX_PENDING
+                or time.monotonic() - self._flushed_at >= self.flush_interval):
+            self.flush()
+
+    def _add(self, event: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def _write_pending(self) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """
+        把积攒的内容写入文件并刷新到操作系统
+        """
+        if self._file.closed:
+            return
+        self._write_pending()
+        self._pending = []
+        self._file.flush()
+        self._flushed_at = time.monotonic()
+
+    def close(self) -> None:
+        """
+        写出剩余内容并关闭文件
+        """
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class JSONLinesReporter(_FileReporter):
+    """
+    把事件逐行写成 JSON（进度事件除外）
+    """
+
+    def _add(self, event: Dict[str, Any]) -> None:
+        if event["event"] != "progress":
+            self._pending.append(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def _write_pending(self) -> None:
+        if self._pending:
+            self._file.write("".join(self._pending).encode("utf-8"))
+
+
+def _xml_text(text: str) -> str:
+    return escape(_INVALID_XML_CHARS.sub("", text))
+
+
+def _xml_attr(text: str) -> str:
+    return quoteattr(_INVALID_XML_CHARS.sub("", text))
+
+
+def _exception_line(traceback: str) -> str:
+    """
+    取回溯的最后一行，即异常类型和信息
+    """
+    lines = traceback.strip().splitlines()
+    return lines[-1] if lines else ""
+
+
+class JUnitReporter(_FileReporter):
+    """
+    把测试结果写成 JUnit XML
+
+    全部测试放在一个 testsuite 中，testcase 的 classname 由文件路径和类名组成，
+    file 属性为测试文件。预期失败记为 skipped，意外成功记为通过，与 pytest
+    一致。testsuite 上的统计属性占用固定宽度，每次刷新时原地改写。
+    """
+
+    SUITE_NAME = "py_auto_tester"
+    HEADER_WIDTH = 200
+    TRAILER = b"</testsuite>\n</testsuites>\n"
+
+    def __init__(self, path: str, flush_interval: float = FLUSH_INTERVAL):
+        super().__init__(path, flush_interval)
+        self.counts = {"tests": 0, "failures": 0, "errors": 0, "skipped": 0}
+        self.elapsed = 0.0
+        self._started = time.perf_counter()
+        self._file.write(b'<?xml version="1.0" encoding="utf-8"?>\n<testsuites>\n')
+        self._header_pos = self._file.tell()
+        self._file.write(self._header())
+        self._body_end = self._file.tell()
+        self._file.write(self.TRAILER)
+        self._file.flush()
+
+    def _header(self) -> bytes:
+        attributes = " ".join(f'{key}="{value}"' for key, value in self.counts.items())
+        header = (f'<testsuite name="{self.SUITE_NAME}" {attributes} '
+                  f'time="{self.elapsed:.3f}"').ljust(self.HEADER_WIDTH - 2)
+        return (header + ">\n").encode("utf-8")
+
+    def _add(self, event: Dict[str, Any]) -> None:
+        kind = event["event"]
+        if kind == "summary":
+            self.elapsed = event["elapsed"]
+            return
+        if kind not in ("pass", "fail", "error", "skip", "xfail", "xpass"):
+            return
+        self.elapsed = time.perf_counter() - self._started
+        self.counts["tests"] += 1
+
+        parts = event["id"].split("::")
+        module = os.path.splitext(parts[0])[0].replace("/", ".")
+        classname = f"{module}.{parts[1]}" if len(parts) > 2 else module
+        lines = [f'  <testcase classname={_xml_attr(classname)} '
+                 f'name={_xml_attr(parts[-1])} file={_xml_attr(event["file"])} '
+                 f'time="{event["duration"]:.6f}">']
+        if kind in ("fail", "error"):
+            tag = "failure" if kind == "fail" else "error"
+            self.counts["failures" if kind == "fail" else "errors"] += 1
+            traceback = event.get("traceback", "")
+            lines.append(f"    <{tag} message={_xml_attr(_exception_line(traceback))}>"
+                         f"{_xml_text(traceback)}</{tag}>")
+        elif kind in ("skip", "xfail"):
+            self.counts["skipped"] += 1
+            reason = event.get("reason", "") if kind == "skip" else "expected failure"
+            lines.append(f"    <skipped message={_xml_attr(reason)}/>")
+        for name, tag in (("stdout", "system-out"), ("stderr", "system-err")):
+            if event.get(name):
+                lines.append(f"    <{tag}>{_xml_text(event[name])}</{tag}>")
+        lines.append("  </testcase>\n")
+        self._pending.append("\n".join(lines))
+
+    def _write_pending(self) -> None:
+        if self._pending:
+            self._file.seek(self._body_end)
+            self._file.write("".join(self._pending).encode("utf-8"))
+            self._body_end = self._file.tell()
+            self._file.write(self.TRAILER)
+        self._file.seek(self._header_pos)
+        self._file.write(self._header())
+        self._file.seek(0, os.SEEK_END)
+
+
+# 报告类型 -> 报告器类
+REPORTERS = {
+    "junit": JUnitReporter,
+    "jsonl": JSONLinesReporter,
+}
@@ -0,0 +1,700 @@
+"""
+单个测试文件的加载与执行
+
+并行工作进程和串行模式共用这里的逻辑。执行过程以事件流的形式产出，每个
+事件都是可序列化的字典，便于跨进程传递和合并:
+
+- start: 测试开始，包含 id、file、description
+- pass/fail/error/skip/xfail/xpass: 测试结果，即测试记录加上 event 字段；
+  子测试的结果带有 subtest 和所属测试的 parent
+- timing: 一个测试文件（或其中选中的部分）运行结束，包含 file、duration、
+  tests_run 和 load_error
+"""
+
+import gc
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import unittest
+from typing import (Any, Callable, Collection, Dict, Generator, Iterable, Iterator,
+                    List, Optional, Set)
+
+from .timeouts import Watchdog, resolve_timeout
+
+
+# 捕获输出时每个流在内存中最多保留的字符数
+OUTPUT_MEMORY_LIMIT = 64 * 1024
+
+
+class BoundedOutput(io.TextIOBase):
+    """
+    有界的输出捕获缓冲区
+
+    内存中只保留最后 limit 个字符（环形缓冲，最多暂存两倍后裁剪）。输出总量超过 limit 后，全部输出
+    （包括此前已缓冲的部分）改为同时写入临时文件，完整内容不会丢失；keep 之后
+    临时文件在清空缓冲区时保留，否则随即删除。
+    """
+
+    def __init__(self, limit: int = OUTPUT_MEMORY_LIMIT):
+        super().__init__()
+        self.limit = max(1, limit)
+        self.spill_path: Optional[str] = None
+        self._chunks: List[str] = []
+        self._size = 0
+        self._total = 0
+        self._spill = None
+        self._keep = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        self._total += len(text)
+        if self._spill is not None:
+            self._spill.write(text)
+        elif self._total > self.limit:
+            fd, self.spill_path = tempfile.mkstemp(prefix="py_auto_tester-",
+                                                   suffix=".log")
+            self._spill = io.open(fd, "w", encoding="utf-8", errors="replace")
+            self._spill.writelines(self._chunks)
+            self._spill.write(text)
+        self._chunks.append(text)
+        self._size += len(text)
+        if self._size > 2 * self.limit:
+            # 积攒到两倍上限时才一次性裁剪，避免每次写入都移动数据
+            tail = "".join(self._chunks)[-self.limit:]
+            self._chunks = [tail]
+            self._size = len(tail)
+        return len(text)
+
+    def getvalue(self) -> str:
+        """
+        返回内存中保留的输出，前面的内容被丢弃时以一行说明开头
+        """
+        tail = "".join(self._chunks)[-self.limit:]
+        omitted = self._total - len(tail)
+        if not omitted:
+            return tail
+        self._spill.flush()
+        return f"[省略了前面 {omitted} 个字符，完整输出见 {self.spill_path}]\n{tail}"
+
+    def keep(self) -> None:
+        """
+        清空缓冲区时保留临时文件（用于失败测试的完整输出）
+        """
+        self._keep = True
+
+    def flush(self) -> None:
+        if self._spill is not None:
+            self._spill.flush()
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        # unittest 在每个测试结束后 seek(0) 再 truncate() 来清空缓冲区
+        return 0
+
+    def truncate(self, size: Optional[int] = None) -> int:
+        """
+        清空缓冲区，关闭临时文件（未 keep 时删除）
+        """
+        if self._spill is not None:
+            self._spill.close()
+            if not self._keep:
+                try:
+                    os.unlink(self.spill_path)
+                except OSError:
+                    pass
+        self._chunks = []
+        self._size = self._total = 0
+        self._spill = None
+        self.spill_path = None
+        self._keep = False
+        return 0
+
+    def close(self) -> None:
+        if not self.closed:
+            self.truncate()
+        super().close()
+
+
+def normalize_path(path: str) -> str:
+    """
+    规范化文件路径，用作测试ID和历史记录的键
+    """
+    return os.path.normpath(path).replace(os.sep, "/")
+
+
+def format_test_id(test_file: str, class_name: str, method_name: str) -> str:
+    """
+    按 "路径::类名::方法名" 的格式拼接测试ID
+    """
+    return f"{normalize_path(test_file)}::{class_name}::{method_name}"
+
+
+def make_test_id(test_file: str, test: unittest.TestCase) -> str:
+    """
+    生成稳定的测试ID，格式为 "路径::类名::方法名"
+
+    Args:
+        test_file: 测试文件路径
+        test: 测试用例对象
+
+    Returns:
+        测试ID字符串
+    """
+    path = normalize_path(test_file)
+    parent = getattr(test, "test_case", None)
+    if parent is not None:
+        # 子测试: 在所属测试ID后附加子测试参数描述
+        return f"{make_test_id(test_file, parent)} {test._subDescription()}"
+    method_name = getattr(test, "_testMethodName", None)
+    if method_name is None:
+        # setUpClass 等失败时unittest使用的占位对象没有方法名
+        return f"{path}::{test.id()}"
+    return format_test_id(test_file, test.__class__.__name__, method_name)
+
+
+class CollectingTestResult(unittest.TextTestResult):
+    """
+    在标准文本结果的基础上，把每个测试的结果记录为可序列化的字典
+
+    test_files 用于在一个结果对象运行多个文件时，按测试对象查找其所属文件。
+    每条记录包含墙钟耗时 duration 和CPU耗时 cpu_time；trace_memory 为真时还用
+    tracemalloc 记录测试期间新分配内存的峰值 memory_peak（字节）。
+
+    指定 on_event 时，每个测试开始和结束都以事件的形式交给它；keep_records 为假
+    时不在内存中保留记录（包括 unittest 自身的 failures/errors 列表），内存占用
+    与测试数量无关。
+
+    capture_output 为真时与 unittest 的 buffer 选项相同，测试期间的标准输出和
+    标准错误被捕获到 BoundedOutput 中（每个流在内存中最多保留 output_limit 个
+    字符）。捕获的输出只附加在失败和错误的记录上（stdout 和 stderr 字段），
+    不再拼接到回溯中，也不回显到终端。
+
+    指定 watchdog 时每个测试运行期间都受其超时限制，整个文件超时后停止运行。
+    """
+
+    def __init__(self, stream, descriptions, verbosity, test_file: str = "",
+                 test_files: Optional[Dict[int, str]] = None,
+                 trace_memory: bool = False,
+                 on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 keep_records: bool = True, capture_output: bool = False,
+                 output_limit: int = OUTPUT_MEMORY_LIMIT,
+                 watchdog: Optional[Watchdog] = None,
+                 on_test_stop: Optional[Callable[[], None]] = None, **kwargs):
+        super().__init__(stream, descriptions, verbosity, **kwargs)
+        self.buffer = capture_output
+        self.output_limit = output_limit
+        self.test_file = test_file
+        self.test_files = test_files if test_files is not None else {}
+        self.trace_memory = trace_memory
+        self.on_event = on_event
+        self.keep_records = keep_records
+        self.watchdog = watchdog
+        self.on_test_stop = on_test_stop
+        self.records: List[Dict[str, Any]] = []
+        self._test_start = None
+        self._cpu_start = 0.0
+        self._memory_start = 0
+        self._started_tracing = False
+
+    def file_of(self, test) -> str:
+        """
+        返回测试对象所属的测试文件
+        """
+        parent = getattr(test, "test_case", test)
+        return self.test_files.get(id(parent), self.test_file)
+
+    def startTest(self, test):
+        super().startTest(test)
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            elif hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            else:
+                # Python 3.8 及更早版本没有 reset_peak，清空记录同时会重置峰值
+                tracemalloc.clear_traces()
+            self._memory_start = tracemalloc.get_traced_memory()[0]
+        if self.on_event is not None:
+            test_file = self.file_of(test)
+            self.on_event({"event": "start", "id": make_test_id(test_file, test),
+                           "file": test_file, "description": str(test)})
+        self._cpu_start = time.process_time()
+        self._test_start = time.perf_counter()
+        if self.watchdog is not None:
+            self.watchdog.arm(test)
+
+    def stopTest(self, test):
+        if self.watchdog is not None:
+            self.watchdog.disarm()
+            if self.watchdog.file_expired:
+                self.stop()
+        if self.on_test_stop is not None:
+            self.on_test_stop()
+        super().stopTest(test)
+        self._test_start = None
+
+    def stopTestRun(self):
+        super().stopTestRun()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        for captured in (self._stdout_buffer, self._stderr_buffer):
+            if captured is not None:
+                captured.close()
+        self._stdout_buffer = self._stderr_buffer = None
+
+    def _setupStdout(self):
+        if self.buffer and self._stderr_buffer is None:
+            self._stdout_buffer = BoundedOutput(self.output_limit)
+            self._stderr_buffer = BoundedOutput(self.output_limit)
+        super()._setupStdout()
+
+    def _restoreStdout(self):
+        # 失败测试的输出已附加在记录上，不再回显到终端
+        self._mirrorOutput = False
+        super()._restoreStdout()
+
+    def _exc_info_to_string(self, err, test):
+        # 捕获的输出单独记录，不拼接到回溯中
+        buffer, self.buffer = self.buffer, False
+        try:
+            return super()._exc_info_to_string(err, test)
+        finally:
+            self.buffer = buffer
+
+    def _record(self, test, status: str, traceback: Optional[str] = None,
+                reason: Optional[str] = None) -> None:
+        duration = cpu_time = 0.0
+        if self._test_start is not None:
+            duration = time.perf_counter() - self._test_start
+            cpu_time = time.process_time() - self._cpu_start
+        record = {
+            "id": make_test_id(self.file_of(test), test),
+            "file": self.file_of(test),
+            "description": str(test),
+            "status": status,
+            "duration": duration,
+            "cpu_time": cpu_time,
+        }
+        if (self.trace_memory and self._test_start is not None
+                and tracemalloc.is_tracing()):
+            peak = tracemalloc.get_traced_memory()[1]
+            record["memory_peak"] = max(0, peak - self._memory_start)
+        if hasattr(test, "test_case"):
+            record["subtest"] = True
+            record["parent"] = make_test_id(self.file_of(test), test.test_case)
+        elif not hasattr(test, "_testMethodName"):
+            # setUpClass/setUpModule 等夹具失败
+            record["fixture"] = True
+        if traceback is not None:
+            record["traceback"] = traceback
+        if reason is not None:
+            record["reason"] = reason
+        if self.buffer and status in ("fail", "error"):
+            for name, captured in (("stdout", self._stdout_buffer),
+                                   ("stderr", self._stderr_buffer)):
+                output = captured.getvalue() if captured is not None else ""
+                if output:
+                    record[name] = output
+                    captured.keep()
+        if self.keep_records:
+            self.records.append(record)
+        else:
+            for outcomes in (self.failures, self.errors, self.skipped,
+                             self.expectedFailures, self.unexpectedSuccesses):
+                del outcomes[:]
+        if self.on_event is not None:
+            self.on_event(dict(record, event=status))
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self._record(test, "pass")
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._record(test, "fail", self.failures[-1][1])
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._record(test, "error", self.errors[-1][1])
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self._record(test, "skip", reason=reason)
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self._record(test, "xfail")
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self._record(test, "xpass")
+
+    def addSubTest(self, test, subtest, err):
+        super().addSubTest(test, subtest, err)
+        if err is not None:
+            status = "fail" if issubclass(err[0], test.failureException) else "error"
+            target = self.failures if status == "fail" else self.errors
+            self._record(subtest, status, target[-1][1])
+
+
+def iter_tests(suite):
+    """
+    递归展开测试套件，逐个产出测试用例
+    """
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from iter_tests(test)
+        else:
+            yield test
+
+
+def run_suite_iter(suite: unittest.TestSuite,
+                   result: unittest.TestResult) -> Iterator[None]:
+    """
+    逐个运行测试套件中的测试，每个测试结束后交回控制权
+
+    与 TestSuite.run 的处理一致（包括类和模块级夹具的建立和清理），但以生成器
+    的形式实现，调用方可以在两个测试之间处理已经产生的结果，而不需要线程。
+
+    Args:
+        suite: 测试套件
+        result: 测试结果对象
+    """
+    flat = unittest.TestSuite(list(iter_tests(suite)))
+    result._testRunEntered = True
+    try:
+        for index, test in enumerate(flat):
+            if result.shouldStop:
+                break
+            flat._tearDownPreviousClass(test, result)
+            flat._handleModuleFixture(test, result)
+            flat._handleClassSetUp(test, result)
+            result._previousTestClass = test.__class__
+            if not (getattr(test.__class__, "_classSetupFailed", False)
+                    or getattr(result, "_moduleSetUpFailed", False)):
+                test(result)
+            # 与 TestSuite 相同，运行过的测试对象随即释放
+            flat._removeTestAtIndex(index)
+            yield
+    finally:
+        flat._tearDownPreviousClass(None, result)
+        flat._handleModuleTearDown(result)
+        result._testRunEntered = False
+
+
+def load_test_module(test_file: str):
+    """
+    以独立模块的形式加载测试文件
+
+    Args:
+        test_file: 测试文件路径
+
+    Returns:
+        加载后的模块对象
+    """
+    module_name = os.path.splitext(os.path.basename(test_file))[0]
+    spec = importlib.util.spec_from_file_location(module_name, test_file)
+    module = importlib.util.module_from_spec(spec)
+    # 与正常导入一样在执行前登记到 sys.modules，unittest 按模块名查找
+    # setUpModule/tearDownModule；同名的其他模块已存在时不覆盖
+    registered = module_name not in sys.modules
+    if registered:
+        sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        if registered:
+            del sys.modules[module_name]
+        raise
+    return module
+
+
+def _is_project_source(module, root: str) -> bool:
+    """
+    判断模块是否为项目目录中的纯 Python 源文件（可以安全地淘汰后重新导入）
+    """
+    path = getattr(module, "__file__", None)
+    if not path or not path.endswith(".py"):
+        return False
+    path = os.path.abspath(path)
+    return path.startswith(root + os.sep) and "site-packages" not in path.split(os.sep)
+
+
+def unload_test_module(module, before: Optional[Set[str]] = None) -> List[str]:
+    """
+    从 sys.modules 中移除测试模块；指定 before 时同时淘汰运行期间新导入的项目模块
+
+    第三方依赖和扩展模块不淘汰（重复导入扩展模块并不安全），它们的数量与
+    测试文件数无关。
+
+    Args:
+        module: load_test_module 返回的测试模块
+        before: 加载测试模块之前 sys.modules 中的模块名
+
+    Returns:
+        被移除的模块名列表
+    """
+    removed = []
+    if sys.modules.get(module.__name__) is module:
+        del sys.modules[module.__name__]
+        removed.append(module.__name__)
+    if before is None:
+        return removed
+
+    root = os.path.abspath(os.getcwd())
+    own_package = __name__.split(".")[0]
+    for name in set(sys.modules) - before:
+        if (name.split(".")[0] == own_package
+                or not _is_project_source(sys.modules[name], root)):
+            continue
+        del sys.modules[name]
+        removed.append(name)
+        # 保留下来的父包仍以属性引用子模块，一并解除
+        parent_name, _, child = name.rpartition(".")
+        parent = sys.modules.get(parent_name)
+        if parent is not None and getattr(parent, child, None) is not None:
+            try:
+                delattr(parent, child)
+            except AttributeError:
+                pass
+    return removed
+
+
+def current_rss() -> Optional[int]:
+    """
+    当前进程的常驻内存（字节）
+
+    Linux 上读取 /proc/self/statm；其他 Unix 平台退而使用 getrusage 报告的峰值；
+    无法获取时返回 None。
+    """
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，其他平台以 KiB 为单位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def filter_suite(suite: unittest.TestSuite, test_file: str,
+                 test_ids: Optional[Iterable[str]],
+                 exclude_ids: Collection[str] = ()) -> unittest.TestSuite:
+    """
+    只保留测试ID在 test_ids 中且不在 exclude_ids 中的测试
+
+    Args:
+        suite: 测试套件
+        test_file: 测试文件路径，用于生成测试ID
+        test_ids: 要保留的测试ID，None 表示全部
+        exclude_ids: 要排除的测试ID
+
+    Returns:
+        过滤后的测试套件
+    """
+    wanted = set(test_ids) if test_ids is not None else None
+    return unittest.TestSuite(
+        test for test in iter_tests(suite)
+        if (wanted is None or make_test_id(test_file, test) in wanted)
+        and make_test_id(test_file, test) not in exclude_ids
+    )
+
+
+def iter_suite_events(suite: unittest.TestSuite, test_file: str,
+                      trace_memory: bool = False,
+                      capture_output: bool = False,
+                      output_limit: int = OUTPUT_MEMORY_LIMIT,
+                      on_test_start: Optional[Callable[[str], None]] = None,
+                      timeout: Optional[float] = None,
+                      file_timeout: Optional[float] = None,
+                      watchdog_file: Optional[str] = None,
+                      coverage_context: Optional[Callable[[Optional[str]], None]] = None
+                      ) -> Generator[Dict[str, Any], None, int]:
+    """
+    运行已经加载的测试套件，在测试进行的同时逐个产出结果事件
+
+    测试ID以 test_file 为路径。参数含义与 iter_file_events 相同，不产出 timing 事件。
+
+    Returns:
+        事件的生成器，结束时的返回值为运行的测试数
+    """
+    # 输出由事件的使用方统一格式化，这里丢弃TextTestResult自身的输出
+    events: List[Dict[str, Any]] = []
+
+    def notify_start(event):
+        if event["event"] == "start":
+            if on_test_start is not None:
+                on_test_start(event["id"])
+            if coverage_context is not None:
+                coverage_context(event["id"])
+        events.append(event)
+
+    def clear_context():
+        coverage_context(None)
+
+    # 没有回调时直接收集事件，省去每个事件一次额外的函数调用
+    if on_test_start is not None or coverage_context is not None:
+        on_event = notify_start
+    else:
+        on_event = events.append
+    on_test_stop = clear_context if coverage_context is not None else None
+    # 没有指定超时时也检查装饰器和 __timeout__ 属性，都没有时不安装信号处理函数
+    watchdog = None
+    if (timeout or file_timeout
+            or any(resolve_timeout(test) for test in iter_tests(suite))):
+        watchdog = Watchdog(timeout, file_timeout, watchdog_file)
+        watchdog.start()
+    result = CollectingTestResult(io.StringIO(), True, 0, test_file=test_file,
+                                  trace_memory=trace_memory, on_event=on_event,
+                                  keep_records=False, capture_output=capture_output,
+                                  output_limit=output_limit, watchdog=watchdog,
+                                  on_test_stop=on_test_stop)
+    result.startTestRun()
+    try:
+        for _ in run_suite_iter(suite, result):
+            yield from events
+            del events[:]
+    finally:
+        if watchdog is not None:
+            watchdog.close()
+        result.stopTestRun()
+    # tearDownClass/tearDownModule 中产生的错误
+    yield from events
+
+    return result.testsRun
+
+
+def iter_file_events(test_file: str, test_ids: Optional[List[str]] = None,
+                     trace_memory: bool = False,
+                     capture_output: bool = False,
+                     output_limit: int = OUTPUT_MEMORY_LIMIT,
+                     evict_modules: bool = False,
+                     collect_garbage: bool = False,
+                     on_test_start: Optional[Callable[[str], None]] = None,
+                     timeout: Optional[float] = None,
+                     file_timeout: Optional[float] = None,
+                     watchdog_file: Optional[str] = None,
+                     exclude_ids: Collection[str] = (),
+                     coverage_context: Optional[Callable[[Optional[str]], None]] = None
+                     ) -> Iterator[Dict[str, Any]]:
+    """
+    加载并运行单个测试文件，在测试进行的同时逐个产出事件
+
+    文件运行结束后测试模块总是从 sys.modules 中移除，测试对象随之释放。
+    timing 事件中的 rss 为运行结束（并完成清理）后进程的常驻内存，rss_delta
+    为相比加载之前的增长，无法获取时为 None。
+
+    Args:
+        test_file: 测试文件路径
+        test_ids: 只运行这些测试，None 表示运行文件中的全部测试
+        trace_memory: 是否用 tracemalloc 记录每个测试的内存分配峰值
+        capture_output: 是否捕获每个测试的标准输出和标准错误
+        output_limit: 捕获输出时每个流在内存中最多保留的字符数，超出部分写入临时文件
+        evict_modules: 是否同时淘汰运行期间新导入的项目模块，使长时间运行的内存
+            占用不随测试文件数增长
+        collect_garbage: 是否在文件运行结束后执行 gc.collect()，回收循环引用
+        on_test_start: 每个测试开始时立即以测试ID调用（事件在测试结束后才
+            产出），用于在进程被强制终止时知道正在运行的测试
+        timeout: 每个测试的默认超时时间（秒），可被 timeouts 模块中的装饰器和
+            __timeout__ 属性覆盖
+        file_timeout: 整个文件的超时时间（秒），超时后停止运行其余的测试
+        watchdog_file: 测试超时后仍无法中断时，faulthandler 把调用栈写入该文件
+            并终止进程，None 表示不启用（只应在工作进程中使用）
+        exclude_ids: 不运行的测试ID
+        coverage_context: 每个测试开始时以测试ID、结束时以 None 调用，用于
+            按测试记录覆盖率（见 cover.CoverageCollector.switch_context）
+
+    Returns:
+        事件的迭代器，最后一个事件总是该文件的 timing 事件
+    """
+    timing = {"event": "timing", "file": test_file, "tests_run": 0,
+              "load_error": None, "duration": 0.0}
+    start_time = time.perf_counter()
+    rss_before = current_rss()
+    before = set(sys.modules) if evict_modules else None
+
+    module = None
+    try:
+        module = load_test_module(test_file)
+        suite = unittest.TestLoader().loadTestsFromModule(module)
+        if test_ids is not None or exclude_ids:
+            suite = filter_suite(suite, test_file, test_ids, exclude_ids)
+    except Exception as e:
+        timing["load_error"] = str(e)
+        if module is not None:
+            unload_test_module(module, before)
+        yield _finish_timing(timing, rss_before, collect_garbage)
+        return
+
+    try:
+        tests_run = yield from iter_suite_events(
+            suite, test_file, trace_memory=trace_memory, capture_output=capture_output,
+            output_limit=output_limit, on_test_start=on_test_start, timeout=timeout,
+            file_timeout=file_timeout, watchdog_file=watchdog_file,
+            coverage_context=coverage_context)
+    finally:
+        unload_test_module(module, before)
+
+    timing["tests_run"] = tests_run
+    timing["duration"] = time.perf_counter() - start_time
+    del module, suite
+    yield _finish_timing(timing, rss_before, collect_garbage)
+
+
+def _finish_timing(timing: Dict[str, Any], rss_before: Optional[int],
+                   collect_garbage: bool) -> Dict[str, Any]:
+    """
+    按需回收垃圾，并在 timing 事件中记录常驻内存
+    """
+    if collect_garbage:
+        gc.collect()
+    rss = current_rss()
+    timing["rss"] = rss
+    timing["rss_delta"] = None
+    if rss is not None and rss_before is not None:
+        timing["rss_delta"] = rss - rss_before
+    return timing
+
+
+def record_from_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    从测试结果事件中还原测试记录
+    """
+    return {key: value for key, value in event.items() if key != "event"}
+
+
+def run_test_file(test_file: str, test_ids: Optional[List[str]] = None,
+                  trace_memory: bool = False) -> Dict[str, Any]:
+    """
+    加载并运行单个测试文件
+
+    Args:
+        test_file: 测试文件路径
+        test_ids: 只运行这些测试，None 表示运行文件中的全部测试
+        trace_memory: 是否用 tracemalloc 记录每个测试的内存分配峰值
+
+    Returns:
+        包含该文件所有测试记录的字典，加载失败时 load_error 不为空
+    """
+    file_result = {"file": test_file, "records": []}
+    for event in iter_file_events(test_file, test_ids, trace_memory):
+        if event["event"] == "timing":
+            file_result.update(tests_run=event["tests_run"],
+                               load_error=event["load_error"],
+                               duration=event["duration"])
+        elif event["event"] != "start":
+            file_result["records"].append(record_from_event(event))
+    return file_result
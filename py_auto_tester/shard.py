@@ -0,0 +1,159 @@
+"""
+跨机器分片与分片结果合并
+
+同一组测试在不同机器上按相同规则划分，每台机器只运行自己的分片；
+各分片的结果写成JSON文件，最后由 merge 子命令合并成一份报告。
+"""
+
+import json
+import os
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .runner import normalize_path
+
+
+RESULT_FILE_VERSION = 1
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    解析 "INDEX/TOTAL" 形式的分片说明，INDEX 从1开始
+
+    Args:
+        spec: 分片说明，例如 "2/4"
+
+    Returns:
+        (分片序号, 分片总数)
+    """
+    try:
+        index_str, total_str = spec.split("/")
+        index, total = int(index_str), int(total_str)
+    except ValueError:
+        raise ValueError(f"无效的分片说明 '{spec}'，格式应为 INDEX/TOTAL，例如 1/4")
+    if total < 1 or not 1 <= index <= total:
+        raise ValueError(f"无效的分片说明 '{spec}'，要求 1 <= INDEX <= TOTAL")
+    return index, total
+
+
+def partition(items: Sequence[str], total: int,
+              estimates: Optional[Dict[str, float]] = None) -> List[List[str]]:
+    """
+    把测试确定性地划分为 total 个分片
+
+    没有耗时估算时按排序后的顺序轮流分配，使各分片数量均衡；有估算时
+    按耗时从长到短依次放入当前总耗时最小的分片（相同时取序号小的），
+    使各分片耗时均衡。相同的输入在任何机器上得到相同的划分。
+
+    Args:
+        items: 测试ID或测试文件列表
+        total: 分片总数
+        estimates: 每项的估算耗时（可选）
+
+    Returns:
+        每个分片包含的项，分片内保持排序后的顺序
+    """
+    ordered = sorted(items, key=normalize_path)
+    shards: List[List[str]] = [[] for _ in range(total)]
+
+    if not estimates:
+        for position, item in enumerate(ordered):
+            shards[position % total].append(item)
+        return shards
+
+    loads = [0.0] * total
+    for item in sorted(ordered, key=lambda name: -estimates.get(name, 0.0)):
+        target = min(range(total), key=lambda i: (loads[i], i))
+        shards[target].append(item)
+        loads[target] += estimates.get(item, 0.0)
+    rank = {item: position for position, item in enumerate(ordered)}
+    return [sorted(shard, key=rank.__getitem__) for shard in shards]
+
+
+def owner_shard(test_file: str, total: int) -> int:
+    """
+    负责运行一个测试文件中静态收集不到的测试的分片
+
+    按规范化路径的 CRC32 选择，相同的文件在任何机器上得到相同的分片。
+
+    Args:
+        test_file: 测试文件路径
+        total: 分片总数
+
+    Returns:
+        分片序号（从1开始）
+    """
+    return zlib.crc32(normalize_path(test_file).encode("utf-8")) % total + 1
+
+
+def _serialize_pairs(pairs: Sequence[Tuple[Any, str]]) -> List[List[str]]:
+    """
+    把 (测试, 回溯) 元组转换为可写入JSON的列表；串行模式下测试为 TestCase 对象
+    """
+    return [[test if isinstance(test, str) else str(test), traceback]
+            for test, traceback in pairs]
+
+
+def write_result_file(path: str, results: Dict[str, Any],
+                      shard: Optional[str] = None,
+                      test_files: Optional[Sequence[str]] = None) -> None:
+    """
+    把一次运行的结果写成机器可读的JSON文件
+
+    Args:
+        path: 输出文件路径
+        results: run_tests 返回的结果字典
+        shard: 分片说明，例如 "1/4"
+        test_files: 本次运行的测试文件
+    """
+    data = {
+        "version": RESULT_FILE_VERSION,
+        "shard": shard,
+        "files": [normalize_path(f) for f in (test_files or [])],
+        "total": results.get("total", 0),
+        "passed": results.get("passed", 0),
+        "failed": results.get("failed", 0),
+        "errors": results.get("errors", 0),
+        "failures": _serialize_pairs(results.get("failures", [])),
+        "error_details": _serialize_pairs(results.get("error_details", [])),
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+
+
+def merge_result_files(paths: Sequence[str]) -> Dict[str, Any]:
+    """
+    合并多个分片的结果文件
+
+    Args:
+        paths: 结果文件路径列表
+
+    Returns:
+        合并后的结果，格式与 write_result_file 写出的内容一致
+    """
+    merged = {
+        "version": RESULT_FILE_VERSION,
+        "shards": [],
+        "files": [],
+        "total": 0,
+        "passed": 0,
+        "failed": 0,
+        "errors": 0,
+        "failures": [],
+        "error_details": [],
+    }
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != RESULT_FILE_VERSION:
+            raise ValueError(f"不支持的结果文件版本: {path}")
+        merged["shards"].append(data.get("shard"))
+        merged["files"].extend(data.get("files", []))
+        for key in ("total", "passed", "failed", "errors"):
+            merged[key] += data.get(key, 0)
+        merged["failures"].extend(data.get("failures", []))
+        merged["error_details"].extend(data.get("error_details", []))
+    return merged
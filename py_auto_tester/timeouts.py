@@ -0,0 +1,189 @@
+"""
+测试超时: timeout 装饰器和看门狗
+
+超时时间按以下顺序查找，先找到的生效:
+
+1. 测试方法上的 @timeout(秒数)
+2. 测试类上的 @timeout(秒数) 或类属性 __timeout__（可继承）
+3. 测试模块的模块级变量 __timeout__
+4. 运行时指定的默认值（命令行 --timeout）
+
+看门狗分两级。到达超时时间时 SIGALRM 的处理函数在测试中抛出 TimeoutExceeded，
+异常信息包含 faulthandler 输出的所有线程调用栈，测试记为错误，文件中其余的
+测试照常运行。测试卡在无法被信号打断的地方（例如不释放控制权的C扩展）时，
+再过 WATCHDOG_GRACE 秒由 faulthandler 把调用栈写入文件并直接终止进程；这一级
+只在并行工作进程中启用，由父进程报告并换用新的工作进程。每个工作进程通过自己的管道
+发回结果，进程在写入途中被终止也不会影响其他工作进程的结果。
+"""
+
+import faulthandler
+import signal
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Optional, TypeVar
+
+
+# 类属性和模块级变量的名称，@timeout 也把秒数记录在同名属性上
+TIMEOUT_ATTRIBUTE = "__timeout__"
+
+# 超时后等待测试响应 TimeoutExceeded 的时间（秒），之后强制终止工作进程
+WATCHDOG_GRACE = 5.0
+
+_T = TypeVar("_T")
+
+
+class TimeoutExceeded(Exception):
+    """
+    测试运行超过超时时间时，在测试中抛出
+    """
+
+
+def timeout(seconds: float) -> Callable[[_T], _T]:
+    """
+    为测试方法或测试类指定超时时间
+
+    Args:
+        seconds: 超时时间（秒）
+
+    Returns:
+        装饰器，原样返回被装饰的函数或类
+
+    Example:
+        >>> from py_auto_tester import timeout
+        >>> class TestSlow(unittest.TestCase):
+        ...     @timeout(30)
+        ...     def test_download(self):
+        ...         ...
+    """
+    if seconds <= 0:
+        raise ValueError(f"超时时间必须为正数: {seconds}")
+
+    def decorator(obj):
+        setattr(obj, TIMEOUT_ATTRIBUTE, seconds)
+        return obj
+    return decorator
+
+
+def resolve_timeout(test: Any, default: Optional[float] = None) -> Optional[float]:
+    """
+    查找一个测试对象的超时时间
+
+    Args:
+        test: unittest.TestCase 实例
+        default: 没有任何指定时的默认值
+
+    Returns:
+        超时时间（秒），None 表示不限制
+    """
+    method = getattr(test, getattr(test, "_testMethodName", ""), None)
+    module = sys.modules.get(type(test).__module__)
+    for owner in (method, type(test), module):
+        value = getattr(owner, TIMEOUT_ATTRIBUTE, None)
+        if value is not None:
+            return value
+    return default
+
+
+def _dump_stacks() -> str:
+    """
+    用 faulthandler 取得所有线程的调用栈
+    """
+    with tempfile.TemporaryFile("w+") as dump:
+        faulthandler.dump_traceback(dump, all_threads=True)
+        dump.seek(0)
+        return dump.read()
+
+
+class Watchdog:
+    """
+    在一个测试文件运行期间执行每个测试和整个文件的超时
+
+    CollectingTestResult 在每个测试开始时调用 arm，结束时调用 disarm。整个
+    文件超时后 file_expired 为真，运行方应停止运行文件中剩余的测试。
+    """
+
+    def __init__(self, timeout: Optional[float] = None,
+                 file_timeout: Optional[float] = None,
+                 dump_file: Optional[str] = None):
+        """
+        初始化看门狗
+
+        Args:
+            timeout: 每个测试的默认超时时间（秒），None 表示只按装饰器和属性
+            file_timeout: 整个文件的超时时间（秒），None 表示不限制
+            dump_file: 强制终止进程前写入调用栈的文件，None 表示不启用这一级
+        """
+        self.timeout = timeout
+        self.file_timeout = file_timeout
+        self.dump_file = dump_file
+        self.file_expired = False
+        self._deadline: Optional[float] = None
+        self._seconds = 0.0
+        self._file_limited = False
+        self._dump = None
+        self._previous_handler: Any = None
+        # 信号处理函数只能在主线程中安装
+        self._can_alarm = (hasattr(signal, "setitimer")
+                           and threading.current_thread() is threading.main_thread())
+
+    def start(self) -> None:
+        """
+        开始计算整个文件的运行时间，并安装信号处理函数
+        """
+        if self.file_timeout:
+            self._deadline = time.monotonic() + self.file_timeout
+        if self._can_alarm:
+            self._previous_handler = signal.signal(signal.SIGALRM, self._on_alarm)
+        if self.dump_file:
+            self._dump = open(self.dump_file, "w")
+
+    def arm(self, test: Any) -> None:
+        """
+        为即将运行的测试设置超时
+        """
+        seconds = resolve_timeout(test, self.timeout)
+        self._file_limited = False
+        if self._deadline is not None:
+            remaining = max(0.001, self._deadline - time.monotonic())
+            if seconds is None or remaining < seconds:
+                seconds = remaining
+                self._file_limited = True
+        if seconds is None:
+            return
+        self._seconds = seconds
+        if self._can_alarm:
+            signal.setitimer(signal.ITIMER_REAL, seconds)
+        if self._dump is not None:
+            faulthandler.dump_traceback_later(seconds + WATCHDOG_GRACE, file=self._dump,
+                                              exit=True)
+
+    def disarm(self) -> None:
+        """
+        测试结束，取消超时
+        """
+        if self._can_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        if self._dump is not None:
+            faulthandler.cancel_dump_traceback_later()
+
+    def close(self) -> None:
+        """
+        取消超时并恢复原来的信号处理函数
+        """
+        self.disarm()
+        if self._can_alarm and self._previous_handler is not None:
+            signal.signal(signal.SIGALRM, self._previous_handler)
+            self._previous_handler = None
+        if self._dump is not None:
+            self._dump.close()
+            self._dump = None
+
+    def _on_alarm(self, signum, frame):
+        if self._file_limited:
+            self.file_expired = True
+            message = f"测试文件运行超过 {self.file_timeout} 秒，停止运行其余的测试"
+        else:
+            message = f"测试运行超过 {self._seconds} 秒"
+        raise TimeoutExceeded(f"各线程的调用栈:\n{_dump_stacks()}\n{message}")
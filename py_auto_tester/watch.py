@@ -0,0 +1,209 @@
+"""
+监视模式: 文件修改后只重新运行受影响的测试
+
+定期用 scandir 列出项目中的 .py 文件并比较 stat 结果，不依赖任何外部服务。
+一批修改在安静一段时间后才触发运行（去抖）；运行期间又有新的修改时，取消
+正在进行的运行，与新修改合并后重新运行。
+"""
+
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .discovery import DiscoveryIndex
+from .imports import ImportGraph
+
+
+# 文件路径 -> (修改时间, 大小)
+Snapshot = Dict[str, Tuple[int, int]]
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> Set[str]:
+    """
+    比较两次快照，返回新增、修改或删除的文件
+    """
+    changed = {path for path, stat in new.items() if old.get(path) != stat}
+    changed.update(path for path in old if path not in new)
+    return changed
+
+
+def _run_selected(tester_args: Dict, test_files: List[str], verbose: bool,
+                  run_options: Dict[str, Any], report: List[str]) -> None:
+    """
+    在子进程中运行选中的测试文件，每次运行重新写出 --report 指定的报告
+    """
+    from .core import AutoTester
+    from .reporters import create_reporter
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if hasattr(os, "setpgrp"):
+        # 成为独立的进程组，取消时连同并行工作进程一起终止
+        os.setpgrp()
+    tester = AutoTester(**tester_args)
+    tester.discovered_tests = test_files
+    reporters = [create_reporter(spec) for spec in report]
+    try:
+        tester.run_tests(verbose=verbose, reporters=reporters, **run_options)
+    finally:
+        for reporter in reporters:
+            reporter.close()
+            print(f"测试报告已写入: {reporter.path}")
+
+
+class Watcher:
+    """
+    轮询项目文件并重新运行受影响的测试
+    """
+
+    def __init__(self, tester, root: str = ".", interval: float = 0.2,
+                 debounce: float = 0.3, verbose: bool = False,
+                 run_options: Optional[Dict[str, Any]] = None,
+                 report: Optional[List[str]] = None):
+        """
+        初始化监视器
+
+        Args:
+            tester: 用于发现测试文件的 AutoTester
+            root: 要监视的项目根目录
+            interval: 两次轮询之间的间隔（秒）
+            debounce: 最后一次修改后需要保持安静的时间（秒），之后才开始运行
+            verbose: 是否显示详细输出
+            run_options: 每次运行传给 run_tests 的选项（verbose 和 reporters 除外），
+                与不使用监视模式时相同
+            report: 每次运行写出的报告，格式与 --report 参数相同
+        """
+        self.tester = tester
+        self.root = root
+        self.interval = interval
+        self.debounce = debounce
+        self.verbose = verbose
+        self.run_options = dict(run_options or {})
+        self.report = list(report or [])
+        cache_file = os.path.join(tester.cache_dir, "imports.json")
+        self.graph = ImportGraph(root, exclude_dirs=tester.exclude_dirs,
+                                 cache_file=cache_file)
+        self._index = DiscoveryIndex(root, pattern="*.py",
+                                     exclude_dirs=tester.exclude_dirs)
+        self._process = None
+        self._running_tests: List[str] = []
+
+    def snapshot(self) -> Snapshot:
+        """
+        记录项目中全部 .py 文件的修改时间和大小
+        """
+        snapshot = {}
+        for path in self._index.discover():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshot[os.path.abspath(path)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def select(self, changed: Set[str]) -> List[str]:
+        """
+        重新发现测试文件，并选出导入了修改文件的测试
+        """
+        self.graph.update()
+        self.tester.discovered_tests = []
+        self.tester.selected_tests = {}
+        self.tester.excluded_tests = {}
+        test_files = self.tester.discover_tests()
+        return self.graph.affected_tests(changed, test_files)
+
+    def start_run(self, test_files: List[str]) -> None:
+        """
+        在子进程中开始运行测试
+        """
+        tester_args = {"test_directory": self.tester.test_directory,
+                       "pattern": self.tester.pattern,
+                       "cache_dir": self.tester.cache_dir,
+                       "exclude_dirs": self.tester.exclude_dirs}
+        sys.stdout.flush()
+        sys.stderr.flush()
+        self._process = multiprocessing.Process(
+            target=_run_selected,
+            args=(tester_args, test_files, self.verbose, self.run_options,
+                  self.report),
+        )
+        self._process.start()
+        self._running_tests = list(test_files)
+
+    def cancel_run(self) -> List[str]:
+        """
+        终止正在进行的运行
+
+        Returns:
+            被取消的运行原本要运行的测试文件
+        """
+        process = self._process
+        if process is None:
+            return []
+        if process.is_alive():
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+            except (AttributeError, OSError):
+                process.terminate()
+        process.join()
+        self._process = None
+        return self._running_tests
+
+    def _finished(self) -> bool:
+        if self._process is not None and not self._process.is_alive():
+            self._process.join()
+            self._process = None
+            print("\n[监视中] 等待文件修改... (Ctrl+C 退出)")
+        return self._process is None
+
+    def run_forever(self) -> None:
+        """
+        先运行全部测试，然后持续监视，直到被中断
+        """
+        # 被 kill 时同样走正常退出流程，终止正在进行的运行
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        state = self.snapshot()
+        self.graph.update()
+        self.start_run(self.tester.discovered_tests or self.tester.discover_tests())
+
+        changed: Set[str] = set()
+        carried: Set[str] = set()
+        last_change = 0.0
+        try:
+            while True:
+                time.sleep(self.interval)
+                new_state = self.snapshot()
+                new_changes = diff_snapshots(state, new_state)
+                state = new_state
+                if new_changes:
+                    changed |= new_changes
+                    last_change = time.monotonic()
+                    if self._process is not None and self._process.is_alive():
+                        print("\n[监视中] 检测到新的修改，取消正在进行的运行")
+                        carried.update(self.cancel_run())
+                    continue
+
+                if not self._finished() or not changed:
+                    continue
+                if time.monotonic() - last_change < self.debounce:
+                    continue
+
+                selected = self.select(changed)
+                # 被取消的运行中仍然存在的测试文件也要重新运行
+                discovered = set(self.tester.discovered_tests)
+                selected += [f for f in sorted(carried)
+                             if f in discovered and f not in selected]
+                names = sorted(os.path.relpath(path) for path in changed)
+                print(f"\n[监视中] {len(names)} 个文件已修改: {', '.join(names[:5])}"
+                      + (" ..." if len(names) > 5 else ""))
+                changed, carried = set(), set()
+                if not selected:
+                    print("[监视中] 没有受影响的测试文件")
+                    continue
+                print(f"[监视中] 重新运行 {len(selected)} 个受影响的测试文件"
+                      f" (共 {len(self.tester.discovered_tests)} 个)")
+                self.start_run(selected)
+        finally:
+            self.cancel_run()
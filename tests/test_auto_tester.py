@@ -5,6 +5,8 @@ py_auto_tester 包的示例测试文件
 import unittest
 import sys
 import os
+import shutil
+import tempfile
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
@@ -12,6 +14,106 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from py_auto_tester import AutoTester
 
 
+DOCSTRING_SAMPLE = '''
+class Box:
+    def __init__(self):
+        self.value = 0
+
+    def put(self, n):
+        """
+        (3) -> (3 && value=3)
+        (1 + 1) -> 2
+        (4) -> 5
+        """
+        self.value = n
+        return n
+
+    def get(self):
+        """
+        () -> 7 @value=7
+        () -> type:int
+        """
+        return self.value
+
+
+class Other:
+    def name(self):
+        """
+        () -> 'other'
+        """
+        return "other"
+'''
+
+
+# 一个方法中有两个用例失败
+COUNTS_SAMPLE = '''
+class Twice:
+    def double(self, n):
+        """
+        (1) -> 2
+        (2) -> 5
+        (3) -> 7
+        """
+        return n * 2
+
+    def half(self, n):
+        """
+        (4) -> 2.0
+        """
+        return n / 2
+'''
+
+# 每个方法的结果取决于一种用例写法是否真正执行；类名生成的测试类名和数据表名会冲突
+SEMANTICS_SAMPLE = '''
+class FooBar:
+    def __init__(self):
+        self.value = 0
+
+    def get(self):
+        """
+        () -> 7 @value=7
+        """
+        return self.value
+
+    def put(self, n):
+        """
+        (1 + 1) -> 2
+        """
+        return n
+
+    def store(self, n):
+        """
+        (3) -> 3 && value=4
+        """
+        self.value = n
+        return n
+
+
+class Foo_Bar:
+    def name(self):
+        """
+        () -> 'foo_bar'
+        """
+        return "foo_bar"
+
+
+class Foo:
+    def name(self):
+        """
+        () -> type:str
+        """
+        return "foo"
+
+
+class TestFoo:
+    def name(self):
+        """
+        () -> 'test_foo'
+        """
+        return "test_foo"
+'''
+
+
 class TestAutoTester(unittest.TestCase):
     """
     AutoTester类的测试用例
@@ -66,6 +168,147 @@ class TestAutoTester(unittest.TestCase):
         tester = AutoTester(test_directory="nonexistent_dir")
         tests = tester.discover_tests()
         self.assertEqual(tests, [])
+    
+    def test_run_docstring_cases(self):
+        """
+        测试直接运行docstring中的用例: 每个用例是一个子测试，不生成任何文件
+        """
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        source = os.path.join(temp_dir, "doc_sample.py")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write(DOCSTRING_SAMPLE)
+        results = self.tester.run_docstring_cases(source)
+        self.assertEqual((results["total"], results["failed"], results["errors"]),
+                         (3, 1, 0))
+        self.assertEqual([test_id for test_id, _ in results["failures"]],
+                         [f"{source}::TestBox::test_put (case=3)"])
+        self.assertEqual(os.listdir(temp_dir), ["doc_sample.py"])
+        self.assertNotIn("doc_sample", sys.modules)
+        self.assertNotIn(temp_dir, sys.path)
+        
+        results = self.tester.run_docstring_cases(source, class_filter="Other")
+        self.assertEqual((results["total"], results["failed"]), (1, 0))
+    
+    def test_run_docstring_cases_counts_methods(self):
+        """
+        测试一个方法中有多个用例失败时只计为一个失败的测试，每个用例仍分别报告
+        """
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        source = os.path.join(temp_dir, "doc_counts.py")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write(COUNTS_SAMPLE)
+        results = self.tester.run_docstring_cases(source)
+        self.assertEqual((results["total"], results["passed"], results["failed"],
+                          results["errors"]), (2, 1, 1, 0))
+        self.assertEqual([test_id for test_id, _ in results["failures"]],
+                         [f"{source}::TestTwice::test_double (case={n})"
+                          for n in (2, 3)])
+    
+    def test_generate_tests_from_dir(self):
+        """
+        测试按目录生成测试文件，内容未变的源文件在下次运行时跳过
+        """
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        package = os.path.join(temp_dir, "pkg")
+        os.makedirs(os.path.join(package, "sub"))
+        source = '''
+class Adder:
+    def add(self, a, b):
+        """
+        (1, 2) -> 3
+        """
+        return a + b
+'''
+        for name in ("adder.py", os.path.join("sub", "adder.py")):
+            with open(os.path.join(package, name), "w", encoding="utf-8") as f:
+                f.write(source)
+        with open(os.path.join(package, "plain.py"), "w", encoding="utf-8") as f:
+            f.write("x = 1\n")
+        output_dir = os.path.join(temp_dir, "generated")
+        tester = AutoTester(cache_dir=os.path.join(temp_dir, ".cache"))
+        
+        stats = tester.generate_tests_from_dir(package, output_dir, workers=2)
+        self.assertEqual(stats["generated"],
+                         [os.path.join(output_dir, "sub", "test_adder.py"),
+                          os.path.join(output_dir, "test_adder.py")])
+        self.assertEqual((stats["unchanged"], stats["no_cases"], stats["errors"]),
+                         (0, 1, []))
+        
+        with open(os.path.join(package, "adder.py"), "a", encoding="utf-8") as f:
+            f.write("# 修改\n")
+        stats = tester.generate_tests_from_dir(package, output_dir)
+        self.assertEqual(stats["generated"],
+                         [os.path.join(output_dir, "test_adder.py")])
+        self.assertEqual((stats["unchanged"], stats["no_cases"]), (2, 0))
+    
+    def test_generate_table_style(self):
+        """
+        测试数据表方式生成的测试: 与直接运行docstring的结果相同，每个失败的用例单独报告
+        """
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        self.addCleanup(sys.modules.pop, "doc_sample", None)
+        source = os.path.join(temp_dir, "doc_sample.py")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write(DOCSTRING_SAMPLE)
+        tests_dir = os.path.join(temp_dir, "tests")
+        os.makedirs(tests_dir)
+        output = os.path.join(tests_dir, "test_doc_sample.py")
+        test_code = self.tester.generate_test_from_file(source, output, style="table")
+        self.assertIn("BOX_CASES = {", test_code)
+        self.assertNotIn("import py_auto_tester", test_code)
+        
+        with open(source, "a", encoding="utf-8") as f:
+            f.write(COUNTS_SAMPLE)
+        self.tester.generate_test_from_file(source, output, style="table")
+        
+        tester = AutoTester(test_directory=tests_dir,
+                            cache_dir=os.path.join(temp_dir, ".cache"))
+        results = tester.run_tests(verbose=False)
+        self.assertEqual((results["total"], results["passed"], results["failed"],
+                          results["errors"]), (5, 3, 2, 0))
+        self.assertEqual([test_id for test_id, _ in results["failures"]],
+                         [f"{output}::TestBox::test_put (case=3)"]
+                         + [f"{output}::TestTwice::test_double (case={n})"
+                            for n in (2, 3)])
+        
+        with self.assertRaises(ValueError):
+            self.tester.generate_test_from_file(source, style="compact")
+    
+    def test_generate_styles_check_same_cases(self):
+        """
+        测试两种生成方式执行相同的检查（初始属性、动态参数、检查属性），生成的名称不冲突
+        """
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        self.addCleanup(sys.modules.pop, "sem_sample", None)
+        source = os.path.join(temp_dir, "sem_sample.py")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write(SEMANTICS_SAMPLE)
+        
+        outcomes = {}
+        for style in ("unrolled", "table"):
+            tests_dir = os.path.join(temp_dir, style)
+            os.makedirs(tests_dir)
+            output = os.path.join(tests_dir, "test_sem_sample.py")
+            test_code = self.tester.generate_test_from_file(source, output, style=style)
+            self.assertNotIn("TODO", test_code)
+            self.assertIn("class TestFoo_2(unittest.TestCase):", test_code)
+            self.assertIn("class TestTestFoo(unittest.TestCase):", test_code)
+            tester = AutoTester(test_directory=tests_dir,
+                                cache_dir=os.path.join(temp_dir, style + ".cache"))
+            results = tester.run_tests(verbose=False)
+            outcomes[style] = (results["total"], results["passed"], results["failed"],
+                               results["errors"],
+                               [test_id.split("::")[-1].split(" ")[0]
+                                for test_id, _ in results["failures"]])
+            sys.modules.pop("sem_sample", None)
+        self.assertIn("FOO_BAR_CASES_2 = {", test_code)
+        self.assertEqual(outcomes["unrolled"], (6, 5, 1, 0, ["test_store"]))
+        self.assertEqual(outcomes["table"], outcomes["unrolled"])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,121 @@
+"""
+输出捕获和回溯截断的测试
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from py_auto_tester import AutoTester
+from py_auto_tester.report import truncate_text
+from py_auto_tester.runner import BoundedOutput
+
+
+CHATTY_TESTS = '''
+import sys
+import unittest
+
+class TestChatty(unittest.TestCase):
+    def test_loud_pass(self):
+        for i in range(1000):
+            print("pass line", i)
+
+    def test_loud_fail(self):
+        for i in range(1000):
+            print("fail line", i)
+        sys.stderr.write("warning\\n")
+        self.fail("x" * 5000)
+'''
+
+
+class TestBoundedOutput(unittest.TestCase):
+    """
+    BoundedOutput 的测试用例
+    """
+
+    def test_keeps_tail_and_spills_full_output(self):
+        """
+        测试内存中只保留最后的输出，完整输出写入临时文件
+        """
+        captured = BoundedOutput(limit=100)
+        captured.write("short\n")
+        self.assertEqual(captured.getvalue(), "short\n")
+        self.assertIsNone(captured.spill_path)
+
+        for i in range(100):
+            captured.write(f"line {i}\n")
+        value = captured.getvalue()
+        self.assertTrue(value.endswith("line 99\n"))
+        self.assertIn("省略了前面", value)
+        self.assertLessEqual(len(value.splitlines()[-1]), 100)
+        path = captured.spill_path
+        with open(path, encoding="utf-8") as f:
+            self.assertTrue(f.read().startswith("short\nline 0\n"))
+
+        # 未 keep 的临时文件在清空时删除
+        captured.seek(0)
+        captured.truncate()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(captured.getvalue(), "")
+        captured.close()
+
+    def test_truncate_text_keeps_both_ends(self):
+        """
+        测试截断回溯时保留开头和结尾
+        """
+        text = "Traceback\n" + "frame\n" * 1000 + "AssertionError: boom"
+        truncated = truncate_text(text, 200)
+        self.assertTrue(truncated.startswith("Traceback\n"))
+        self.assertTrue(truncated.endswith("AssertionError: boom"))
+        self.assertLess(len(truncated), 260)
+        self.assertEqual(truncate_text("short", 200), "short")
+        self.assertEqual(truncate_text(text, None), text)
+
+
+class TestCaptureInRunTests(unittest.TestCase):
+    """
+    run_tests 捕获输出的测试用例
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.temp_dir, "test_chatty.py"), "w",
+                  encoding="utf-8") as f:
+            f.write(textwrap.dedent(CHATTY_TESTS))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_output_attached_only_to_failures(self):
+        """
+        测试捕获的输出只附加在失败测试上，回溯按 traceback_limit 截断
+        """
+        tester = AutoTester(test_directory=self.temp_dir,
+                            cache_dir=os.path.join(self.temp_dir, ".cache"))
+        results = tester.run_tests(verbose=False, capture_output=True,
+                                   output_limit=1000, traceback_limit=500)
+
+        test_id, traceback = results["failures"][0]
+        self.assertTrue(test_id.endswith("test_loud_fail"))
+        self.assertLess(len(traceback), 600)
+        self.assertNotIn("fail line", traceback)
+        self.assertEqual(list(results["outputs"]), [test_id])
+        output = results["outputs"][test_id]
+        self.assertTrue(output["stdout"].endswith("fail line 999\n"))
+        self.assertEqual(output["stderr"], "warning\n")
+
+        # 失败测试的完整输出保留在临时文件中
+        spill_path = output["stdout"].split("完整输出见 ")[1].split("]")[0]
+        self.addCleanup(os.unlink, spill_path)
+        with open(spill_path, encoding="utf-8") as f:
+            self.assertTrue(f.read().startswith("fail line 0\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+静态测试收集功能的测试
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from py_auto_tester import AutoTester
+from py_auto_tester.collector import StaticCollector, collect_source
+from py_auto_tester.runner import run_test_file
+
+
+SAMPLE_SOURCE = '''
+import unittest
+raise ImportError("静态收集不应导入模块")
+
+class Mixin:
+    def test_from_mixin(self):
+        pass
+
+class TestBase(Mixin, unittest.TestCase):
+    def test_base(self):
+        pass
+
+    def helper(self):
+        pass
+
+class TestChild(TestBase):
+    async def test_async(self):
+        pass
+
+class NotATest:
+    def test_ignored(self):
+        pass
+'''
+
+
+class TestStaticCollector(unittest.TestCase):
+    """
+    collect_source 和 StaticCollector 的测试用例
+    """
+
+    def setUp(self):
+        """
+        创建临时目录
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_file = os.path.join(self.temp_dir, "test_sample.py")
+        with open(self.test_file, "w", encoding="utf-8") as f:
+            f.write(textwrap.dedent(SAMPLE_SOURCE))
+
+    def tearDown(self):
+        """
+        删除临时目录
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_collect_source(self):
+        """
+        测试识别TestCase子类、继承的测试方法和混入类
+        """
+        tests = collect_source(textwrap.dedent(SAMPLE_SOURCE))
+        names = [(t["class"], t["method"]) for t in tests]
+        self.assertEqual(names, [
+            ("TestBase", "test_base"),
+            ("TestBase", "test_from_mixin"),
+            ("TestChild", "test_async"),
+            ("TestChild", "test_base"),
+            ("TestChild", "test_from_mixin"),
+        ])
+
+    def test_cache_by_file_hash(self):
+        """
+        测试文件内容未变时使用缓存，修改后重新解析
+        """
+        cache_file = os.path.join(self.temp_dir, "collect.json")
+        StaticCollector(cache_file).collect([self.test_file])
+
+        collector = StaticCollector(cache_file)
+        collected = collector.collect([self.test_file])
+        self.assertEqual(collector.stats, {"parsed": 0, "cached": 1})
+        self.assertTrue(collected[self.test_file][0]["id"].endswith(
+            "test_sample.py::TestBase::test_base"))
+
+        with open(self.test_file, "a", encoding="utf-8") as f:
+            f.write("\nclass TestMore(unittest.TestCase):\n"
+                    "    def test_more(self):\n        pass\n")
+        collector = StaticCollector(cache_file)
+        self.assertEqual(len(collector.collect([self.test_file])[self.test_file]), 6)
+        self.assertEqual(collector.stats["parsed"], 1)
+
+    def test_static_ids_match_runtime_ids(self):
+        """
+        测试静态收集的测试ID可以直接用来选择运行的测试
+        """
+        test_file = os.path.join(self.temp_dir, "test_runtime.py")
+        with open(test_file, "w", encoding="utf-8") as f:
+            f.write("import unittest\n\nclass TestX(unittest.TestCase):\n"
+                    "    def test_a(self):\n        pass\n\n"
+                    "    def test_b(self):\n        pass\n")
+        tester = AutoTester(test_directory=self.temp_dir,
+                            cache_dir=os.path.join(self.temp_dir, ".cache"))
+        test_ids = tester.collect_tests([test_file])[test_file]
+
+        file_result = run_test_file(test_file, test_ids[1:])
+        self.assertEqual([r["id"] for r in file_result["records"]], test_ids[1:])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+"""
+覆盖率收集与合并的测试
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from py_auto_tester import AutoTester
+from py_auto_tester.cover import (coverage_available, format_lines, minimize_tests,
+                                  statement_lines)
+
+
+SAMPLE_MODULE = '''
+def sign(x):
+    if x > 0:
+        return 1
+    if x < 0:
+        return -1
+    return 0
+
+
+def unused():
+    return None
+'''
+
+SAMPLE_TEST = '''
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from cov_sample import sign
+
+class Test{name}(unittest.TestCase):
+    def test_sign(self):
+        self.assertEqual(sign({value}), {expected})
+'''
+
+CONTEXT_TEST = '''
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "lib"))
+from cov_sample import sign
+
+class TestContexts(unittest.TestCase):
+    def test_positive(self):
+        self.assertEqual(sign(5), 1)
+
+    def test_negative(self):
+        self.assertEqual(sign(-5), -1)
+
+    def test_again(self):
+        self.assertEqual(sign(7), 1)
+'''
+
+
+class TestCoverage(unittest.TestCase):
+    """
+    覆盖率收集的测试用例
+    """
+
+    def setUp(self):
+        """
+        创建临时项目
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        tests_dir = os.path.join(self.temp_dir, "tests")
+        os.makedirs(tests_dir)
+        with open(os.path.join(self.temp_dir, "cov_sample.py"), "w",
+                  encoding="utf-8") as f:
+            f.write(textwrap.dedent(SAMPLE_MODULE))
+        for name, value, expected in (("Positive", 5, 1), ("Negative", -5, -1)):
+            path = os.path.join(tests_dir, f"test_{name.lower()}.py")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(SAMPLE_TEST.format(name=name, value=value, expected=expected))
+        self.tests_dir = tests_dir
+
+    def tearDown(self):
+        """
+        删除临时项目
+        """
+        sys.modules.pop("cov_sample", None)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_statement_lines_and_format(self):
+        """
+        测试语句分析: 多行语句算一条，文档字符串和复合语句的子句体不算在头部中
+        """
+        path = os.path.join(self.temp_dir, "statements.py")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('''"""文档"""\n\n@staticmethod\ndef f(a,\n      b):\n    """文档"""\n'''
+                    '''    total = (a +\n             b)\n'''
+                    '''    if total:\n        return 1\n''')
+        lines = statement_lines(path)
+        self.assertEqual(sorted(set(lines.values())), [3, 4, 7, 9, 10])
+        self.assertEqual((lines[5], lines[8]), (4, 7))
+        self.assertEqual(format_lines([3, 4, 7, 9, 10], {4, 7, 10}), "4-7, 10")
+
+    @unittest.skipUnless(coverage_available("coverage"), "需要安装coverage包")
+    def test_serial_and_parallel_runs_combine_to_the_same_report(self):
+        """
+        测试覆盖率与测试在同一次运行中收集，并行时合并各工作进程的数据
+        """
+        self._check_backend("coverage", ".coverage")
+
+    @unittest.skipUnless(coverage_available("monitoring"), "需要 Python 3.12+")
+    def test_monitoring_backend_matches_coverage(self):
+        """
+        测试 sys.monitoring 后端得到与 coverage 包相同的报告
+        """
+        self._check_backend("monitoring", ".covbits.json")
+
+    def test_minimize_tests(self):
+        """
+        测试贪心选择覆盖全部语句的测试，新增数相同时选耗时短的
+        """
+        test_lines = {"a": {"m.py": [1, 2, 3]}, "b": {"m.py": [3, 4]},
+                      "c": {"m.py": [4, 5], "n.py": [1]},
+                      "d": {"m.py": [4, 5], "n.py": [1]},
+                      "e": {}}
+        self.assertEqual(minimize_tests(test_lines, {"c": 2.0, "d": 1.0}), ["a", "d"])
+
+    def test_per_test_contexts_and_minimize(self):
+        """
+        测试按测试记录覆盖的行，重复的测试在最小化时被省略
+        """
+        backends = [name for name in ("coverage", "monitoring")
+                    if coverage_available(name)]
+        if not backends:
+            self.skipTest("没有可用的覆盖率后端")
+        lib_dir = os.path.join(self.temp_dir, "lib")
+        tests_dir = os.path.join(self.temp_dir, "ctx_tests")
+        os.makedirs(lib_dir)
+        os.makedirs(tests_dir)
+        source = os.path.join(lib_dir, "cov_sample.py")
+        prefix = os.path.join(tests_dir, "test_ctx.py") + "::TestContexts::"
+        shutil.move(os.path.join(self.temp_dir, "cov_sample.py"), source)
+        with open(os.path.join(tests_dir, "test_ctx.py"), "w", encoding="utf-8") as f:
+            f.write(CONTEXT_TEST)
+        for backend in backends:
+            for workers in (1, 2):
+                sys.modules.pop("cov_sample", None)
+                tester = AutoTester(test_directory=tests_dir,
+                                    cache_dir=os.path.join(self.temp_dir, ".cache"))
+                results = tester.run_tests(verbose=False, workers=workers,
+                                           coverage=True, coverage_source=[lib_dir],
+                                           coverage_backend=backend,
+                                           coverage_contexts=True)
+                tests = results["coverage"]["tests"]
+                self.assertEqual(sorted(tests), [prefix + name for name in
+                                                 ("test_again", "test_negative",
+                                                  "test_positive")])
+                self.assertEqual(tests[prefix + "test_positive"], {source: [3, 4]})
+                self.assertEqual(tests[prefix + "test_negative"], {source: [3, 5, 6]})
+
+                minimized = tester.minimize_tests(results)
+                self.assertEqual(len(minimized["selected"]), 2)
+                self.assertEqual(minimized["selected"][0], prefix + "test_negative")
+                self.assertEqual(len(minimized["redundant"]), 1)
+                self.assertEqual(minimized["lines"], 4)
+                with open(results["coverage"]["test_lines_file"],
+                          encoding="utf-8") as f:
+                    self.assertEqual(json.load(f)["tests"], tests)
+
+    def _check_backend(self, backend, data_file):
+        source = os.path.join(self.temp_dir, "cov_sample.py")
+        tests = [os.path.join(self.tests_dir, name)
+                 for name in ("test_negative.py", "test_positive.py")]
+        reports = []
+        for workers in (1, 2):
+            sys.modules.pop("cov_sample", None)
+            tester = AutoTester(test_directory=self.tests_dir,
+                                cache_dir=os.path.join(self.temp_dir, ".cache"))
+            results = tester.run_tests(verbose=False, workers=workers, coverage=True,
+                                       coverage_source=[self.temp_dir],
+                                       coverage_backend=backend)
+            self.assertEqual(results["total"], 2)
+            reports.append(results["coverage"])
+
+        for report in reports:
+            self.assertEqual(report["backend"], backend)
+            self.assertEqual([f["file"] for f in report["files"]], [source] + tests)
+            entry = report["files"][0]
+            self.assertEqual((entry["statements"], entry["missing"]), (8, 2))
+            self.assertEqual(entry["missing_lines"], "7, 11")
+        data_dir = os.path.dirname(reports[1]["data_file"])
+        self.assertEqual(os.listdir(data_dir), [data_file])
+
+
+if __name__ == '__main__':
+    unittest.main()
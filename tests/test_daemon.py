@@ -0,0 +1,132 @@
+"""
+常驻守护进程的测试
+"""
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from py_auto_tester.daemon import WarmDaemon, daemon_supported, send_request
+from py_auto_tester.history import FailureHistory
+
+
+SAMPLE_TEST = '''
+import unittest
+import daemon_helper
+
+class TestHelper(unittest.TestCase):
+    def test_value(self):
+        self.assertEqual(daemon_helper.VALUE, 1)
+'''
+
+
+def _serve(socket_path, root):
+    sys.path.insert(0, root)
+    daemon = WarmDaemon(socket_path=socket_path, preload=["daemon_helper"], root=root)
+    daemon.serve_forever()
+
+
+@unittest.skipUnless(daemon_supported(), "守护进程模式需要 Unix 套接字和 fork")
+class TestWarmDaemon(unittest.TestCase):
+    """
+    WarmDaemon 的测试用例
+    """
+
+    def setUp(self):
+        """
+        在临时项目目录中启动守护进程
+        """
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, "tests"))
+        with open(os.path.join(self.root, "tests", "test_helper.py"), "w",
+                  encoding="utf-8") as f:
+            f.write(SAMPLE_TEST)
+        self._write_helper(1)
+        self.socket_path = os.path.join(self.root, "daemon.sock")
+        context = multiprocessing.get_context("fork")
+        self.process = context.Process(target=_serve,
+                                       args=(self.socket_path, self.root))
+        self.process.start()
+        deadline = time.time() + 10
+        while not os.path.exists(self.socket_path) and time.time() < deadline:
+            time.sleep(0.05)
+
+    def tearDown(self):
+        """
+        停止守护进程并删除临时目录
+        """
+        try:
+            list(send_request({"command": "stop"}, self.socket_path))
+        except OSError:
+            pass
+        self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.terminate()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _write_helper(self, value):
+        path = os.path.join(self.root, "daemon_helper.py")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"VALUE = {value}\n")
+        # 保证两次写入的修改时间不同
+        os.utime(path, (time.time() + value, time.time() + value))
+
+    def _run(self, **options):
+        request = dict(options, command="run", cwd=self.root,
+                       dir=os.path.join(self.root, "tests"))
+        return list(send_request(request, self.socket_path))
+
+    def test_run_streams_file_results(self):
+        """
+        测试运行请求按文件流式返回结果并以汇总结束
+        """
+        events = self._run()
+        kinds = [event["event"] for event in events]
+        self.assertEqual(kinds, ["discovered", "run_start", "start", "pass", "timing",
+                                 "summary"])
+        self.assertTrue(
+            events[3]["id"].endswith("test_helper.py::TestHelper::test_value"))
+        self.assertEqual(events[-1]["passed"], 1)
+
+    def test_changed_module_is_reloaded(self):
+        """
+        测试预加载的项目模块被修改后重新导入
+        """
+        self.assertEqual(self._run()[-1]["passed"], 1)
+        self._write_helper(2)
+        events = self._run()
+        self.assertEqual(events[0]["event"], "log")
+        self.assertEqual(events[-1]["failed"], 1)
+
+        status = list(send_request({"command": "status"}, self.socket_path))[0]
+        self.assertEqual(status["runs"], 2)
+
+    def test_run_options_and_failure_history(self):
+        """
+        测试运行选项传给子进程，结果与本地运行一样写入失败记录
+        """
+        with open(os.path.join(self.root, "tests", "test_more.py"), "w",
+                  encoding="utf-8") as f:
+            f.write("import unittest\n\nclass TestMore(unittest.TestCase):\n"
+                    "    def test_fail(self):\n        self.fail()\n")
+        events = self._run(workers=2, trace_memory=True)
+        self.assertEqual(events[1], {"event": "run_start", "files": 2, "workers": 2})
+        self.assertEqual((events[-1]["total"], events[-1]["failed"]), (2, 1))
+        self.assertTrue(all("memory_peak" in event for event in events
+                            if event["event"] in ("pass", "fail")))
+
+        failures = FailureHistory(
+            os.path.join(self.root, ".py_auto_tester", "lastfailed.json"))
+        self.assertEqual(len(failures.failed), 1)
+        self.assertTrue(failures.failed.pop().endswith("TestMore::test_fail"))
+
+
+if __name__ == '__main__':
+    unittest.main()
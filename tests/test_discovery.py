@@ -0,0 +1,92 @@
+"""
+增量测试发现功能的测试
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from py_auto_tester import AutoTester
+from py_auto_tester.discovery import DiscoveryIndex
+
+
+class TestDiscoveryIndex(unittest.TestCase):
+    """
+    DiscoveryIndex 的测试用例
+    """
+
+    def setUp(self):
+        """
+        创建包含测试文件和干扰目录的临时目录
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "tests")
+        self.index_file = os.path.join(self.temp_dir, "cache", "discovery.json")
+        for relative in ("test_a.py", "unit/test_b.py", "unit/b_test.py",
+                         "node_modules/test_c.py", ".git/test_d.py",
+                         "env/pyvenv.cfg", "env/test_e.py"):
+            path = os.path.join(self.root, relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "w").close()
+
+    def tearDown(self):
+        """
+        删除临时目录
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _age_tree(self):
+        """
+        把目录修改时间设为过去，使索引可以复用这些目录
+        """
+        past = time.time() - 60
+        for current, dirs, files in os.walk(self.root):
+            os.utime(current, (past, past))
+
+    def _relative(self, paths):
+        return sorted(os.path.relpath(p, self.root).replace(os.sep, "/") for p in paths)
+
+    def test_pattern_and_excludes(self):
+        """
+        测试按模式匹配文件并剪除排除目录和虚拟环境
+        """
+        found = DiscoveryIndex(self.root).discover()
+        self.assertEqual(self._relative(found), ["test_a.py", "unit/test_b.py"])
+
+        found = DiscoveryIndex(self.root, pattern="*_test.py").discover()
+        self.assertEqual(self._relative(found), ["unit/b_test.py"])
+
+    def test_index_reuses_unchanged_directories(self):
+        """
+        测试修改时间未变的目录复用索引，新增文件能被发现
+        """
+        self._age_tree()
+        DiscoveryIndex(self.root, index_file=self.index_file).discover()
+
+        index = DiscoveryIndex(self.root, index_file=self.index_file)
+        self.assertEqual(len(index.discover()), 2)
+        self.assertEqual(index.stats["scanned"], 0)
+
+        open(os.path.join(self.root, "unit", "test_new.py"), "w").close()
+        index = DiscoveryIndex(self.root, index_file=self.index_file)
+        found = index.discover()
+        self.assertIn("unit/test_new.py", self._relative(found))
+        self.assertEqual(index.stats["scanned"], 1)
+
+    def test_auto_tester_honours_pattern(self):
+        """
+        测试 AutoTester.discover_tests 使用 pattern 参数
+        """
+        tester = AutoTester(test_directory=self.root, pattern="*_test.py",
+                            cache_dir=os.path.join(self.temp_dir, "cache"))
+        self.assertEqual(self._relative(tester.discover_tests()), ["unit/b_test.py"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+测试模块释放和内存受限模式的测试
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from py_auto_tester.runner import iter_file_events
+
+
+SAMPLE_WITH_FIXTURES = '''
+import unittest
+import evict_helper
+
+CALLS = []
+
+def setUpModule():
+    CALLS.append("setUpModule")
+
+def tearDownModule():
+    raise RuntimeError("tearDownModule ran")
+
+class TestFixtures(unittest.TestCase):
+    def test_module_fixture_ran(self):
+        self.assertEqual(CALLS, ["setUpModule"])
+        self.assertEqual(evict_helper.VALUE, 42)
+'''
+
+
+class TestModuleEviction(unittest.TestCase):
+    """
+    测试文件运行结束后模块释放的测试用例
+    """
+
+    def setUp(self):
+        """
+        在临时项目目录中创建测试文件和它导入的项目模块
+        """
+        self.temp_dir = os.path.realpath(tempfile.mkdtemp())
+        with open(os.path.join(self.temp_dir, "test_fixtures.py"), "w",
+                  encoding="utf-8") as f:
+            f.write(textwrap.dedent(SAMPLE_WITH_FIXTURES))
+        with open(os.path.join(self.temp_dir, "evict_helper.py"), "w",
+                  encoding="utf-8") as f:
+            f.write("VALUE = 42\n")
+        old_cwd = os.getcwd()
+        os.chdir(self.temp_dir)
+        sys.path.insert(0, self.temp_dir)
+        self.addCleanup(os.chdir, old_cwd)
+        self.addCleanup(sys.path.remove, self.temp_dir)
+        self.addCleanup(sys.modules.pop, "evict_helper", None)
+
+    def tearDown(self):
+        """
+        删除临时目录
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_module_fixtures_run_and_module_is_released(self):
+        """
+        测试模块级夹具正常执行，文件运行结束后测试模块不再留在 sys.modules 中
+        """
+        events = list(iter_file_events("test_fixtures.py"))
+        statuses = [event["event"] for event in events if event["event"] != "start"]
+
+        self.assertEqual(statuses, ["pass", "error", "timing"])
+        self.assertIn("tearDownModule ran", events[2]["traceback"])
+        self.assertNotIn("test_fixtures", sys.modules)
+        # 默认模式下项目模块保留，供后续文件复用
+        self.assertIn("evict_helper", sys.modules)
+
+    def test_evict_modules_drops_new_project_modules(self):
+        """
+        测试内存受限模式淘汰运行期间新导入的项目模块，并报告常驻内存
+        """
+        events = list(iter_file_events("test_fixtures.py", evict_modules=True,
+                                       collect_garbage=True))
+        timing = events[-1]
+
+        self.assertEqual(timing["tests_run"], 1)
+        self.assertNotIn("evict_helper", sys.modules)
+        self.assertNotIn("test_fixtures", sys.modules)
+        if timing["rss"] is not None:
+            self.assertGreater(timing["rss"], 0)
+            self.assertIsInstance(timing["rss_delta"], int)
+
+
+if __name__ == '__main__':
+    unittest.main()
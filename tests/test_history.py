@@ -0,0 +1,241 @@
+"""
+耗时历史与负载均衡调度的测试
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from py_auto_tester.core import AutoTester
+from py_auto_tester.history import (FailureHistory, TimingHistory, schedule_lpt,
+                                    select_within_budget)
+
+
+class TestTimingHistory(unittest.TestCase):
+    """
+    TimingHistory 和 schedule_lpt 的测试用例
+    """
+
+    def setUp(self):
+        """
+        创建临时目录
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.history_file = os.path.join(self.temp_dir, "cache", "timings.json")
+
+    def tearDown(self):
+        """
+        删除临时目录
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _make_file(self, name, size):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("#" * size)
+        return path
+
+    def test_history_round_trip(self):
+        """
+        测试耗时历史能够保存并重新读取
+        """
+        history = TimingHistory(self.history_file)
+        history.record_file("tests/test_a.py", 2.0)
+        history.record_test("tests/test_a.py::TestA::test_x", 0.5)
+        history.save()
+
+        reloaded = TimingHistory(self.history_file)
+        self.assertEqual(reloaded.files, {"tests/test_a.py": 2.0})
+        self.assertEqual(reloaded.tests, {"tests/test_a.py::TestA::test_x": 0.5})
+
+    def test_unknown_files_estimated_from_size(self):
+        """
+        测试没有历史记录的文件按已知文件的"秒/字节"估算
+        """
+        known = self._make_file("test_known.py", 100)
+        unknown = self._make_file("test_unknown.py", 300)
+        history = TimingHistory(self.history_file)
+        history.record_file(known, 1.0)
+
+        estimates = history.estimate_files([known, unknown])
+        self.assertAlmostEqual(estimates[known], 1.0)
+        self.assertAlmostEqual(estimates[unknown], 3.0)
+
+    def test_schedule_lpt(self):
+        """
+        测试LPT调度按耗时降序排列并给出预测完成时间
+        """
+        order, makespan = schedule_lpt({"a": 1.0, "b": 5.0, "c": 3.0, "d": 3.0}, 2)
+        self.assertEqual(order, ["b", "c", "d", "a"])
+        self.assertAlmostEqual(makespan, 6.0)
+
+
+class TestFailureHistory(unittest.TestCase):
+    """
+    FailureHistory 的测试用例
+    """
+
+    def setUp(self):
+        """
+        创建临时目录
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "cache", "lastfailed.json")
+
+    def tearDown(self):
+        """
+        删除临时目录
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _run(self, events):
+        failures = FailureHistory(self.path)
+        for event in events:
+            failures.record(event)
+        failures.save()
+        return FailureHistory(self.path)
+
+    def test_partial_runs_keep_earlier_failures(self):
+        """
+        测试没有运行的测试保留原来的失败记录，失败的子测试记为所属测试
+        """
+        a, b = "tests/test_a.py::TestA::test_a", "tests/test_a.py::TestA::test_b"
+        self._run([{"event": "start", "id": a}, {"event": "fail", "id": a},
+                   {"event": "start", "id": b},
+                   {"event": "fail", "id": b + " (i=1)", "subtest": True},
+                   {"event": "timing", "file": "tests/test_c.py",
+                    "load_error": "boom"}])
+        failures = self._run([{"event": "start", "id": a}, {"event": "pass", "id": a}])
+
+        self.assertEqual(failures.failed, {b, "tests/test_c.py"})
+        collected = {"tests/test_a.py": [a, b], "tests/test_c.py": []}
+        self.assertEqual(failures.select(collected),
+                         {"tests/test_a.py": [b], "tests/test_c.py": None})
+
+    def test_fixed_fixture_failure_is_cleared(self):
+        """
+        测试夹具错误修复后，该文件再次运行时清除它的记录，--lf 不再选中该文件
+        """
+        tests_dir = os.path.join(self.temp_dir, "tests")
+        os.makedirs(tests_dir)
+        path = os.path.join(tests_dir, "test_fixture.py")
+        source = ("import unittest\n\nclass TestFixture(unittest.TestCase):\n"
+                  "    @classmethod\n    def setUpClass(cls):\n        {body}\n\n"
+                  "    def test_a(self):\n        pass\n")
+        tester = AutoTester(test_directory=tests_dir,
+                            cache_dir=os.path.dirname(self.path))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(source.format(body="raise RuntimeError('boom')"))
+        tester.run_tests(verbose=False)
+        self.assertEqual(len(FailureHistory(self.path).failed), 1)
+        self.assertIn("setUpClass", FailureHistory(self.path).failed.pop())
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(source.format(body="pass"))
+        tester.discover_tests(last_failed=True)
+        self.assertEqual(tester.last_failed_selection["whole_files"], 1)
+        results = tester.run_tests(verbose=False)
+        self.assertEqual((results["total"], results["passed"]), (1, 1))
+        self.assertEqual(FailureHistory(self.path).failed, set())
+        tester.discover_tests(last_failed=True)
+        self.assertIsNone(tester.last_failed_selection)
+
+
+class TestTimeBudget(unittest.TestCase):
+    """
+    按时间预算选择测试的测试用例
+    """
+
+    def setUp(self):
+        """
+        创建临时目录
+        """
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        删除临时目录
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_select_within_budget(self):
+        """
+        测试高分值的测试优先，放不下的测试推迟后继续尝试更短的测试
+        """
+        estimates = {"a": 1.0, "b": 5.0, "c": 3.0, "d": 0.5}
+        chosen, deferred = select_within_budget(estimates, {"b": 4, "c": 1}, 7.0)
+        self.assertEqual(chosen, ["b", "d", "a"])
+        self.assertEqual(deferred, ["c"])
+
+    def test_discover_with_time_budget(self):
+        """
+        测试上次失败和修改过的测试优先选入，推迟的测试写入 deferred.json
+        """
+        tests_dir = os.path.join(self.temp_dir, "tests")
+        cache_dir = os.path.join(self.temp_dir, "cache")
+        os.makedirs(tests_dir)
+        old = os.path.join(tests_dir, "test_old.py")
+        new = os.path.join(tests_dir, "test_new.py")
+        for path in (old, new):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("import unittest\n\nclass TestX(unittest.TestCase):\n"
+                        "    def test_a(self):\n        pass\n\n"
+                        "    def test_b(self):\n        pass\n")
+        tester = AutoTester(test_directory=tests_dir, cache_dir=cache_dir)
+        ids = tester.collect_tests(tester.discover_tests())
+        old_a, old_b = ids[old]
+        new_a, new_b = ids[new]
+
+        history = TimingHistory(os.path.join(cache_dir, "timings.json"))
+        for test_id in (old_a, old_b, new_a, new_b):
+            history.record_test(test_id, 1.0)
+        history.save()
+        failures = FailureHistory(os.path.join(cache_dir, "lastfailed.json"))
+        failures.record({"event": "fail", "id": old_b})
+        failures.save()
+        later = time.time() + 10
+        os.utime(new, (later, later))
+
+        files = tester.discover_tests(time_budget=2.5)
+        self.assertEqual(sorted(files), sorted([old, new]))
+        # 选中的文件整体运行并排除推迟的测试，静态收集不到的测试不会丢失
+        self.assertEqual(tester.selected_tests, {})
+        self.assertEqual(tester.excluded_tests, {old: [old_a], new: [new_b]})
+        self.assertEqual(tester.deferred_tests, [new_b, old_a])
+        with open(tester.budget_selection["deferred_file"], encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["deferred"], [new_b, old_a])
+
+    def test_time_budget_keeps_uncollected_tests(self):
+        """
+        测试时间预算足够时，继承自其他文件中基类的测试也会运行
+        """
+        tests_dir = os.path.join(self.temp_dir, "tests")
+        os.makedirs(tests_dir)
+        with open(os.path.join(tests_dir, "budget_base.py"), "w",
+                  encoding="utf-8") as f:
+            f.write("import unittest\n\nclass Base(unittest.TestCase):\n"
+                    "    def test_inherited(self):\n        pass\n")
+        with open(os.path.join(tests_dir, "test_mixed.py"), "w",
+                  encoding="utf-8") as f:
+            f.write("import os\nimport sys\nimport unittest\n\n"
+                    "sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))\n"
+                    "import budget_base\n\n"
+                    "class TestPlain(unittest.TestCase):\n"
+                    "    def test_a(self):\n        pass\n\n"
+                    "class TestDerived(budget_base.Base):\n"
+                    "    def test_c(self):\n        pass\n")
+        tester = AutoTester(test_directory=tests_dir,
+                            cache_dir=os.path.join(self.temp_dir, "cache"))
+        tester.discover_tests(time_budget=60.0)
+        self.assertEqual(tester.run_tests(verbose=False)["total"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+"""
+变异测试的测试
+"""
+
+import ast
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from py_auto_tester import AutoTester
+from py_auto_tester.cover import coverage_available
+from py_auto_tester.mutate import _Mutator, find_mutants
+
+
+SAMPLE_MODULE = '''
+"""模块文档"""
+
+
+def sign(x):
+    """符号"""
+    if x > 0:
+        return 1
+    return 0
+
+
+def spin(n):
+    i = 0
+    while i < n:
+        i += 1
+    return i
+
+
+def unused(a, b=2):
+    return a and b
+'''
+
+SAMPLE_TEST = '''
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from mut_sample import sign, spin
+
+class TestSample(unittest.TestCase):
+    def test_sign(self):
+        self.assertEqual(sign(5), 1)
+        self.assertEqual(sign(-5), 0)
+
+    def test_spin(self):
+        self.assertEqual(spin(3), 3)
+'''
+
+
+class Num(ast.AST):
+    """Python 3.7 的 ast.parse 生成的数字节点"""
+    _fields = ("n",)
+    _attributes = ("lineno", "col_offset")
+
+
+class NameConstant(ast.AST):
+    """Python 3.7 的 ast.parse 生成的 True/False/None 节点"""
+    _fields = ("value",)
+    _attributes = ("lineno", "col_offset")
+
+
+class _LegacyConstants(ast.NodeTransformer):
+    """
+    把语法树中的数字和布尔常量换成 Python 3.7 的节点类型
+    """
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or node.value is None:
+            legacy = NameConstant(value=node.value)
+        elif isinstance(node.value, (int, float)):
+            legacy = Num(n=node.value)
+        else:
+            return node
+        return ast.copy_location(legacy, node)
+
+
+class TestMutate(unittest.TestCase):
+    """
+    变异测试的测试用例
+    """
+
+    def setUp(self):
+        """
+        创建临时项目
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        tests_dir = os.path.join(self.temp_dir, "tests")
+        os.makedirs(tests_dir)
+        self.source = os.path.join(self.temp_dir, "mut_sample.py")
+        with open(self.source, "w", encoding="utf-8") as f:
+            f.write(textwrap.dedent(SAMPLE_MODULE))
+        with open(os.path.join(tests_dir, "test_sample.py"), "w",
+                  encoding="utf-8") as f:
+            f.write(SAMPLE_TEST)
+        self.tests_dir = tests_dir
+
+    def tearDown(self):
+        """
+        删除临时项目
+        """
+        sys.modules.pop("mut_sample", None)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_find_mutants(self):
+        """
+        测试列出运算符、常量和条件的变异位置，文档字符串不变异
+        """
+        mutants = find_mutants(textwrap.dedent(SAMPLE_MODULE))
+        descriptions = [(m["line"], m["description"]) for m in mutants]
+        self.assertEqual(descriptions, [
+            (7, "条件取反"), (7, "> → >="), (7, "0 → 1"), (8, "1 → 2"), (9, "0 → 1"),
+            (13, "0 → 1"), (14, "条件取反"), (14, "< → <="), (15, "+ → -"), (15, "1 → 2"),
+            (19, "2 → 3"), (20, "and → or"),
+        ])
+
+    def test_legacy_constant_nodes(self):
+        """
+        测试 Python 3.7 的 Num/NameConstant 节点同样生成常量变异
+        """
+        source = "def f(x):\n    return x + 1 if True else 2.5\n"
+        expected = find_mutants(source)
+        tree = _LegacyConstants().visit(ast.parse(source))
+        mutator = _Mutator(tree)
+        mutator.visit(tree)
+        self.assertEqual(mutator.points, expected)
+        self.assertIn("True → False", [m["description"] for m in expected])
+
+        constant_id = [m["id"] for m in expected if m["description"] == "1 → 2"][0]
+        tree = _LegacyConstants().visit(ast.parse(source))
+        mutated = _Mutator(tree, constant_id).visit(tree)
+        replaced = [node.value for node in ast.walk(mutated)
+                    if isinstance(node, ast.Constant)]
+        self.assertEqual(replaced, [2])
+
+    @unittest.skipUnless(coverage_available(), "没有可用的覆盖率后端")
+    def test_mutate_runs_only_covering_tests(self):
+        """
+        测试变体被覆盖它的测试杀死，死循环超时，源文件和模块在结束后保持原样
+        """
+        with open(self.source, encoding="utf-8") as f:
+            original = f.read()
+        for workers in (1, 2):
+            sys.modules.pop("mut_sample", None)
+            tester = AutoTester(test_directory=self.tests_dir,
+                                cache_dir=os.path.join(self.temp_dir, ".cache"))
+            summary = tester.mutate(self.source, workers=workers)
+            status = {(m["line"], m["description"]): m["status"]
+                      for m in summary["mutants"]}
+            self.assertEqual(status[(7, "条件取反")], "killed")
+            self.assertEqual(status[(7, "0 → 1")], "survived")
+            self.assertEqual(status[(15, "+ → -")], "timeout")
+            self.assertEqual(status[(20, "and → or")], "no_coverage")
+            # 默认值在定义时求值，不属于任何测试
+            self.assertEqual(status[(19, "2 → 3")], "no_coverage")
+            self.assertEqual((summary["survived"], summary["no_coverage"]), (3, 2))
+            killed = [m for m in summary["mutants"] if m["status"] == "killed"]
+            self.assertTrue(all(m["killed_by"].endswith("test_sign") or
+                                m["killed_by"].endswith("test_spin") for m in killed))
+            self.assertEqual(sys.modules["mut_sample"].spin(3), 3)
+        with open(self.source, encoding="utf-8") as f:
+            self.assertEqual(f.read(), original)
+
+
+if __name__ == '__main__':
+    unittest.main()
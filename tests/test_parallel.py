@@ -0,0 +1,324 @@
+"""
+并行执行功能的测试
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from py_auto_tester import AutoTester
+from py_auto_tester.history import FailureHistory, TimingHistory
+from py_auto_tester.parallel import ParallelRunner
+
+
+SAMPLE_PASSING = '''
+import unittest
+
+class TestPassing(unittest.TestCase):
+    def test_one(self):
+        self.assertEqual(1 + 1, 2)
+
+    def test_two(self):
+        self.assertTrue(True)
+'''
+
+SAMPLE_FAILING = '''
+import unittest
+
+class TestFailing(unittest.TestCase):
+    def test_fail(self):
+        self.assertEqual(1, 2)
+
+    def test_error(self):
+        raise RuntimeError("boom")
+'''
+
+SAMPLE_HOG = '''
+import unittest
+
+HOLD = []
+
+class TestHog(unittest.TestCase):
+    def test_burn(self):
+        while True:
+            pass
+
+    def test_leak(self):
+        HOLD.append(bytearray(250 * 2**20))
+
+    def test_ok(self):
+        pass
+'''
+
+SAMPLE_CRASH = '''
+import os
+import signal
+import unittest
+
+class TestCrash(unittest.TestCase):
+    def test_crash(self):
+        os.kill(os.getpid(), signal.SIGKILL)
+'''
+
+# 基类来自另一个文件，静态收集看不到 TestDerived
+SPLIT_BASE = '''
+import unittest
+
+class Base(unittest.TestCase):
+    def test_inherited(self):
+        pass
+'''
+
+SAMPLE_IMPORTED_BASE = '''
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import split_base
+
+class TestPlain(unittest.TestCase):
+    def test_a(self):
+        pass
+
+class TestMore(unittest.TestCase):
+    def test_b(self):
+        pass
+
+class TestDerived(split_base.Base):
+    def test_c(self):
+        pass
+'''
+
+
+class TestParallelRunner(unittest.TestCase):
+    """
+    ParallelRunner 的测试用例
+    """
+
+    def setUp(self):
+        """
+        创建包含示例测试文件的临时目录
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        for name, source in (("test_passing.py", SAMPLE_PASSING),
+                             ("test_failing.py", SAMPLE_FAILING)):
+            with open(os.path.join(self.temp_dir, name), "w", encoding="utf-8") as f:
+                f.write(textwrap.dedent(source))
+
+    def tearDown(self):
+        """
+        删除临时目录
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_parallel_results_match_serial_counts(self):
+        """
+        测试并行模式合并后的统计与串行模式一致
+        """
+        tester = AutoTester(test_directory=self.temp_dir,
+                            cache_dir=os.path.join(self.temp_dir, ".cache"))
+        tester.discover_tests()
+        runner = ParallelRunner(workers=2, verbose=False, stream=io.StringIO())
+        results = runner.run(tester.discovered_tests)
+
+        self.assertEqual(results["total"], 4)
+        self.assertEqual(results["passed"], 2)
+        self.assertEqual(results["failed"], 1)
+        self.assertEqual(results["errors"], 1)
+        self.assertTrue(results["failures"][0][0].endswith("TestFailing::test_fail"))
+        self.assertIn("RuntimeError", results["error_details"][0][1])
+
+    def test_split_file_runs_uncollected_tests(self):
+        """
+        测试按测试类拆分的大文件中，静态收集不到的测试在并行模式下照常运行
+        """
+        tests_dir = os.path.join(self.temp_dir, "split")
+        os.makedirs(tests_dir)
+        for name, source in (("split_base.py", SPLIT_BASE),
+                             ("test_imported_base.py", SAMPLE_IMPORTED_BASE),
+                             ("test_passing.py", SAMPLE_PASSING)):
+            with open(os.path.join(tests_dir, name), "w", encoding="utf-8") as f:
+                f.write(textwrap.dedent(source))
+        totals = []
+        for workers in (1, 2):
+            cache_dir = os.path.join(self.temp_dir, f".cache{workers}")
+            tester = AutoTester(test_directory=tests_dir, cache_dir=cache_dir)
+            totals.append(tester.run_tests(verbose=False, workers=workers)["total"])
+        self.assertEqual(totals, [6, 6])
+
+    def test_per_test_timings(self):
+        """
+        测试串行和并行模式都返回每个测试的耗时，trace_memory 时还有内存峰值
+        """
+        for workers in (1, 2):
+            tester = AutoTester(test_directory=self.temp_dir,
+                                cache_dir=os.path.join(self.temp_dir, ".cache"))
+            results = tester.run_tests(verbose=False, workers=workers,
+                                       trace_memory=True)
+            self.assertEqual(len(results["tests"]), 4)
+            for test in results["tests"]:
+                self.assertIn("cpu_time", test)
+                self.assertIn("memory_peak", test)
+
+        results = tester.run_tests(verbose=False, workers=1)
+        self.assertNotIn("memory_peak", results["tests"][0])
+
+    def test_iter_results_streams_events(self):
+        """
+        测试串行和并行模式产出的事件顺序和汇总一致
+        """
+        for workers in (1, 2):
+            tester = AutoTester(test_directory=self.temp_dir,
+                                cache_dir=os.path.join(self.temp_dir, ".cache"))
+            events = list(tester.iter_results(workers=workers))
+            kinds = [event["event"] for event in events]
+
+            self.assertEqual(kinds[0], "run_start")
+            self.assertEqual(kinds[-1], "summary")
+            self.assertEqual(kinds.count("start"), 4)
+            self.assertEqual(kinds.count("timing"), 2)
+            # 每个测试的结果事件都紧跟在它的 start 事件之后
+            for i, kind in enumerate(kinds):
+                if kind == "start":
+                    self.assertEqual(events[i + 1]["id"], events[i]["id"])
+            summary = events[-1]
+            self.assertEqual((summary["total"], summary["passed"], summary["failed"],
+                              summary["errors"]), (4, 2, 1, 1))
+
+    def test_failed_first_and_exitfirst(self):
+        """
+        测试上次失败的测试优先运行，exitfirst 在第一个失败后停止
+        """
+        for workers in (1, 2):
+            tester = AutoTester(test_directory=self.temp_dir,
+                                cache_dir=os.path.join(self.temp_dir, ".cache"))
+            tester.run_tests(verbose=False, workers=workers)
+            events = list(tester.iter_results(workers=workers, failed_first=True))
+            started = [e["id"].split("::", 1)[1] for e in events
+                       if e["event"] == "start"]
+            self.assertEqual(len(started), 4)
+            if workers == 1:
+                # 多个工作进程的事件交错到达，只有串行时开始顺序确定
+                self.assertEqual(set(started[:2]), {"TestFailing::test_fail",
+                                                    "TestFailing::test_error"})
+            else:
+                cache_dir = tester.cache_dir
+                tasks = tester._build_failed_first_tasks(
+                    TimingHistory(os.path.join(cache_dir, "timings.json")),
+                    FailureHistory(os.path.join(cache_dir, "lastfailed.json")))[0]
+                self.assertTrue(tasks[0][0].endswith("test_failing.py"))
+
+            tester.discover_tests(last_failed=True)
+            self.assertEqual(tester.last_failed_selection["selected_tests"], 2)
+            results = tester.run_tests(verbose=False, workers=workers, exitfirst=True)
+            self.assertTrue(results["stopped"])
+            self.assertEqual(results["failed"] + results["errors"], 1)
+
+    def test_worker_crash_is_reported_as_error(self):
+        """
+        测试工作进程意外退出时该文件被记为错误
+        """
+        crash_file = os.path.join(self.temp_dir, "test_crash.py")
+        with open(crash_file, "w", encoding="utf-8") as f:
+            f.write("import os\nos._exit(3)\n")
+
+        runner = ParallelRunner(workers=2, verbose=False, stream=io.StringIO())
+        results = runner.run([crash_file])
+
+        self.assertEqual(results["errors"], 1)
+        self.assertEqual(results["error_details"][0][0], crash_file)
+
+    def test_worker_exit_between_batches_does_not_block_the_run(self):
+        """
+        测试工作进程在其他进程大量发送事件时退出，运行照常结束，其余结果不丢失
+        """
+        for n in range(4):
+            with open(os.path.join(self.temp_dir, f"test_fast{n}.py"), "w",
+                      encoding="utf-8") as f:
+                f.write("import unittest\n\nclass TestFast(unittest.TestCase):\n")
+                f.writelines(f"    def test_{i}(self):\n        pass\n"
+                             for i in range(300))
+        with open(os.path.join(self.temp_dir, "test_exit.py"), "w",
+                  encoding="utf-8") as f:
+            f.write("import os\nimport unittest\n\nclass TestExit(unittest.TestCase):\n"
+                    "    def test_exit(self):\n        os._exit(3)\n")
+        tester = AutoTester(test_directory=self.temp_dir,
+                            cache_dir=os.path.join(self.temp_dir, ".cache"))
+        results = tester.run_tests(verbose=False, workers=2)
+
+        self.assertEqual(results["total"], 1205)
+        self.assertEqual((results["failed"], results["errors"]), (1, 2))
+        errors = dict(results["error_details"])
+        exit_id = next(e for e in errors if e.endswith("test_exit"))
+        self.assertIn("退出码 3", errors[exit_id])
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "依赖 Linux 的资源限制行为")
+    def test_resource_limits_report_the_test_and_keep_running(self):
+        """
+        测试触发内存和 CPU 限制的测试记为错误，工作进程被替换后其余测试照常运行
+        """
+        with open(os.path.join(self.temp_dir, "test_hog.py"), "w",
+                  encoding="utf-8") as f:
+            f.write(textwrap.dedent(SAMPLE_HOG))
+        tester = AutoTester(test_directory=self.temp_dir,
+                            cache_dir=os.path.join(self.temp_dir, ".cache"))
+        results = tester.run_tests(verbose=False, worker_memory_limit=200 * 2**20,
+                                   worker_cpu_limit=1)
+
+        errors = dict(results["error_details"])
+        self.assertEqual(results["total"], 7)
+        self.assertEqual(results["errors"], 3)
+        # 取决于父进程的地址空间大小，泄漏的分配失败或在测试结束后被检查出来
+        self.assertRegex(errors[next(e for e in errors if e.endswith("test_leak"))],
+                         "超出限制|MemoryError")
+        self.assertIn("ResourceLimitExceeded",
+                      errors[next(e for e in errors if e.endswith("test_burn"))])
+        self.assertGreaterEqual(results["respawned"], 1)
+
+    def test_max_tests_per_worker_recycles_between_tasks(self):
+        """
+        测试达到每个工作进程的测试数上限后换用新进程，崩溃归于正在运行的测试
+        """
+        crash_file = os.path.join(self.temp_dir, "test_crash.py")
+        with open(crash_file, "w", encoding="utf-8") as f:
+            f.write(textwrap.dedent(SAMPLE_CRASH))
+        tester = AutoTester(test_directory=self.temp_dir,
+                            cache_dir=os.path.join(self.temp_dir, ".cache"))
+        tester.discover_tests()
+        runner = ParallelRunner(workers=1, verbose=False, stream=io.StringIO(),
+                                max_tests_per_worker=1)
+        results = runner.run(sorted(tester.discovered_tests))
+
+        self.assertEqual(runner._spawned, 3)
+        self.assertEqual(results["total"], 5)
+        self.assertTrue(
+            results["error_details"][0][0].endswith("TestCrash::test_crash"))
+        self.assertIn("SIGKILL", results["error_details"][0][1])
+
+    @unittest.skipUnless(hasattr(os, "fork"), "zygote 模式需要 fork")
+    def test_zygote_mode_forks_one_child_per_file(self):
+        """
+        测试预加载模式为每个文件创建新进程并报告节省的导入时间
+        """
+        tester = AutoTester(test_directory=self.temp_dir,
+                            cache_dir=os.path.join(self.temp_dir, ".cache"))
+        tester.discover_tests()
+        runner = ParallelRunner(workers=1, verbose=False, stream=io.StringIO(),
+                                preload=["json"])
+        results = runner.run(tester.discovered_tests)
+
+        self.assertEqual(results["total"], 4)
+        self.assertEqual(results["preload"]["children"], 2)
+        self.assertEqual(results["preload"]["modules"], ["json"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+JUnit XML 和 JSON 行报告的测试
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from py_auto_tester import AutoTester
+from py_auto_tester.reporters import JSONLinesReporter, JUnitReporter, parse_report_spec
+
+
+SAMPLE_TESTS = '''
+import unittest
+
+class TestSample(unittest.TestCase):
+    def test_quiet(self):
+        print("not attached")
+
+    def test_fail(self):
+        print("captured <output>")
+        self.assertEqual(1, 2)
+
+    @unittest.skip("not now")
+    def test_skipped(self):
+        pass
+'''
+
+
+class TestReporters(unittest.TestCase):
+    """
+    报告器的测试用例
+    """
+
+    def setUp(self):
+        """
+        创建包含示例测试文件的临时目录
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.temp_dir, "test_sample.py"), "w",
+                  encoding="utf-8") as f:
+            f.write(textwrap.dedent(SAMPLE_TESTS))
+
+    def tearDown(self):
+        """
+        删除临时目录
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_parse_report_spec(self):
+        """
+        测试报告说明的解析和校验
+        """
+        self.assertEqual(parse_report_spec("junit:out/a.xml"), ("junit", "out/a.xml"))
+        for spec in ("junit", "junit:", "html:a.html"):
+            with self.assertRaises(ValueError):
+                parse_report_spec(spec)
+
+    def test_reports_carry_durations_and_output(self):
+        """
+        测试运行后的报告包含每个测试的耗时、失败信息和失败测试捕获的输出
+        """
+        junit_path = os.path.join(self.temp_dir, "reports", "junit.xml")
+        jsonl_path = os.path.join(self.temp_dir, "reports", "events.jsonl")
+        reporters = [JUnitReporter(junit_path), JSONLinesReporter(jsonl_path)]
+        tester = AutoTester(test_directory=self.temp_dir,
+                            cache_dir=os.path.join(self.temp_dir, ".cache"))
+        tester.run_tests(verbose=False, capture_output=True, reporters=reporters)
+        for reporter in reporters:
+            reporter.close()
+
+        suite = ElementTree.parse(junit_path).getroot().find("testsuite")
+        self.assertEqual((suite.get("tests"), suite.get("failures"),
+                          suite.get("skipped")), ("3", "1", "1"))
+        cases = {case.get("name"): case for case in suite.iter("testcase")}
+        self.assertEqual(cases["test_fail"].find("system-out").text,
+                         "captured <output>\n")
+        self.assertIsNone(cases["test_quiet"].find("system-out"))
+        self.assertEqual(cases["test_fail"].find("failure").get("message"),
+                         "AssertionError: 1 != 2")
+        self.assertIsNotNone(cases["test_fail"].get("time"))
+
+        with open(jsonl_path, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f]
+        self.assertEqual(events[-1]["event"], "summary")
+        failed = [e for e in events if e["event"] == "fail"]
+        self.assertEqual(failed[0]["stdout"], "captured <output>\n")
+        self.assertIn("duration", failed[0])
+
+    def test_junit_file_is_valid_after_every_flush(self):
+        """
+        测试 JUnit 文件在运行中途（每次刷新后）都是完整的 XML
+        """
+        path = os.path.join(self.temp_dir, "junit.xml")
+        reporter = JUnitReporter(path, flush_interval=0)
+        self.assertEqual(len(ElementTree.parse(path).getroot().find("testsuite")), 0)
+        for i in range(3):
+            reporter.handle({"event": "pass", "id": f"tests/test_a.py::TestA::test_{i}",
+                             "file": "tests/test_a.py", "duration": 0.01})
+            suite = ElementTree.parse(path).getroot().find("testsuite")
+            self.assertEqual(len(suite), i + 1)
+            self.assertEqual(suite.get("tests"), str(i + 1))
+        reporter.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
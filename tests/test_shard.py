@@ -0,0 +1,165 @@
+"""
+分片与结果合并功能的测试
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from py_auto_tester.core import AutoTester
+from py_auto_tester.shard import (
+    merge_result_files, owner_shard, parse_shard, partition, write_result_file,
+)
+
+
+# 基类来自另一个文件，静态收集只能看到 TestPlain 和 TestOther 中的测试
+SHARD_BASE = """
+import unittest
+
+
+class Base(unittest.TestCase):
+    def test_inherited(self):
+        pass
+"""
+
+SAMPLE_MIXED = """
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import shard_base
+
+
+class TestPlain(unittest.TestCase):
+    def test_a(self):
+        pass
+
+    def test_b(self):
+        pass
+
+
+class TestDerived(shard_base.Base):
+    def test_c(self):
+        pass
+"""
+
+SAMPLE_OTHER = """
+import unittest
+
+
+class TestOther(unittest.TestCase):
+    def test_x(self):
+        pass
+
+    def test_y(self):
+        pass
+"""
+
+
+class TestShard(unittest.TestCase):
+    """
+    分片划分与结果文件的测试用例
+    """
+
+    def setUp(self):
+        """
+        创建临时目录
+        """
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        删除临时目录
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_parse_shard(self):
+        """
+        测试分片说明的解析与校验
+        """
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for spec in ("0/4", "5/4", "a/b", "1"):
+            with self.assertRaises(ValueError):
+                parse_shard(spec)
+
+    def test_partition_by_count_is_deterministic(self):
+        """
+        测试没有耗时信息时按数量均衡，且与输入顺序无关
+        """
+        items = ["t/test_%d.py" % i for i in range(7)]
+        shards = partition(items, 3)
+        self.assertEqual(shards, partition(list(reversed(items)), 3))
+        self.assertEqual(sorted(sum(shards, [])), sorted(items))
+        self.assertEqual([len(s) for s in shards], [3, 2, 2])
+
+    def test_partition_by_duration(self):
+        """
+        测试有耗时信息时按耗时均衡
+        """
+        estimates = {"a": 10.0, "b": 4.0, "c": 3.0, "d": 3.0}
+        shards = partition(list(estimates), 2, estimates)
+        self.assertEqual(shards, [["a"], ["b", "c", "d"]])
+
+    def test_owner_shard_is_stable(self):
+        """
+        测试负责静态收集不到的测试的分片只由规范化路径决定
+        """
+        self.assertEqual(owner_shard("tests/test_a.py", 4),
+                         owner_shard(os.path.join("tests", "test_a.py"), 4))
+        owners = {owner_shard(f"tests/test_{i}.py", 3) for i in range(20)}
+        self.assertEqual(owners, {1, 2, 3})
+
+    def test_shards_cover_uncollected_tests(self):
+        """
+        测试各分片合起来运行的测试与完整运行一致，包括继承自其他文件中基类的测试
+        """
+        tests_dir = os.path.join(self.temp_dir, "tests")
+        os.makedirs(tests_dir)
+        for name, source in (("shard_base.py", SHARD_BASE),
+                             ("test_mixed.py", SAMPLE_MIXED),
+                             ("test_other.py", SAMPLE_OTHER)):
+            with open(os.path.join(tests_dir, name), "w", encoding="utf-8") as f:
+                f.write(source)
+
+        def run(shard=None):
+            # 各分片使用相同的（空的）耗时历史，就像在不同的机器上运行
+            cache_dir = os.path.join(self.temp_dir, f".cache-{shard}".replace("/", "-"))
+            tester = AutoTester(test_directory=tests_dir, cache_dir=cache_dir)
+            tester.discover_tests(shard=shard)
+            return [event["id"] for event in tester.iter_results(workers=1)
+                    if event["event"] == "pass"]
+
+        full = run()
+        self.assertEqual(len(full), 6)
+        for total in (2, 3):
+            ran = [test_id for index in range(1, total + 1)
+                   for test_id in run(f"{index}/{total}")]
+            self.assertEqual(sorted(ran), sorted(full))
+
+    def test_merge_result_files(self):
+        """
+        测试合并多个分片的结果文件
+        """
+        first = os.path.join(self.temp_dir, "r1.json")
+        second = os.path.join(self.temp_dir, "r2.json")
+        write_result_file(first, {"total": 3, "passed": 2, "failed": 1, "errors": 0,
+                                  "failures": [("t::A::test_x", "tb")],
+                                  "error_details": []}, shard="1/2")
+        write_result_file(second, {"total": 2, "passed": 2, "failed": 0, "errors": 0,
+                                   "failures": [], "error_details": []}, shard="2/2")
+
+        merged = merge_result_files([first, second])
+        self.assertEqual(merged["total"], 5)
+        self.assertEqual(merged["passed"], 4)
+        self.assertEqual(merged["failures"], [["t::A::test_x", "tb"]])
+        self.assertEqual(merged["shards"], ["1/2", "2/2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
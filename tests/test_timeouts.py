@@ -0,0 +1,164 @@
+"""
+测试超时和看门狗的测试
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+from unittest import mock
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from py_auto_tester.parallel import ParallelRunner
+from py_auto_tester.runner import iter_file_events
+
+
+SAMPLE_HANGING = '''
+import time
+import unittest
+from py_auto_tester import timeout
+
+class TestHanging(unittest.TestCase):
+    @timeout(0.2)
+    def test_sleep(self):
+        time.sleep(30)
+
+    def test_after(self):
+        pass
+
+class TestClassTimeout(unittest.TestCase):
+    __timeout__ = 0.2
+
+    def test_sleep(self):
+        time.sleep(30)
+'''
+
+SAMPLE_SLOW_FILE = '''
+import time
+import unittest
+
+class TestSlow(unittest.TestCase):
+    def test_1(self):
+        time.sleep(0.3)
+
+    def test_2(self):
+        time.sleep(0.3)
+
+    def test_3(self):
+        time.sleep(0.3)
+'''
+
+SAMPLE_UNINTERRUPTIBLE = '''
+import time
+import unittest
+from py_auto_tester import timeout
+
+class TestStuck(unittest.TestCase):
+    @timeout(0.2)
+    def test_a_swallows_timeout(self):
+        while True:
+            try:
+                time.sleep(30)
+            except Exception:
+                pass
+
+    def test_b_after(self):
+        pass
+'''
+
+
+class TestTimeouts(unittest.TestCase):
+    """
+    测试超时的测试用例
+    """
+
+    def setUp(self):
+        """
+        创建临时目录
+        """
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        删除临时目录
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, name, source):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(textwrap.dedent(source))
+        return path
+
+    def test_timed_out_test_is_an_error_with_stacks(self):
+        """
+        测试装饰器和类属性指定的超时: 超时的测试记为错误并附带调用栈，其余测试照常运行
+        """
+        path = self._write("test_hanging.py", SAMPLE_HANGING)
+        events = [e for e in iter_file_events(path)
+                  if e["event"] not in ("start", "timing")]
+        statuses = {e["id"].split("::", 1)[1]: e["event"] for e in events}
+
+        self.assertEqual(statuses, {"TestHanging::test_sleep": "error",
+                                    "TestHanging::test_after": "pass",
+                                    "TestClassTimeout::test_sleep": "error"})
+        traceback = events[0]["traceback"]
+        self.assertIn("TimeoutExceeded", traceback)
+        self.assertIn("Current thread", traceback)
+        self.assertTrue(traceback.rstrip().endswith("测试运行超过 0.2 秒"))
+
+    def test_file_timeout_stops_the_file(self):
+        """
+        测试整个文件超时后不再运行其余的测试
+        """
+        path = self._write("test_slow.py", SAMPLE_SLOW_FILE)
+        events = [e for e in iter_file_events(path, file_timeout=0.5)
+                  if e["event"] not in ("start", "timing")]
+
+        self.assertEqual([e["event"] for e in events], ["pass", "error"])
+        self.assertIn("停止运行其余的测试", events[1]["traceback"])
+
+    @unittest.skipUnless(hasattr(os, "fork"), "工作进程需要继承修改后的等待时间")
+    def test_watchdog_kills_uninterruptible_test_and_continues(self):
+        """
+        测试无法中断的测试由看门狗终止工作进程，文件中其余的测试在新进程中继续运行
+        """
+        path = self._write("test_stuck.py", SAMPLE_UNINTERRUPTIBLE)
+        runner = ParallelRunner(workers=1, verbose=False, stream=io.StringIO())
+        with mock.patch("py_auto_tester.timeouts.WATCHDOG_GRACE", 0.3):
+            results = runner.run([path])
+
+        self.assertEqual((results["total"], results["passed"], results["errors"]),
+                         (2, 1, 1))
+        test_id, traceback = results["error_details"][0]
+        self.assertTrue(test_id.endswith("test_a_swallows_timeout"))
+        self.assertIn("看门狗终止了工作进程", traceback)
+        self.assertIn("test_a_swallows_timeout", traceback)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "工作进程需要继承修改后的等待时间")
+    def test_watchdog_exit_under_two_workers_finishes_the_run(self):
+        """
+        测试另一个工作进程持续发送事件时看门狗终止进程，整个运行照常结束
+        """
+        stuck = self._write("test_stuck.py", SAMPLE_UNINTERRUPTIBLE)
+        methods = "".join(f"    def test_{i}(self):\n        pass\n"
+                          for i in range(2000))
+        fast = self._write("test_fast.py",
+                           "import unittest\n\nclass TestFast(unittest.TestCase):\n"
+                           + methods)
+        runner = ParallelRunner(workers=2, verbose=False, stream=io.StringIO())
+        with mock.patch("py_auto_tester.timeouts.WATCHDOG_GRACE", 0.3):
+            results = runner.run([stuck, fast])
+
+        self.assertEqual((results["total"], results["passed"], results["errors"]),
+                         (2002, 2001, 1))
+        self.assertIn("看门狗终止了工作进程", results["error_details"][0][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+"""
+导入关系图和监视模式的测试
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from xml.etree import ElementTree
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from py_auto_tester import AutoTester
+from py_auto_tester.cli import main
+from py_auto_tester.imports import ImportGraph, parse_imports
+from py_auto_tester.watch import Watcher, diff_snapshots
+
+
+PROJECT_FILES = {
+    "app/__init__.py": "",
+    "app/models.py": "import json\n",
+    "app/views.py": "from . import models\n",
+    "app/utils.py": "",
+    "tests/test_views.py": "import unittest\nfrom app.views import render\n",
+    "tests/test_utils.py": "import unittest\nfrom app import utils\n",
+    "tests/test_plain.py": "import unittest\n",
+}
+
+
+class TestImportGraph(unittest.TestCase):
+    """
+    ImportGraph 和 Watcher 的测试用例
+    """
+
+    def setUp(self):
+        """
+        创建一个小型示例项目
+        """
+        self.root = tempfile.mkdtemp()
+        for relative, source in PROJECT_FILES.items():
+            path = os.path.join(self.root, relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(source)
+
+    def tearDown(self):
+        """
+        删除示例项目
+        """
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _path(self, relative):
+        return os.path.join(self.root, relative)
+
+    def test_parse_imports(self):
+        """
+        测试识别绝对导入、相对导入和函数内部的导入
+        """
+        source = "import a.b\nfrom .c import d\ndef f():\n    from e import g\n"
+        self.assertEqual(parse_imports(source),
+                         [("a.b", 0, []), ("c", 1, ["d"]), ("e", 0, ["g"])])
+
+    def test_affected_tests_follow_transitive_imports(self):
+        """
+        测试修改底层模块时选出间接导入它的测试文件
+        """
+        graph = ImportGraph(self.root)
+        graph.update()
+        tests = [self._path(name) for name in
+                 ("tests/test_plain.py", "tests/test_utils.py", "tests/test_views.py")]
+
+        self.assertEqual(graph.affected_tests([self._path("app/models.py")], tests),
+                         [self._path("tests/test_views.py")])
+        # 包的 __init__.py 在导入任何子模块时都会执行
+        self.assertEqual(
+            graph.affected_tests([self._path("app/__init__.py")], tests), tests[1:])
+        self.assertEqual(
+            graph.affected_tests([self._path("tests/test_plain.py")], tests), tests[:1])
+
+    def test_graph_cache_by_file_hash(self):
+        """
+        测试内容未变的文件使用缓存的解析结果
+        """
+        cache_file = self._path(".cache/imports.json")
+        ImportGraph(self.root, cache_file=cache_file).update()
+
+        graph = ImportGraph(self.root, cache_file=cache_file)
+        graph.update()
+        self.assertEqual(graph.stats, {"parsed": 0, "cached": len(PROJECT_FILES)})
+        self.assertIn(self._path("app/models.py"),
+                      graph.edges[self._path("app/views.py")])
+
+    def test_discover_tests_with_changed_files(self):
+        """
+        测试 discover_tests 只保留受修改影响的测试文件并统计跳过的测试
+        """
+        with open(self._path("tests/test_views.py"), "a", encoding="utf-8") as f:
+            f.write("\nclass TestViews(unittest.TestCase):\n"
+                    "    def test_render(self):\n        pass\n")
+        tester = AutoTester(test_directory=self._path("tests"),
+                            cache_dir=self._path(".cache"))
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        try:
+            selected = tester.discover_tests(
+                changed_files=[self._path("app/models.py")])
+        finally:
+            os.chdir(cwd)
+
+        self.assertEqual(selected, [self._path("tests/test_views.py")])
+        self.assertEqual(tester.change_selection["selected_tests"], 1)
+        self.assertEqual(tester.change_selection["skipped_files"], 2)
+
+    def test_watcher_selects_changed_tests(self):
+        """
+        测试监视器通过快照比较发现修改并选出受影响的测试
+        """
+        tester = AutoTester(test_directory=self._path("tests"),
+                            cache_dir=self._path(".cache"))
+        watcher = Watcher(tester, root=self.root)
+        before = watcher.snapshot()
+        with open(self._path("app/utils.py"), "a", encoding="utf-8") as f:
+            f.write("VALUE = 1\n")
+        changed = diff_snapshots(before, watcher.snapshot())
+
+        self.assertEqual(changed, {self._path("app/utils.py")})
+        self.assertEqual(watcher.select(changed), [self._path("tests/test_utils.py")])
+
+    def test_watcher_runs_with_run_options(self):
+        """
+        测试监视器的每次运行使用与普通运行相同的选项并写出报告
+        """
+        with open(self._path("tests/test_plain.py"), "a", encoding="utf-8") as f:
+            f.write("\nclass TestPlain(unittest.TestCase):\n"
+                    "    def test_a(self):\n        self.fail()\n\n"
+                    "    def test_b(self):\n        self.fail()\n")
+        tester = AutoTester(test_directory=self._path("tests"),
+                            cache_dir=self._path(".cache"))
+        junit_path = self._path("report.xml")
+        watcher = Watcher(tester, root=self.root,
+                          run_options={"workers": 1, "exitfirst": True},
+                          report=[f"junit:{junit_path}"])
+        watcher.start_run([self._path("tests/test_plain.py")])
+        watcher._process.join(30)
+
+        suite = ElementTree.parse(junit_path).getroot().find("testsuite")
+        self.assertEqual((suite.get("tests"), suite.get("failures")), ("1", "1"))
+
+    def test_watch_rejects_unsupported_options(self):
+        """
+        测试监视模式无法使用的选项被拒绝，而不是被忽略
+        """
+        stderr = io.StringIO()
+        with self.assertRaises(SystemExit) as cm, contextlib.redirect_stderr(stderr):
+            main(["--watch", "--shard", "1/2", "--durations", "5"])
+        self.assertEqual(cm.exception.code, 2)
+        self.assertIn("--shard, --durations", stderr.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()